@@ -7,6 +7,7 @@ from loguru import logger as _logger
 from app.models.settings import Settings as _Settings
 from app.paths import ENV_FILE as _ENV_FILE
 from app.paths import ERROR_LOG_FILE as _ERROR_LOG_FILE
+from app.paths import FETCH_STATS_LOG_FILE as _FETCH_STATS_LOG_FILE
 from app.paths import LOG_FILE as _LOG_FILE
 
 
@@ -38,6 +39,13 @@ _logger.add(
     level="ERROR",
     rotation="10 MB",
 )
+_logger.add(
+    _FETCH_STATS_LOG_FILE,
+    filter=lambda record: record["extra"].get("name") == "fetch_stats",
+    level="INFO",
+    rotation="10 MB",
+    serialize=True,
+)
 
 # Expose logger
 logger = _logger.bind(name="logger")
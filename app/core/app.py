@@ -1,6 +1,5 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi_utils.tasks import repeat_every
 from sqlmodel import Session
 
 from app import crud, logger, settings, version
@@ -9,7 +8,10 @@ from app.api.v1.api import api_router
 from app.core import notify
 from app.db.init_db import init_initial_data
 from app.paths import STATIC_PATH
-from app.services.fetch import fetch_all_subscriptions
+from app.services.filter_index import filter_indexer
+from app.services.retention import retention_job
+from app.services.scheduler import fetch_scheduler
+from app.services.ytdlp_pool import extractor_pool
 from app.views.router import views_router
 
 # Initialize FastAPI App
@@ -43,16 +45,49 @@ async def on_startup(db: Session = next(deps.get_db())) -> None:
     await init_initial_data(db=db)
 
 
+@app.on_event("shutdown")  # type: ignore
+async def on_shutdown() -> None:
+    """
+    Event handler that gets called when the application stops.
+    Stops the fetch scheduler, the retention job, the filter indexer, the yt-dlp extractor
+    worker processes and the notification dispatcher.
+    """
+    await fetch_scheduler.stop()
+    await retention_job.stop()
+    await filter_indexer.stop()
+    await extractor_pool.close()
+    await notify.dispatcher.stop()
+
+
 @app.on_event("startup")  # type: ignore
-@repeat_every(seconds=settings.REFRESH_SUBSCRIPTIONS_INTERVAL_MINUTES * 60, wait_first=True)
-async def repeating_fetch_all_sources() -> None:  # pragma: no cover
+async def start_fetch_scheduler() -> None:  # pragma: no cover
     """
-    Fetches all Sources from yt-dlp.
+    Starts the scheduler that fetches each Subscription when it is due.
     """
-    logger.debug("Repeating fetch of All Subscriptions...")
+    if not settings.SCHEDULER_ENABLED:
+        return
     db: Session = next(deps.get_db())
-    fetch_results = await fetch_all_subscriptions(db=db)
-    logger.success(f"Completed refreshing {fetch_results.subscriptions} Subscriptions from yt-dlp.")
+    fetch_scheduler.start(db=db)
+
+
+@app.on_event("startup")  # type: ignore
+async def build_filter_index() -> None:  # pragma: no cover
+    """
+    Indexes the videos of all filters, unless the index is current, which is then kept up
+    to date after every commit.
+    """
+    db: Session = next(deps.get_db())
+    filter_indexer.start(db=db)
+
+
+@app.on_event("startup")  # type: ignore
+async def start_retention_job() -> None:  # pragma: no cover
+    """
+    Starts the job that periodically deletes orphaned and aged videos.
+    """
+    if not settings.RETENTION_ENABLED:
+        return
+    retention_job.start()
 
 
 # @app.on_event("startup")  # type: ignore
@@ -1,5 +1,9 @@
+import asyncio
+from pathlib import Path
+
 import typer
 from rich.console import Console
+from rich.table import Table
 
 from app import logger, settings, version
 from app.core.server import start_server
@@ -34,8 +38,9 @@ def version_callback(print_version: bool) -> None:
 
 
 # Typer Commands
-@typer_app.command()
+@typer_app.callback(invoke_without_command=True)
 def main(
+    ctx: typer.Context,
     print_version: bool = typer.Option(  # pylint: disable=unused-argument
         None,
         "-v",
@@ -53,6 +58,67 @@ def main(
         print_version: bool : If true, print version of the package and exit.
     """
 
+    if ctx.invoked_subcommand is not None:
+        return
+
     # Start Uvicorn
     logger.info("Starting Server...")
     start_server()
+
+
+@typer_app.command()
+def benchmark(
+    subscriptions: int = typer.Option(10, help="Number of subscriptions to fetch."),
+    entries: int = typer.Option(100, help="Entries per synthetic feed."),
+    rounds: int = typer.Option(3, help="Times all subscriptions are fetched."),
+    fixtures: Path = typer.Option(
+        None, help="Directory of recorded yt-dlp fixtures. Feeds without one are synthetic."
+    ),
+) -> None:
+    """
+    Benchmark fetching and ingesting subscriptions offline, against replayed yt-dlp feeds
+    and a scratch database.
+
+    Args:
+        subscriptions (int): Number of subscriptions to fetch.
+        entries (int): Entries per synthetic feed.
+        rounds (int): Times all subscriptions are fetched.
+        fixtures (Path): Directory of recorded yt-dlp fixtures.
+    """
+    # Imported here, so the server command does not load the fetch services
+    from app.services.benchmark import run_fetch_benchmark
+
+    results = asyncio.run(
+        run_fetch_benchmark(
+            subscriptions=subscriptions, entries=entries, rounds=rounds, fixtures_path=fixtures
+        )
+    )
+
+    table = Table(title="Fetch Benchmark")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Subscriptions", str(results.subscriptions))
+    table.add_row("Rounds", str(results.rounds))
+    table.add_row("Videos added", str(results.added_videos))
+    table.add_row("Seconds", f"{results.seconds:.2f}")
+    table.add_row("Videos / second", f"{results.videos_per_second:.1f}")
+    table.add_row("DB statements / subscription", f"{results.statements_per_subscription:.1f}")
+    table.add_row("Peak RSS (MB)", f"{results.peak_rss_bytes / 1024 / 1024:.1f}")
+    console.print(table)
+
+
+@typer_app.command()
+def rebuild_search_index() -> None:
+    """
+    Rebuild the full-text index of the titles and descriptions of the videos.
+    """
+    # Imported here, so the server command does not load the database services
+    from app.db.session import SessionLocal
+    from app.services.video_fts import rebuild_video_fts
+
+    db = SessionLocal()
+    try:
+        rebuild_video_fts(db=db)
+    finally:
+        db.close()
+    console.print("Rebuilt the search index.")
@@ -1,5 +1,8 @@
 from typing import Any
 
+import asyncio
+import time
+from collections import deque
 from pathlib import Path
 
 import emails
@@ -17,6 +20,8 @@ settings = _Settings()
 logger = _logger.bind(name="logger")
 logger.add(paths.LOG_FILE, level=settings.LOG_LEVEL, rotation="10 MB")
 
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
 
 async def notify(
     text: str, telegram: bool = True, email: bool = settings.EMAILS_ENABLED
@@ -37,7 +42,8 @@ async def notify(
     if telegram and settings.NOTIFY_TELEGRAM_ENABLED:
         response["telegram"] = await send_telegram_message(text=text)
     if email and settings.NOTIFY_EMAIL_ENABLED:
-        response["email"] = send_email(
+        response["email"] = await asyncio.to_thread(
+            send_email,
             email_to=settings.NOTIFY_EMAIL_TO,
             subject_template="Server Notification",
             html_template=text,
@@ -46,6 +52,22 @@ async def notify(
     return response
 
 
+_telegram_bot: Bot | None = None
+
+
+def get_telegram_bot() -> Bot:
+    """
+    Get the Telegram bot shared by all messages, so its HTTP client is reused.
+
+    Returns:
+        Bot: The bot for `settings.TELEGRAM_API_TOKEN`.
+    """
+    global _telegram_bot  # pylint: disable=global-statement
+    if _telegram_bot is None or _telegram_bot.token != settings.TELEGRAM_API_TOKEN:
+        _telegram_bot = Bot(token=settings.TELEGRAM_API_TOKEN)
+    return _telegram_bot
+
+
 async def send_telegram_message(text: str) -> Any:
     """Sends a message via Telegram using the given text as the message's content.
     Telegram API token and chat ID must be set before calling this function.
@@ -63,7 +85,7 @@ async def send_telegram_message(text: str) -> Any:
         logger.warning("TELEGRAM_API_TOKEN or TELEGRAM_CHAT_ID config variables are not set.")
         return None
 
-    bot = Bot(token=settings.TELEGRAM_API_TOKEN)
+    bot = get_telegram_bot()
 
     try:
         return await bot.send_message(chat_id=settings.TELEGRAM_CHAT_ID, text=text)
@@ -74,6 +96,177 @@ async def send_telegram_message(text: str) -> Any:
         ) from e
 
 
+def build_digests(texts: list[str], max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> list[str]:
+    """
+    Combine notification texts into as few messages as possible.
+
+    Args:
+        texts (list[str]): The notification texts.
+        max_length (int): The max length of a message.
+
+    Returns:
+        list[str]: The messages to send.
+    """
+    if len(texts) == 1:
+        return [texts[0][:max_length]]
+
+    digests: list[str] = []
+    header = f"{len(texts)} notifications:"
+    digest = header
+    for text in texts:
+        entry = f"\n\n- {text}"[: max_length - len(header)]
+        if len(digest) + len(entry) > max_length:
+            digests.append(digest)
+            digest = header
+        digest += entry
+    digests.append(digest)
+    return digests
+
+
+class NotificationDispatcher:
+    def __init__(
+        self,
+        dedup_seconds: float,
+        digest_seconds: float,
+        telegram_max_per_minute: int,
+        max_queue_size: int = 1000,
+    ) -> None:
+        """
+        Sends notifications from a background task, so callers never wait for the network.
+
+        Identical notifications within `dedup_seconds` are dropped. Notifications that
+        arrive within `digest_seconds` of each other are sent as a single digest. Telegram
+        messages are limited to `telegram_max_per_minute`, and emails are sent in a thread.
+
+        Args:
+            dedup_seconds (float): Window in which identical notifications are dropped.
+            digest_seconds (float): Time to collect notifications into one digest.
+            telegram_max_per_minute (int): Max Telegram messages per minute.
+            max_queue_size (int): Max queued notifications. Further ones are dropped.
+        """
+        self.dedup_seconds = dedup_seconds
+        self.digest_seconds = digest_seconds
+        self.telegram_max_per_minute = max(1, telegram_max_per_minute)
+        self.max_queue_size = max_queue_size
+        self.suppressed = 0
+
+        self._queue: asyncio.Queue[tuple[str, bool, bool]] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._last_dispatched: dict[tuple[str, bool, bool], float] = {}
+        self._telegram_sent_at: deque[float] = deque()
+
+    def dispatch(
+        self, text: str, telegram: bool = True, email: bool = settings.EMAILS_ENABLED
+    ) -> None:
+        """
+        Queue a notification without waiting for it to be sent.
+
+        Args:
+            text (str): The notification text to send.
+            telegram (bool): Whether to send the notification via Telegram.
+            email (bool): Whether to send the notification via email.
+        """
+        now = time.monotonic()
+        key = (text, telegram, email)
+        if now - self._last_dispatched.get(key, -self.dedup_seconds) < self.dedup_seconds:
+            self.suppressed += 1
+            return
+        if len(self._last_dispatched) >= self.max_queue_size:
+            self._last_dispatched = {
+                k: t for k, t in self._last_dispatched.items() if now - t < self.dedup_seconds
+            }
+        self._last_dispatched[key] = now
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        try:
+            self._queue.put_nowait(key)
+        except asyncio.QueueFull:
+            logger.warning(f"Notification queue is full. Dropped notification: {text}")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.digest_seconds
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._send(batch=batch)
+
+    async def _wait_for_telegram_slot(self) -> None:
+        now = time.monotonic()
+        while self._telegram_sent_at and now - self._telegram_sent_at[0] >= 60:
+            self._telegram_sent_at.popleft()
+        if len(self._telegram_sent_at) >= self.telegram_max_per_minute:
+            await asyncio.sleep(60 - (now - self._telegram_sent_at.popleft()))
+        self._telegram_sent_at.append(time.monotonic())
+
+    async def _send(self, batch: list[tuple[str, bool, bool]]) -> None:
+        """
+        Send a batch of notifications as digests.
+
+        Args:
+            batch (list[tuple[str, bool, bool]]): The queued `(text, telegram, email)` tuples.
+        """
+        telegram_texts = [text for text, telegram, _ in batch if telegram]
+        email_texts = [text for text, _, email in batch if email]
+
+        if telegram_texts and settings.NOTIFY_TELEGRAM_ENABLED:
+            for digest in build_digests(texts=telegram_texts):
+                await self._wait_for_telegram_slot()
+                try:
+                    await send_telegram_message(text=digest)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error(f"Could not send Telegram notification. {e=}")
+
+        if email_texts and settings.NOTIFY_EMAIL_ENABLED:
+            try:
+                await asyncio.to_thread(
+                    send_email,
+                    email_to=settings.NOTIFY_EMAIL_TO,
+                    subject_template="Server Notification",
+                    html_template="<br><br>".join(email_texts),
+                    environment={"name": f"{settings.PROJECT_NAME}"},
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Could not send email notification. {e=}")
+
+    async def stop(self) -> None:
+        """
+        Stop the background task, send queued notifications and close the Telegram bot.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._queue is not None:
+            batch = []
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch:
+                await self._send(batch=batch)
+            self._queue = None
+        if _telegram_bot is not None:
+            try:
+                await _telegram_bot.shutdown()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning(f"Could not close the Telegram bot. {e=}")
+
+
+dispatcher = NotificationDispatcher(
+    dedup_seconds=settings.NOTIFY_DEDUP_SECONDS,
+    digest_seconds=settings.NOTIFY_DIGEST_SECONDS,
+    telegram_max_per_minute=settings.NOTIFY_TELEGRAM_MAX_PER_MINUTE,
+)
+
+
 def send_email(
     email_to: str | None,
     subject_template: str = "",
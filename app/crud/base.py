@@ -1,7 +1,11 @@
-from typing import Any, Generic, TypeVar
+from typing import Any, Generic, TypeVar, cast
+
+from collections.abc import Iterable
 
 from sqlalchemy import select as sa_select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.dml import Insert
 from sqlalchemy.sql.elements import BinaryExpression
 from sqlalchemy.sql.expression import func
 from sqlmodel import Session, SQLModel, select
@@ -13,6 +17,40 @@ ModelCreateType = TypeVar("ModelCreateType", bound=SQLModel)
 ModelUpdateType = TypeVar("ModelUpdateType", bound=SQLModel)
 
 
+def build_upsert_statement(
+    db: Session,
+    model: type[SQLModel],
+    rows: list[dict[str, Any]],
+    update_fields: list[str] | None = None,
+) -> Insert:
+    """
+    Build a multi-row `INSERT ... ON CONFLICT` statement for the model's primary key.
+
+    Args:
+        db (Session): The database session.
+        model: The table model to insert into.
+        rows (list[dict[str, Any]]): The rows to insert.
+        update_fields (list[str] | None): Columns to overwrite when a row already exists.
+            If None, existing rows are left untouched.
+
+    Returns:
+        Insert: The upsert statement.
+    """
+    table = model.__table__  # type: ignore[attr-defined]
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table).values(rows)
+    index_elements = [column.name for column in table.primary_key.columns]
+    if not update_fields:
+        return cast(Insert, statement.on_conflict_do_nothing(index_elements=index_elements))
+    return cast(
+        Insert,
+        statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={field: statement.excluded[field] for field in update_fields},
+        ),
+    )
+
+
 class BaseCRUD(Generic[ModelType, ModelCreateType, ModelUpdateType]):
     def __init__(self, model: type[ModelType]) -> None:
         """
@@ -105,6 +143,23 @@ class BaseCRUD(Generic[ModelType, ModelCreateType, ModelUpdateType]):
         statement = select(self.model).filter(*args).filter_by(**kwargs).offset(skip).limit(limit)
         return db.exec(statement).fetchmany()
 
+    async def get_existing_ids(self, db: Session, ids: Iterable[str]) -> set[str]:
+        """
+        Get which of the given ids already exist, using a single `IN (...)` query.
+
+        Args:
+            db (Session): The database session.
+            ids: The ids to look up.
+
+        Returns:
+            set[str]: The ids that exist in the database.
+        """
+        ids = set(ids)
+        if not ids:
+            return set()
+        statement = select(self.model.id).where(self.model.id.in_(ids))  # type: ignore
+        return set(db.exec(statement).all())
+
     async def create(self, db: Session, *, obj_in: ModelCreateType, **kwargs: Any) -> ModelType:
         """
         Create a new record.
@@ -131,6 +186,36 @@ class BaseCRUD(Generic[ModelType, ModelCreateType, ModelUpdateType]):
         db.refresh(out_obj)
         return out_obj
 
+    async def upsert_multi(
+        self,
+        db: Session,
+        *,
+        objs_in: list[ModelCreateType],
+        update_fields: list[str] | None = None,
+        commit: bool = True,
+    ) -> None:
+        """
+        Insert multiple records with a single `INSERT ... ON CONFLICT` statement.
+
+        Args:
+            db (Session): The database session.
+            objs_in: The objects to insert.
+            update_fields: Columns to overwrite when a record already exists.
+                If None, existing records are left untouched.
+            commit (bool): Whether to commit the transaction.
+        """
+        if not objs_in:
+            return
+        statement = build_upsert_statement(
+            db=db,
+            model=self.model,
+            rows=[obj_in.dict() for obj_in in objs_in],
+            update_fields=update_fields,
+        )
+        db.execute(statement)
+        if commit:
+            db.commit()
+
     async def update(
         self,
         db: Session,
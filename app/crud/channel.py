@@ -1,4 +1,6 @@
-from sqlmodel import Session
+from collections.abc import Iterable
+
+from sqlmodel import Session, select, update
 
 from app import models
 from app.crud.tag import tag
@@ -7,6 +9,63 @@ from .base import BaseCRUD
 
 
 class ChannelCRUD(BaseCRUD[models.Channel, models.ChannelCreate, models.ChannelUpdate]):
+    async def get_multi_by_remote_channel_ids(
+        self, db: Session, remote_channel_ids: Iterable[str]
+    ) -> list[models.Channel]:
+        """
+        Get the channels matching the remote channel ids, using a single `IN (...)` query.
+
+        Args:
+            db (Session): The database session.
+            remote_channel_ids: The remote channel ids to look up.
+
+        Returns:
+            list[models.Channel]: The matching channels.
+        """
+        remote_channel_ids = set(remote_channel_ids)
+        if not remote_channel_ids:
+            return []
+        statement = select(self.model).where(
+            self.model.remote_channel_id.in_(remote_channel_ids)  # type: ignore
+        )
+        return db.exec(statement).all()
+
+    async def get_multi_missing_logo(self, db: Session) -> list[models.Channel]:
+        """
+        Get the channels that do not have a logo.
+
+        Args:
+            db (Session): The database session.
+
+        Returns:
+            list[models.Channel]: The channels where `logo IS NULL`.
+        """
+        statement = select(self.model).where(self.model.logo == None)  # noqa: E711
+        return db.exec(statement).all()
+
+    async def set_subscribed(
+        self, db: Session, channel_ids: Iterable[str], commit: bool = True
+    ) -> None:
+        """
+        Mark channels as subscribed with a single `UPDATE` statement.
+
+        Args:
+            db (Session): The database session.
+            channel_ids: The ids of the channels to mark as subscribed.
+            commit (bool): Whether to commit the transaction.
+        """
+        channel_ids = set(channel_ids)
+        if not channel_ids:
+            return
+        statement = (
+            update(self.model)
+            .where(self.model.id.in_(channel_ids))  # type: ignore
+            .values(is_subscribed=True)
+        )
+        db.execute(statement)
+        if commit:
+            db.commit()
+
     async def add_tag(self, db: Session, channel_id: str, tag_id: str) -> models.Channel:
         db_channel = await self.get(db=db, id=channel_id)
         db_tag = await tag.get(db=db, id=tag_id)
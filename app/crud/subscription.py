@@ -1,8 +1,10 @@
-from sqlmodel import Session
+from collections.abc import Iterable
+
+from sqlmodel import Session, select
 
 from app import models
 
-from .base import BaseCRUD
+from .base import BaseCRUD, build_upsert_statement
 
 
 class SubscriptionCRUD(
@@ -42,5 +44,53 @@ class SubscriptionCRUD(
         """
         return await self.get_multi(db=db, created_by=user_id, skip=skip, limit=limit)
 
+    async def get_linked_video_ids(
+        self, db: Session, subscription_id: str, video_ids: Iterable[str]
+    ) -> set[str]:
+        """
+        Get which of the given videos are already linked to a subscription,
+        using a single `IN (...)` query.
+
+        Args:
+            db (Session): The database session.
+            subscription_id (str): The subscription id.
+            video_ids: The video ids to look up.
+
+        Returns:
+            set[str]: The video ids that are linked to the subscription.
+        """
+        video_ids = set(video_ids)
+        if not video_ids:
+            return set()
+        link = models.SubscriptionVideoLink
+        statement = (
+            select(link.video_id)
+            .where(link.subscription_id == subscription_id)
+            .where(link.video_id.in_(video_ids))  # type: ignore
+        )
+        return set(db.exec(statement).all())
+
+    async def add_video_links(
+        self, db: Session, subscription_id: str, video_ids: Iterable[str], commit: bool = True
+    ) -> None:
+        """
+        Link videos to a subscription with a single `INSERT ... ON CONFLICT` statement.
+
+        Args:
+            db (Session): The database session.
+            subscription_id (str): The subscription id.
+            video_ids: The ids of the videos to link.
+            commit (bool): Whether to commit the transaction.
+        """
+        rows = [
+            models.SubscriptionVideoLink(subscription_id=subscription_id, video_id=video_id).dict()
+            for video_id in video_ids
+        ]
+        if not rows:
+            return
+        db.execute(build_upsert_statement(db=db, model=models.SubscriptionVideoLink, rows=rows))
+        if commit:
+            db.commit()
+
 
 subscription = SubscriptionCRUD(models.Subscription)
@@ -65,5 +65,28 @@ class VideoCRUD(BaseCRUD[models.Video, models.VideoCreate, models.VideoUpdate]):
             .all()
         )
 
+    async def get_remote_video_ids_by_subscription_id(
+        self, db: Session, subscription_id: str
+    ) -> set[str]:
+        """
+        Get the remote video ids of all videos linked to a subscription.
+
+        Args:
+            db (Session): The database session.
+            subscription_id (str): The subscription id.
+
+        Returns:
+            set[str]: The remote video ids.
+        """
+        statement = (
+            select(self.model.remote_video_id)
+            .join(
+                models.SubscriptionVideoLink,
+                models.SubscriptionVideoLink.video_id == self.model.id,  # type: ignore
+            )
+            .where(models.SubscriptionVideoLink.subscription_id == subscription_id)
+        )
+        return {remote_video_id for remote_video_id in db.exec(statement).all() if remote_video_id}
+
 
 video = VideoCRUD(models.Video)
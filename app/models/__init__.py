@@ -6,6 +6,7 @@ from .fetch import *
 from .filter import *
 from .filter_filter_group_link import *
 from .filter_group import *
+from .filter_video_link import *
 from .filtered_videos import *
 from .msg import *
 from .playlist import *
@@ -19,3 +20,4 @@ from .tag import *
 from .tokens import *
 from .user import *
 from .video import *
+from .video_fts import *
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING, Any
 import re
 from datetime import datetime, timedelta
 from enum import Enum
+from functools import lru_cache
 
 from pydantic import root_validator
 from sqlmodel import Field, Relationship, SQLModel
@@ -65,6 +66,20 @@ class CriteriaUnitOfMeasure(Enum):
     PRIORITY = "priority"
 
 
+@lru_cache(maxsize=256)
+def get_keyword_pattern(keyword: str) -> re.Pattern[str]:
+    """
+    Get the compiled case-insensitive pattern matching a keyword as a whole word.
+
+    Args:
+        keyword (str): The keyword.
+
+    Returns:
+        re.Pattern[str]: The pattern.
+    """
+    return re.compile(rf"\b{re.escape(keyword)}\b", re.IGNORECASE)
+
+
 class CriteriaBase(TimestampModel, SQLModel):
     id: str = Field(default=None, primary_key=True, index=True)
     filter_id: str = Field(default=None, foreign_key="filter.id", index=True, nullable=False)
@@ -199,14 +214,15 @@ class Criteria(CriteriaBase, table=True):
 
         """
         match = None
+        pattern = get_keyword_pattern(keyword)
+        contains = bool(
+            pattern.search(video.title or "") or pattern.search(video.description or "")
+        )
 
         if self.operator == CriteriaOperator.MUST_CONTAIN.value:
-            match = bool(re.search(rf"\b{re.escape(keyword.lower())}\b", str(video.title).lower()))
+            match = contains
         elif self.operator == CriteriaOperator.MUST_NOT_CONTAIN.value:
-            match = (
-                bool(re.search(rf"\b{re.escape(keyword.lower())}\b", str(video.title).lower()))
-                is False
-            )
+            match = contains is False
         else:
             raise ValueError("Operator must be 'must_contain' or 'must_not_contain'")
 
@@ -1,12 +1,59 @@
 from typing import Any
 
-from sqlmodel import SQLModel
+import datetime
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlmodel import Field, SQLModel
+
+FETCH_STAGES = ("extract", "mapping", "ingest")
+
+
+class SubscriptionFetchStats(SQLModel):
+    subscription_id: str
+    subscription: str = ""
+    fetched_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    extract_seconds: float = 0  # yt-dlp extraction
+    mapping_seconds: float = 0  # mapping feed entries to videos
+    ingest_seconds: float = 0  # writing new videos to the database
+    entries_seen: int = 0  # feed entries read from yt-dlp
+    entries_new: int = 0  # feed entries not yet linked to the subscription
+    skipped_entries: int = 0  # entries of the fetch window not read by incremental fetches
+    rate_limit_wait_seconds: float = 0  # part of the extraction spent waiting for rate limits
+    error: str | None = None  # class name of the error that cancelled the fetch
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(float(getattr(self, f"{stage}_seconds")) for stage in FETCH_STAGES)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """
+        Add the wall time of the block to a stage.
+
+        Args:
+            stage (str): One of `FETCH_STAGES`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            field = f"{stage}_seconds"
+            setattr(self, field, getattr(self, field) + time.perf_counter() - start)
 
 
 class FetchResults(SQLModel):
     subscriptions: int = 0
     added_videos: int = 0
     deleted_videos: int = 0
+    skipped_entries: int = 0  # entries of the fetch window not consumed by incremental fetches
+    entries_seen: int = 0
+    logo_seconds: float = 0  # resolving missing channel logos after the fetches
+    rate_limit_wait_seconds: float = 0  # extraction time spent waiting for rate limits
+    errors: dict[str, int] = Field(default_factory=dict)  # cancelled fetches by error class
+    stats: list[SubscriptionFetchStats] = Field(default_factory=list)
 
     def __add__(self, other: Any) -> "FetchResults":
         """
@@ -27,4 +74,40 @@ class FetchResults(SQLModel):
             subscriptions=self.subscriptions + other.subscriptions,
             added_videos=self.added_videos + other.added_videos,
             deleted_videos=self.deleted_videos + other.deleted_videos,
+            skipped_entries=self.skipped_entries + other.skipped_entries,
+            entries_seen=self.entries_seen + other.entries_seen,
+            logo_seconds=self.logo_seconds + other.logo_seconds,
+            rate_limit_wait_seconds=self.rate_limit_wait_seconds + other.rate_limit_wait_seconds,
+            errors=dict(Counter(self.errors) + Counter(other.errors)),
+            stats=self.stats + other.stats,
         )
+
+
+class FetchBenchmarkResults(SQLModel):
+    subscriptions: int = 0
+    rounds: int = 0
+    added_videos: int = 0
+    seconds: float = 0
+    statements: int = 0  # database statements executed by the fetch runs
+    peak_rss_bytes: int = 0
+
+    @property
+    def videos_per_second(self) -> float:
+        return self.added_videos / self.seconds if self.seconds else 0.0
+
+    @property
+    def statements_per_subscription(self) -> float:
+        fetches = self.subscriptions * self.rounds
+        return self.statements / fetches if fetches else 0.0
+
+
+class FetchJobEvent(SQLModel):
+    job_id: str
+    event: str  # "progress" per subscription, then one of "done", "cancelled" or "failed"
+    done: int = 0  # subscriptions fetched so far
+    total: int = 0
+    subscription_id: str | None = None
+    subscription: str | None = None
+    added_videos: int = 0
+    error: str | None = None  # class name of the error of the subscription or job
+    results: FetchResults | None = None  # results of the whole job, sent with "done"/"cancelled"
@@ -0,0 +1,8 @@
+from sqlmodel import Field, SQLModel
+
+from app.models.common import TimestampModel
+
+
+class FilterVideoLink(TimestampModel, SQLModel, table=True):
+    filter_id: str = Field(default=None, foreign_key="filter.id", primary_key=True)
+    video_id: str = Field(default=None, foreign_key="video.id", primary_key=True, index=True)
@@ -55,6 +55,9 @@ class Settings(BaseSettings):
     TELEGRAM_API_TOKEN: str = ""
     TELEGRAM_CHAT_ID: int = 0
     NOTIFY_ON_START: bool = True
+    NOTIFY_DEDUP_SECONDS: int = 600  # drop identical notifications within this window
+    NOTIFY_DIGEST_SECONDS: int = 5  # combine notifications arriving within this window
+    NOTIFY_TELEGRAM_MAX_PER_MINUTE: int = 20
 
     # Project Settings
     PROJECT_NAME: str = "tubesubs"
@@ -63,4 +66,60 @@ class Settings(BaseSettings):
     VERSION: str = ""
 
     # Refresh Settings
-    REFRESH_SUBSCRIPTIONS_INTERVAL_MINUTES: int = 120
+    REFRESH_SUBSCRIPTIONS_INTERVAL_MINUTES: int = 120  # default fetch interval of a subscription
+
+    # Scheduler Settings
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_MAX_CONCURRENT_JOBS: int = 2  # max scheduled subscription fetches at the same time
+    SCHEDULER_JITTER_RATIO: float = 0.1  # random shift of the next fetch, fraction of the interval
+    SCHEDULER_MAX_BACKOFF_MINUTES: int = 1440  # max delay for repeatedly failing subscriptions
+
+    # Filter Settings
+    FILTER_BACKEND: str = "sql"  # "sql" compiles filters into queries, or "index" or "python"
+    FILTER_KEYWORD_FTS: bool = True  # match keyword criteria with the full-text index
+    FILTER_SNAPSHOT: bool = True  # evaluate "python" filters over numpy arrays
+    FILTER_CACHE_TTL_SECONDS: int = 300  # max age of cached filter results, 0 to disable
+    FILTER_CACHE_STALE_SECONDS: int = 30  # serve invalidated counts while they are recomputed
+
+    # Retention Settings
+    RETENTION_ENABLED: bool = True
+    RETENTION_INTERVAL_HOURS: float = 24  # time between two garbage collections
+    RETENTION_READ_VIDEO_MAX_AGE_DAYS: int = 0  # delete older read videos, 0 to keep them
+    RETENTION_BATCH_SIZE: int = 500  # max videos deleted per transaction
+    RETENTION_VACUUM: bool = True  # reclaim disk space after videos were deleted
+
+    # Fetch Settings
+    FETCH_CONCURRENCY: int = 4  # max subscriptions extracted by yt-dlp at the same time
+    FETCH_INCREMENTAL: bool = False  # stop reading a feed once known videos are reached
+    FETCH_INCREMENTAL_KNOWN_RUN: int = 5  # consecutive known videos that end a feed
+    FETCH_STREAMING: bool = False  # read feeds lazily and ingest them in batches
+    FETCH_BATCH_SIZE: int = 50  # videos per streamed batch
+    FETCH_STREAM_QUEUE_BATCHES: int = 2  # batches buffered between extraction and ingest
+    FETCH_FRESH_SECONDS: int = 0  # reuse the results of a subscription fetched this recently
+    FETCH_SUBSCRIPTION_TIMEOUT_SECONDS: int = 600  # abandon a subscription fetch, 0 to disable
+    FETCH_RUN_TIMEOUT_SECONDS: int = 3600  # stop a fetch run of many subscriptions, 0 to disable
+
+    # Circuit Breaker Settings
+    CIRCUIT_BREAKER_HANDLER_FAILURE_THRESHOLD: int = 5  # consecutive failures of a service
+    CIRCUIT_BREAKER_SUBSCRIPTION_FAILURE_THRESHOLD: int = 3  # consecutive failures of a feed
+    CIRCUIT_BREAKER_RESET_MINUTES: int = 30  # pause before a trial fetch
+
+    # Channel Logo Settings
+    CHANNEL_LOGO_WORKERS: int = 4  # max concurrent channel logo lookups
+    CHANNEL_LOGO_RETRY_AFTER_MINUTES: int = 360  # wait before retrying a failed lookup
+
+    # yt-dlp Settings
+    YTDLP_BACKEND: str = "inprocess"  # "inprocess", "pool" or "replay" (offline fixtures)
+    YTDLP_POOL_WORKERS: int = 2
+    YTDLP_POOL_MAX_TASKS_PER_WORKER: int = 50  # recycle a worker after N extractions
+    YTDLP_POOL_MAX_RSS_MB: int = 512  # recycle a worker above this RSS, 0 to disable
+    YTDLP_CACHE_ENABLED: bool = True  # cache info dicts under CACHE_PATH
+    YTDLP_CACHE_TTL_SECONDS: int = 300
+    YTDLP_CACHE_MAX_MB: int = 256  # evict least recently used info dicts above this size
+    YTDLP_RECORD_FIXTURES: bool = False  # save extracted info dicts under FIXTURES_PATH
+    YTDLP_REPLAY_SYNTHETIC_ENTRIES: int = 0  # entries of feeds without a fixture, 0 to disable
+    YTDLP_RATE_LIMIT_ENABLED: bool = True
+    YTDLP_RATE_LIMITS_PER_MINUTE: dict[str, float] = {"YoutubeHandler": 30, "RumbleHandler": 20}
+    YTDLP_RATE_LIMIT_DEFAULT_PER_MINUTE: float = 30  # services without their own rate
+    YTDLP_RATE_LIMIT_BURST: int = 5  # extractions allowed at once after an idle period
+    YTDLP_RATE_LIMIT_MIN_RATIO: float = 0.1  # lowest rate after throttling, as part of the rate
@@ -30,6 +30,10 @@ class SubscriptionBase(TimestampModel, SQLModel):
     service_handler: str = Field(default=None)
     subscription_handler: str = Field(default=None)
     max_videos_per_fetch: int = Field(nullable=False)
+    fetch_interval_minutes: int | None = Field(default=None)
+    next_fetch_at: datetime.datetime | None = Field(default=None, index=True)
+    last_fetched_at: datetime.datetime | None = Field(default=None)
+    fetch_failures: int = Field(default=0, nullable=False)
 
 
 class Subscription(SubscriptionBase, table=True):
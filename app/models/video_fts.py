@@ -0,0 +1,46 @@
+import sqlalchemy as sa
+
+from app.models.video import Video
+
+VIDEO_FTS_TABLE = "video_fts"
+
+# Full-text index of the titles and descriptions of the videos. It reads the content of
+# the video table by rowid and is kept in sync by triggers. Underscores are part of
+# words and diacritics are kept, like in the `\b` word boundaries of keyword criteria.
+VIDEO_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {VIDEO_FTS_TABLE} USING fts5(
+        title, description, content='video', content_rowid='rowid',
+        tokenize="unicode61 remove_diacritics 0 tokenchars '_'"
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS video_fts_insert AFTER INSERT ON video BEGIN
+        INSERT INTO {VIDEO_FTS_TABLE}(rowid, title, description)
+        VALUES (new.rowid, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS video_fts_delete AFTER DELETE ON video BEGIN
+        INSERT INTO {VIDEO_FTS_TABLE}({VIDEO_FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS video_fts_update AFTER UPDATE OF title, description ON video
+    BEGIN
+        INSERT INTO {VIDEO_FTS_TABLE}({VIDEO_FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, old.description);
+        INSERT INTO {VIDEO_FTS_TABLE}(rowid, title, description)
+        VALUES (new.rowid, new.title, new.description);
+    END
+    """,
+]
+
+# Databases created without migrations, e.g. by `SQLModel.metadata.create_all`
+for _ddl in VIDEO_FTS_DDL:
+    sa.event.listen(
+        Video.__table__,  # type: ignore[attr-defined]
+        "after_create",
+        sa.DDL(_ddl).execute_if(dialect="sqlite"),
+    )
@@ -19,6 +19,7 @@ LOGS_PATH = DATA_PATH / "logs"
 CACHE_PATH = DATA_PATH / "cache"
 COOKIES_PATH = DATA_PATH / "cookies"
 FEEDS_PATH = DATA_PATH / "feed"
+FIXTURES_PATH = DATA_PATH / "fixtures"
 
 # COOKIE FILES
 YOUTUBE_COOKIES_FILE = COOKIES_PATH / "youtube_cookies.txt"
@@ -26,5 +27,7 @@ YOUTUBE_COOKIES_FILE = COOKIES_PATH / "youtube_cookies.txt"
 # Files
 ENV_FILE = DATA_PATH / ".env"
 DATABASE_FILE = DATA_PATH / "database.sqlite3"
+FILTER_INDEX_CURRENT_FILE = DATA_PATH / "filter_index.current"
 LOG_FILE = LOGS_PATH / "log.log"
 ERROR_LOG_FILE = LOGS_PATH / "error_log.log"
+FETCH_STATS_LOG_FILE = LOGS_PATH / "fetch_stats.log"
@@ -0,0 +1,143 @@
+from typing import Any
+
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, SQLModel, create_engine
+
+from app import crud, logger, models
+from app.services.fetch import fetch_all_subscriptions
+from app.services.ytdlp_cache import info_dict_cache
+from app.services.ytdlp_replay import replay_backend
+
+BENCHMARK_SERVICE_HANDLER = "YoutubeHandler"
+BENCHMARK_SUBSCRIPTION_HANDLER = "YoutubeSubscriptionHandler"
+
+
+def get_peak_rss_bytes() -> int:
+    """
+    Get the peak resident set size of the current process.
+
+    Returns:
+        int: The peak RSS in bytes, or 0 if it cannot be determined.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return int(peak_rss if sys.platform == "darwin" else peak_rss * 1024)
+
+
+async def create_benchmark_subscriptions(
+    db: Session, subscriptions: int, entries: int
+) -> list[models.Subscription]:
+    """
+    Create one user with one subscription per benchmarked subscription.
+
+    Args:
+        db (Session): The database session.
+        subscriptions (int): The number of subscriptions to create.
+        entries (int): The max videos per fetch of every subscription.
+
+    Returns:
+        list[models.Subscription]: The created subscriptions.
+    """
+    db_subscriptions = []
+    for i in range(subscriptions):
+        db_user = await crud.user.create(
+            db=db,
+            obj_in=models.UserCreate(
+                username=f"benchmark{i}",
+                email=f"benchmark{i}@example.com",
+                hashed_password="!",
+            ),
+        )
+        db_subscription = await crud.subscription.create(
+            db=db,
+            obj_in=models.SubscriptionCreate(
+                service_handler=BENCHMARK_SERVICE_HANDLER,
+                subscription_handler=BENCHMARK_SUBSCRIPTION_HANDLER,
+                max_videos_per_fetch=entries,
+                created_by=db_user.id,
+            ),
+        )
+        db_subscriptions.append(db_subscription)
+    return db_subscriptions
+
+
+async def run_fetch_benchmark(
+    subscriptions: int, entries: int, rounds: int = 1, fixtures_path: Path | None = None
+) -> models.FetchBenchmarkResults:
+    """
+    Benchmark `fetch_all_subscriptions` against the replay backend and a scratch database.
+
+    Feeds are served from the recorded fixtures, and feeds without a fixture are synthetic
+    feeds of `entries` new videos, so every round ingests new videos. The info dict cache
+    is bypassed, and nothing is read from or written to the application database.
+
+    Args:
+        subscriptions (int): The number of subscriptions to fetch.
+        entries (int): The entries of a synthetic feed and the max videos per fetch.
+        rounds (int): How many times all subscriptions are fetched.
+        fixtures_path (Path | None): The directory of recorded fixtures. Defaults to the
+            directory the fixtures are recorded to.
+
+    Returns:
+        models.FetchBenchmarkResults: The results of the benchmark.
+    """
+    replay_state = (
+        replay_backend.enabled,
+        replay_backend.record,
+        replay_backend.path,
+        replay_backend.synthetic_entries,
+    )
+    cache_enabled = info_dict_cache.enabled
+    replay_backend.enabled, replay_backend.record = True, False
+    replay_backend.path = fixtures_path or replay_backend.path
+    replay_backend.synthetic_entries = entries
+    info_dict_cache.enabled = False
+
+    results = models.FetchBenchmarkResults(subscriptions=subscriptions, rounds=rounds)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(
+            f"sqlite:///{Path(tmp_dir) / 'benchmark.sqlite3'}",
+            connect_args={"check_same_thread": False},
+        )
+        SQLModel.metadata.create_all(bind=engine)
+        session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=Session)
+
+        def count_statement(*args: Any) -> None:
+            results.statements += 1
+
+        try:
+            with session_local() as db:
+                await create_benchmark_subscriptions(
+                    db=db, subscriptions=subscriptions, entries=entries
+                )
+                sa.event.listen(engine, "before_cursor_execute", count_statement)
+                for i in range(rounds):
+                    start = time.perf_counter()
+                    fetch_results = await fetch_all_subscriptions(db=db)
+                    results.seconds += time.perf_counter() - start
+                    results.added_videos += fetch_results.added_videos
+                    logger.info(
+                        f"Benchmark round {i + 1}/{rounds}: "
+                        f"added {fetch_results.added_videos} videos."
+                    )
+        finally:
+            if sa.event.contains(engine, "before_cursor_execute", count_statement):
+                sa.event.remove(engine, "before_cursor_execute", count_statement)
+            engine.dispose()
+            (
+                replay_backend.enabled,
+                replay_backend.record,
+                replay_backend.path,
+                replay_backend.synthetic_entries,
+            ) = replay_state
+            info_dict_cache.enabled = cache_enabled
+
+    results.peak_rss_bytes = get_peak_rss_bytes()
+    return results
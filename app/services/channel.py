@@ -1,28 +1,140 @@
 from typing import Any
 
+import asyncio
+import datetime
+
 from sqlmodel import Session
 
-from app import crud, logger
-from app.models.channel import Channel, ChannelUpdate
+from app import crud, logger, settings
+from app.models.channel import Channel
 from app.services.ytdlp import AccountNotFoundError, get_info_dict
 
 
-async def check_and_update_null_channel_logos(db: Session) -> None:
-    db_channels = await crud.channel.get_all(db=db)
+class ChannelLogoQueue:
+    def __init__(self, workers: int, retry_after: datetime.timedelta) -> None:
+        """
+        A deduplicated queue of channel logo lookups.
+
+        The queue is filled with the channels that have no logo and drained by a bounded
+        number of concurrent workers. Failed lookups are not retried before `retry_after`.
+
+        Args:
+            workers (int): Max number of concurrent logo lookups.
+            retry_after (datetime.timedelta): Time to wait before retrying a failed lookup.
+        """
+        self.workers = max(1, workers)
+        self.retry_after = retry_after
+        self.pending: dict[str, Channel] = {}
+        self.in_progress: set[str] = set()
+        self.failed_until: dict[str, datetime.datetime] = {}
+
+    def enqueue(self, db_channels: list[Channel]) -> None:
+        """
+        Add channels to the queue, skipping duplicates and channels that recently failed.
+
+        Args:
+            db_channels (list[Channel]): The channels to look up a logo for.
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        for db_channel in db_channels:
+            if db_channel.id in self.pending or db_channel.id in self.in_progress:
+                continue
+            if self.failed_until.get(db_channel.id, now) > now:
+                continue
+            self.pending[db_channel.id] = db_channel
+
+    async def drain(self, db: Session, write_lock: asyncio.Lock) -> int:
+        """
+        Enqueue all channels without a logo, then resolve the queued logos.
+
+        `write_lock` is only held to read the channels and to apply the resolved logos, not
+        during the lookups, so that fetches can write to the database meanwhile.
+
+        Args:
+            db (Session): The database session.
+            write_lock (asyncio.Lock): Lock held while the database session is used.
+
+        Returns:
+            int: The number of channels that were updated.
+        """
+        async with write_lock:
+            self.enqueue(db_channels=await crud.channel.get_multi_missing_logo(db=db))
+            if not self.pending:
+                return 0
+            # Copies that are not expired by commits made during the lookups
+            db_channels = [
+                Channel(
+                    id=db_channel.id,
+                    service_handler=db_channel.service_handler,
+                    remote_channel_id=db_channel.remote_channel_id,
+                    name=db_channel.name,
+                )
+                for db_channel in self.pending.values()
+            ]
+            self.pending.clear()
+        self.in_progress.update(db_channel.id for db_channel in db_channels)
 
-    for db_channel in db_channels:
-        if db_channel.logo:
-            continue
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def _get_channel_logo(db_channel: Channel) -> str | Exception:
+            async with semaphore:
+                try:
+                    return await get_channel_logo(db_channel=db_channel)
+                except Exception as e:  # pylint: disable=broad-except
+                    return e
 
         try:
-            channel_logo = await get_channel_logo(db_channel=db_channel)
-        except AccountNotFoundError as e:
-            logger.error(e)
-            await crud.channel.remove(db=db, id=db_channel.id)
-            continue
-
-        channel_update = ChannelUpdate(logo=channel_logo)
-        await crud.channel.update(db=db, id=db_channel.id, obj_in=channel_update)
+            channel_logos = await asyncio.gather(
+                *[_get_channel_logo(db_channel=db_channel) for db_channel in db_channels]
+            )
+        finally:
+            self.in_progress.difference_update(db_channel.id for db_channel in db_channels)
+
+        # Apply all results in a single transaction
+        updated_channels = 0
+        async with write_lock:
+            for db_channel, channel_logo in zip(db_channels, channel_logos):
+                if isinstance(channel_logo, Exception) and not isinstance(
+                    channel_logo, AccountNotFoundError
+                ):
+                    logger.warning(
+                        f"Could not get logo for {db_channel.__repr__()}. {channel_logo=}"
+                    )
+                    self.failed_until[db_channel.id] = (
+                        datetime.datetime.now(tz=datetime.timezone.utc) + self.retry_after
+                    )
+                    continue
+                # The channel may have been deleted during the lookup
+                db_channel_to_update = db.get(Channel, db_channel.id)
+                if db_channel_to_update is None:
+                    continue
+                if isinstance(channel_logo, AccountNotFoundError):
+                    logger.error(channel_logo)
+                    db.delete(db_channel_to_update)
+                else:
+                    db_channel_to_update.logo = channel_logo
+                    self.failed_until.pop(db_channel.id, None)
+                    updated_channels += 1
+            db.commit()
+        return updated_channels
+
+
+channel_logo_queue = ChannelLogoQueue(
+    workers=settings.CHANNEL_LOGO_WORKERS,
+    retry_after=datetime.timedelta(minutes=settings.CHANNEL_LOGO_RETRY_AFTER_MINUTES),
+)
+
+
+async def check_and_update_null_channel_logos(db: Session, write_lock: asyncio.Lock) -> None:
+    """
+    Resolve the logos of all channels that do not have one yet.
+
+    Args:
+        db (Session): The database session.
+        write_lock (asyncio.Lock): Lock held while the database session is used, but not
+            during the lookups.
+    """
+    await channel_logo_queue.drain(db=db, write_lock=write_lock)
 
 
 async def get_channel_logo(db_channel: Channel) -> str:
@@ -0,0 +1,104 @@
+from collections.abc import Iterable
+
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app.models.channel import Channel
+from app.models.channel_tag_link import ChannelTagLink
+from app.models.tag import Tag
+
+
+class ChannelTags:
+    def __init__(self, tag_bits: dict[str, int], channel_masks: dict[str, int]) -> None:
+        """
+        The tags of all channels as bitmasks, with one bit per tag.
+
+        Args:
+            tag_bits (dict[str, int]): The bit of each tag, by tag name.
+            channel_masks (dict[str, int]): The mask of the tags of each channel, by remote
+                channel id. Untagged channels are left out, their mask is 0.
+        """
+        self.tag_bits = tag_bits
+        self.channel_masks = channel_masks
+
+    def get_tags_mask(self, tag_names: Iterable[str]) -> int:
+        """
+        Get the mask of tags. Unknown tags are ignored.
+
+        Args:
+            tag_names (Iterable[str]): The tag names.
+
+        Returns:
+            int: The mask.
+        """
+        mask = 0
+        for tag_name in tag_names:
+            mask |= self.tag_bits.get(tag_name, 0)
+        return mask
+
+    def get_channel_mask(self, remote_channel_id: str) -> int:
+        """
+        Get the mask of the tags of a channel.
+
+        Args:
+            remote_channel_id (str): The remote id of the channel.
+
+        Returns:
+            int: The mask. 0 if the channel has no tags.
+        """
+        return self.channel_masks.get(remote_channel_id, 0)
+
+
+def load_channel_tags(db: Session) -> ChannelTags:
+    """
+    Load the tags of all channels with one query per table.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        ChannelTags: The tags of the channels.
+    """
+    tag_ids: dict[str, int] = {}
+    tag_bits: dict[str, int] = {}
+    for tag_id, tag_name in db.execute(sa.select(Tag.id, Tag.name).order_by(Tag.id)):
+        tag_ids[tag_id] = 1 << len(tag_ids)
+        tag_bits[tag_name] = tag_bits.get(tag_name, 0) | tag_ids[tag_id]
+
+    channel_masks: dict[str, int] = {}
+    links = sa.select(Channel.remote_channel_id, ChannelTagLink.tag_id).join(
+        ChannelTagLink, ChannelTagLink.channel_id == Channel.id  # type: ignore[arg-type]
+    )
+    for remote_channel_id, tag_id in db.execute(links):
+        channel_masks[remote_channel_id] = channel_masks.get(remote_channel_id, 0) | tag_ids.get(
+            tag_id, 0
+        )
+    return ChannelTags(tag_bits=tag_bits, channel_masks=channel_masks)
+
+
+class ChannelTagIndex:
+    def __init__(self) -> None:
+        """
+        Keeps the tags of all channels as bitmasks until tags or their channels change.
+        """
+        self._channel_tags: ChannelTags | None = None
+
+    def invalidate(self) -> None:
+        self._channel_tags = None
+
+    def get(self, db: Session) -> ChannelTags:
+        """
+        Get the tags of all channels, loading them if they changed.
+
+        Args:
+            db (Session): The database session.
+
+        Returns:
+            ChannelTags: The tags of the channels.
+        """
+        if self._channel_tags is None:
+            self._channel_tags = load_channel_tags(db=db)
+        return self._channel_tags
+
+
+channel_tag_index = ChannelTagIndex()
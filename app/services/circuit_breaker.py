@@ -0,0 +1,174 @@
+import time
+from collections import Counter
+
+from yt_dlp.utils import YoutubeDLError
+
+from app import logger, settings
+from app.core.notify import dispatcher
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(YoutubeDLError):
+    """
+    Raised when an extraction is skipped because its circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout_seconds: float) -> None:
+        """
+        A circuit breaker that stops calls to a failing service.
+
+        The breaker opens after `failure_threshold` consecutive failures. While it is open,
+        calls are rejected. After `reset_timeout_seconds` it is half-open and lets a single
+        trial call through: a success closes it again, a failure re-opens it.
+
+        Args:
+            name (str): The name of the protected service, used in logs and alerts.
+            failure_threshold (int): Consecutive failures that open the breaker.
+            reset_timeout_seconds (float): Seconds the breaker stays open before a trial call.
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.errors: Counter[str] = Counter()
+        self.opened_at = 0.0
+        self.trial_in_progress = False
+
+    def allow(self) -> bool:
+        """
+        Check if a call may be made, moving an expired open breaker to half-open.
+
+        Returns:
+            bool: True if the call may be made.
+        """
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_seconds:
+            self.state = HALF_OPEN
+            self.trial_in_progress = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.trial_in_progress:
+            self.trial_in_progress = True
+            return True
+        return False
+
+    def cancel_trial(self) -> None:
+        """
+        Give back a trial call that was allowed but not made.
+        """
+        self.trial_in_progress = False
+
+    def record_success(self) -> bool:
+        """
+        Record a successful call.
+
+        Returns:
+            bool: True if this closed a half-open breaker.
+        """
+        recovered = self.state != CLOSED
+        self.state = CLOSED
+        self.failures = 0
+        self.errors.clear()
+        self.trial_in_progress = False
+        return recovered
+
+    def record_failure(self, error: BaseException) -> bool:
+        """
+        Record a failed call.
+
+        Args:
+            error (BaseException): The error of the call.
+
+        Returns:
+            bool: True if this opened a closed breaker.
+        """
+        self.failures += 1
+        self.errors[error.__class__.__name__] += 1
+        self.trial_in_progress = False
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            tripped = self.state == CLOSED
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            return tripped
+        return False
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, failure_threshold: int, reset_timeout_seconds: float) -> None:
+        """
+        Creates and keeps one circuit breaker per key.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open a breaker.
+            reset_timeout_seconds (float): Seconds a breaker stays open before a trial call.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, key: str, name: str | None = None) -> CircuitBreaker:
+        """
+        Get the breaker for a key, creating a closed one if needed.
+
+        Args:
+            key (str): The key of the protected service.
+            name (str | None): The name used in logs and alerts. Defaults to the key.
+
+        Returns:
+            CircuitBreaker: The breaker.
+        """
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name=name or key,
+                failure_threshold=self.failure_threshold,
+                reset_timeout_seconds=self.reset_timeout_seconds,
+            )
+            self.breakers[key] = breaker
+        return breaker
+
+
+def notify_circuit_opened(breaker: CircuitBreaker, error: BaseException) -> None:
+    """
+    Send a single alert for a breaker that just opened.
+
+    Args:
+        breaker (CircuitBreaker): The breaker that opened.
+        error (BaseException): The error of the failure that opened it.
+    """
+    errors = ", ".join(f"{name} x{count}" for name, count in breaker.errors.most_common())
+    err_msg = (
+        f"Paused fetching '{breaker.name}' for {breaker.reset_timeout_seconds / 60:.0f} minutes "
+        f"after {breaker.failures} consecutive failures ({errors}). Last error: {error}"
+    )
+    logger.critical(err_msg)
+    dispatcher.dispatch(telegram=True, email=False, text=err_msg)
+
+
+def notify_circuit_closed(breaker: CircuitBreaker) -> None:
+    """
+    Send an alert for a breaker that recovered.
+
+    Args:
+        breaker (CircuitBreaker): The breaker that closed.
+    """
+    msg = f"Resumed fetching '{breaker.name}'."
+    logger.success(msg)
+    dispatcher.dispatch(telegram=True, email=False, text=msg)
+
+
+handler_breakers = CircuitBreakerRegistry(
+    failure_threshold=settings.CIRCUIT_BREAKER_HANDLER_FAILURE_THRESHOLD,
+    reset_timeout_seconds=settings.CIRCUIT_BREAKER_RESET_MINUTES * 60,
+)
+subscription_breakers = CircuitBreakerRegistry(
+    failure_threshold=settings.CIRCUIT_BREAKER_SUBSCRIPTION_FAILURE_THRESHOLD,
+    reset_timeout_seconds=settings.CIRCUIT_BREAKER_RESET_MINUTES * 60,
+)
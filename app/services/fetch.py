@@ -1,17 +1,35 @@
+from typing import Any, Callable, Coroutine
+
 import asyncio
+import time
+from collections import Counter
 
+from loguru import logger as _logger
+from sqlalchemy.engine import Connection, Engine
 from sqlmodel import Session
+from yt_dlp.utils import YoutubeDLError
 
-from app import crud, logger
-from app.models import FetchResults
+from app import crud, logger, settings
+from app.db.session import SessionLocal
+from app.models import FetchResults, Subscription, SubscriptionFetchStats
 from app.services.channel import check_and_update_null_channel_logos
+from app.services.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    handler_breakers,
+    notify_circuit_closed,
+    notify_circuit_opened,
+    subscription_breakers,
+)
 
 # from app.services.feed import build_subscription_rss_files
+from app.services.rate_limit import track_rate_limit_wait
 from app.services.subscription import (
-    add_new_subscription_info_dict_videos_to_subscription,
-    get_subscription_info_dict,
+    add_new_videos_to_subscription,
+    fetch_subscription_videos,
+    stream_new_videos_to_subscription,
 )
-from app.services.ytdlp import NoUploadsError
+from app.services.ytdlp import YDL_CONTENT_ERRORS, NoUploadsError
 
 
 class FetchError(Exception):
@@ -26,6 +44,250 @@ class FetchCanceledError(FetchError):
     """
 
 
+class FetchTimeoutError(FetchError):
+    """
+    Raised when a fetch does not finish before its deadline.
+    """
+
+
+class FetchRunCanceledError(FetchError):
+    """
+    Recorded for the subscriptions of a fetch run that was cancelled before they were fetched.
+    """
+
+
+fetch_stats_logger = _logger.bind(name="fetch_stats")
+
+
+class FetchStatus:
+    def __init__(self) -> None:
+        """
+        Keeps the stats of the latest fetch of each subscription.
+        """
+        self.latest: dict[str, SubscriptionFetchStats] = {}
+
+    def record(self, stats: SubscriptionFetchStats) -> None:
+        """
+        Store the stats of a subscription fetch and log them as structured data.
+
+        Args:
+            stats (SubscriptionFetchStats): The stats of the fetch.
+        """
+        self.latest[stats.subscription_id] = stats
+        fetch_stats_logger.bind(**stats.dict(), total_seconds=stats.total_seconds).info(
+            f"Fetched {stats.subscription} in {stats.total_seconds:.2f}s"
+        )
+
+    def get_all(self) -> list[SubscriptionFetchStats]:
+        """
+        Get the stats of the latest fetch of each subscription.
+
+        Returns:
+            list[SubscriptionFetchStats]: The stats, slowest fetch first.
+        """
+        return sorted(self.latest.values(), key=lambda stats: stats.total_seconds, reverse=True)
+
+
+fetch_status = FetchStatus()
+
+
+class SingleFlight:
+    def __init__(
+        self, fresh_seconds: float = 0, session_factory: Callable[..., Session] = SessionLocal
+    ) -> None:
+        """
+        Coalesces concurrent fetches of the same key into a single fetch.
+
+        The first caller starts the fetch, later callers await it and get the same results
+        or error. A caller that is cancelled stops waiting, and the fetch is only cancelled
+        once all of its callers are. Results of successful fetches are reused for
+        `fresh_seconds`.
+
+        The fetch runs with its own database session, as the session of the caller that
+        started it may be closed while other callers still wait. The session is bound to the
+        database of that caller.
+
+        Args:
+            fresh_seconds (float): Seconds the results of a fetch are reused. 0 disables it.
+            session_factory (Callable[..., Session]): Creates the database session of a fetch.
+                Takes the `bind` of the session as keyword argument.
+        """
+        self.fresh_seconds = fresh_seconds
+        self.session_factory = session_factory
+        self.in_flight: dict[str, asyncio.Task[FetchResults]] = {}
+        self.completed: dict[str, tuple[float, FetchResults]] = {}
+        self._waiters: Counter[asyncio.Task[FetchResults]] = Counter()
+
+    def _on_done(self, key: str, task: asyncio.Task[FetchResults]) -> None:
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled() and task.exception() is None:
+            self.completed[key] = (time.monotonic(), task.result())
+
+    async def _run_fetch(
+        self,
+        fetch: Callable[[Session], Coroutine[Any, Any, FetchResults]],
+        bind: Engine | Connection | None,
+    ) -> FetchResults:
+        db = self.session_factory() if bind is None else self.session_factory(bind=bind)
+        try:
+            return await fetch(db)
+        finally:
+            db.close()
+
+    async def run(
+        self,
+        key: str,
+        fetch: Callable[[Session], Coroutine[Any, Any, FetchResults]],
+        bind: Engine | Connection | None = None,
+    ) -> FetchResults:
+        """
+        Run a fetch, or join the fetch of the key that is already running.
+
+        Args:
+            key (str): The key of the fetch, e.g. a subscription id.
+            fetch (Callable[[Session], Coroutine[Any, Any, FetchResults]]): Starts the
+                fetch with the database session it is given.
+            bind (Engine | Connection | None): The database of the session of the fetch.
+                Defaults to the one of the session factory.
+
+        Returns:
+            FetchResults: The results of the fetch.
+        """
+        completed = self.completed.get(key)
+        if completed is not None and time.monotonic() - completed[0] < self.fresh_seconds:
+            logger.debug(f"Skipped fetching '{key}'. It was fetched recently.")
+            return completed[1]
+
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run_fetch(fetch=fetch, bind=bind))
+            task.add_done_callback(lambda task: self._on_done(key=key, task=task))
+            self.in_flight[key] = task
+        else:
+            logger.debug(f"Joined the running fetch of '{key}'.")
+
+        self._waiters[task] += 1
+        try:
+            # Shielded, so a cancelled caller does not cancel the fetch of other callers
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] <= 0:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+
+
+subscription_fetches = SingleFlight(fresh_seconds=settings.FETCH_FRESH_SECONDS)
+
+
+# Serializes database writes of concurrently running subscription fetches and background
+# jobs, as SQLite has a single writer. Logo lookups of a fetch run share its Session.
+db_write_lock = asyncio.Lock()
+
+
+async def fetch_subscriptions(
+    db: Session,
+    subscriptions: list[Subscription],
+    on_progress: Callable[[str, FetchResults], None] | None = None,
+    cancel_event: asyncio.Event | None = None,
+    use_cache: bool = True,
+) -> FetchResults:
+    """
+    Fetch a list of subscriptions concurrently.
+
+    At most `settings.FETCH_CONCURRENCY` subscriptions are fetched at the same time.
+    Subscriptions whose fetch is cancelled are skipped and do not count towards the results.
+
+    The run stops after `settings.FETCH_RUN_TIMEOUT_SECONDS`, or when `cancel_event` is set.
+    Fetches that are still running or waiting are then cancelled and counted as
+    `FetchTimeoutError` or `FetchRunCanceledError`. Videos of finished fetches are kept.
+
+    Args:
+        db (Session): The database session.
+        subscriptions (list[Subscription]): The subscriptions to fetch.
+        on_progress (Callable[[str, FetchResults], None] | None): Called with the id and the
+            results of each subscription as soon as its fetch completes or is cancelled.
+        cancel_event (asyncio.Event | None): Set to cancel the run.
+        use_cache (bool): Whether cached info dicts may be used. Set to False for fetches
+            requested by the user, who expects the current feeds.
+
+    Returns:
+        models.FetchResults: The combined results of the fetches.
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.FETCH_CONCURRENCY))
+
+    async def _fetch(subscription_id: str) -> FetchResults:
+        async with semaphore:
+            try:
+                results = await fetch_subscription(
+                    id=subscription_id, db=db, resolve_channel_logos=False, use_cache=use_cache
+                )
+            except FetchCanceledError as e:
+                error = e.__cause__ or e
+                results = FetchResults(errors={error.__class__.__name__: 1})
+        if on_progress is not None:
+            on_progress(subscription_id, results)
+        return results
+
+    subscription_ids = [subscription.id for subscription in subscriptions]
+    tasks = {
+        asyncio.create_task(_fetch(subscription_id=subscription_id)): subscription_id
+        for subscription_id in subscription_ids
+    }
+
+    # Wait for all fetches, the run deadline or a cancellation, whichever comes first
+    stops: list[asyncio.Task[Any]] = []
+    if tasks:
+        stops.append(asyncio.create_task(asyncio.wait(tasks)))
+    if cancel_event is not None:
+        stops.append(asyncio.create_task(cancel_event.wait()))
+    try:
+        if stops:
+            await asyncio.wait(
+                stops,
+                timeout=settings.FETCH_RUN_TIMEOUT_SECONDS or None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+    finally:
+        for stop in stops:
+            stop.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*stops, *tasks, return_exceptions=True)
+
+    results = FetchResults()
+    stopped_by = (
+        FetchRunCanceledError
+        if cancel_event is not None and cancel_event.is_set()
+        else FetchTimeoutError
+    )
+    for task, subscription_id in tasks.items():
+        if task.cancelled():
+            subscription_fetch_results = FetchResults(errors={stopped_by.__name__: 1})
+            if on_progress is not None:
+                on_progress(subscription_id, subscription_fetch_results)
+        else:
+            subscription_fetch_results = task.result()
+        results += subscription_fetch_results
+    if results.errors.get(stopped_by.__name__):
+        logger.warning(
+            f"Stopped the fetch run with {results.errors[stopped_by.__name__]} subscriptions "
+            f"left unfetched ({stopped_by.__name__})."
+        )
+
+    # Resolve missing channel logos once for the whole run
+    start = time.perf_counter()
+    await check_and_update_null_channel_logos(db=db, write_lock=db_write_lock)
+    results.logo_seconds += time.perf_counter() - start
+
+    fetch_stats_logger.bind(**results.dict(exclude={"stats"})).info(
+        f"Completed fetch run of {results.subscriptions} subscriptions"
+    )
+    return results
+
+
 async def fetch_all_subscriptions(db: Session) -> FetchResults:
     """
     Fetch all subscriptions.
@@ -38,20 +300,7 @@ async def fetch_all_subscriptions(db: Session) -> FetchResults:
     """
     logger.info("Fetching ALL Subscriptions...")
     subscriptions = await crud.subscription.get_all(db=db) or []
-    results = FetchResults()
-
-    for _subscription in subscriptions:
-        # if _subscription.is_deleted or _subscription.is_active is False:
-        #     continue
-        try:
-            subscription_fetch_results = await fetch_subscription(id=_subscription.id, db=db)
-        except FetchCanceledError:
-            continue
-
-        results += subscription_fetch_results
-
-        # Allow other tasks to run
-        await asyncio.sleep(0)
+    results = await fetch_subscriptions(db=db, subscriptions=subscriptions)
 
     success_message = (
         f"Completed fetching All ({results.subscriptions}) Subscriptions. "
@@ -63,13 +312,14 @@ async def fetch_all_subscriptions(db: Session) -> FetchResults:
     return results
 
 
-async def fetch_filter(db: Session, filter_id: str) -> FetchResults:
+async def fetch_filter(db: Session, filter_id: str, use_cache: bool = True) -> FetchResults:
     """
     Fetch new data from yt-dlp for the filter and update the filter in the database.
 
     Args:
         db (Session): The database session.
         id: The id of the filter to fetch and update.
+        use_cache (bool): Whether cached info dicts may be used.
 
     Returns:
         models.FetchResult: The result of the fetch.
@@ -80,17 +330,9 @@ async def fetch_filter(db: Session, filter_id: str) -> FetchResults:
     info_message = f"Fetching {db_filter.__repr__()}"
     logger.info(info_message)
 
-    results = FetchResults()
-    for subscription in db_filter.subscriptions:
-        try:
-            subscription_fetch_results = await fetch_subscription(id=subscription.id, db=db)
-        except FetchCanceledError:
-            continue
-
-        results += subscription_fetch_results
-
-        # Allow other tasks to run
-        await asyncio.sleep(0)
+    results = await fetch_subscriptions(
+        db=db, subscriptions=db_filter.subscriptions, use_cache=use_cache
+    )
 
     success_message = (
         f"Completed fetching {db_filter.__repr__()}. Added {results.added_videos} new videos. "
@@ -100,13 +342,16 @@ async def fetch_filter(db: Session, filter_id: str) -> FetchResults:
     return results
 
 
-async def fetch_filter_group(db: Session, filter_group_id: str) -> FetchResults:
+async def fetch_filter_group(
+    db: Session, filter_group_id: str, use_cache: bool = True
+) -> FetchResults:
     """
     Fetch new data from yt-dlp for the filter and update the filter in the database.
 
     Args:
         db (Session): The database session.
         id: The id of the filter to fetch and update.
+        use_cache (bool): Whether cached info dicts may be used.
 
     Returns:
         models.FetchResult: The result of the fetch.
@@ -119,17 +364,9 @@ async def fetch_filter_group(db: Session, filter_group_id: str) -> FetchResults:
 
     # Get Subscriptions from Filter Group
 
-    results = FetchResults()
-    for subscription in db_filter_group.subscriptions:
-        try:
-            subscription_fetch_results = await fetch_subscription(id=subscription.id, db=db)
-        except FetchCanceledError:
-            continue
-
-        results += subscription_fetch_results
-
-        # Allow other tasks to run
-        await asyncio.sleep(0)
+    results = await fetch_subscriptions(
+        db=db, subscriptions=db_filter_group.subscriptions, use_cache=use_cache
+    )
 
     success_message = f"Completed fetching {db_filter_group.__repr__()}. Added {results.added_videos} new videos. "
     logger.success(success_message)
@@ -137,53 +374,201 @@ async def fetch_filter_group(db: Session, filter_group_id: str) -> FetchResults:
     return results
 
 
+def record_fetch_success(breakers: list[CircuitBreaker]) -> None:
+    """
+    Record a successful fetch on its circuit breakers.
+
+    Args:
+        breakers (list[CircuitBreaker]): The subscription and handler breakers.
+    """
+    for breaker in breakers:
+        if breaker.record_success():
+            notify_circuit_closed(breaker=breaker)
+
+
+def record_fetch_failure(
+    subscription_breaker: CircuitBreaker, handler_breaker: CircuitBreaker, error: Exception
+) -> None:
+    """
+    Record a failed fetch on its circuit breakers.
+
+    Every error counts against the subscription. Only errors of the service itself count
+    against the handler; errors about the requested content show that the service works.
+
+    Args:
+        subscription_breaker (CircuitBreaker): The breaker of the subscription.
+        handler_breaker (CircuitBreaker): The breaker of the subscription's service handler.
+        error (Exception): The error of the fetch.
+    """
+    if subscription_breaker.record_failure(error=error):
+        notify_circuit_opened(breaker=subscription_breaker, error=error)
+
+    if isinstance(error, YDL_CONTENT_ERRORS):
+        record_fetch_success(breakers=[handler_breaker])
+    elif isinstance(error, YoutubeDLError):
+        if handler_breaker.record_failure(error=error):
+            notify_circuit_opened(breaker=handler_breaker, error=error)
+    else:
+        handler_breaker.cancel_trial()
+
+
 async def fetch_subscription(
-    db: Session, id: str, ignore_video_refresh: bool = False
+    db: Session,
+    id: str,
+    ignore_video_refresh: bool = False,
+    resolve_channel_logos: bool = True,
+    use_cache: bool = True,
 ) -> FetchResults:
     """
     Fetch new data from yt-dlp for the subscription and update the subscription in the database.
 
+    Concurrent calls for the same subscription share a single fetch, and a subscription that
+    was fetched less than `settings.FETCH_FRESH_SECONDS` ago is not fetched again. Missing
+    channel logos are resolved for each caller that asks for them, after the shared fetch.
+
+    Args:
+        db (Session): The database session of the caller, to resolve the channel logos with.
+            The shared fetch uses a session of its own on the same database.
+        id: The id of the subscription to fetch and update.
+        resolve_channel_logos (bool): Whether to resolve missing channel logos afterwards.
+            Set to False when the caller resolves them once for a whole fetch run.
+        use_cache (bool): Whether a cached info dict may be used. A caller that joins a
+            running fetch gets its results either way.
+
+    Returns:
+        models.FetchResult: The result of the fetch.
+
+    Raises:
+        FetchCanceledError: If the fetch failed or was skipped by a circuit breaker.
+    """
+    results = await subscription_fetches.run(
+        key=id,
+        fetch=lambda fetch_db: _fetch_subscription(
+            db=fetch_db, id=id, ignore_video_refresh=ignore_video_refresh, use_cache=use_cache
+        ),
+        bind=db.get_bind(),
+    )
+    if resolve_channel_logos:
+        start = time.perf_counter()
+        await check_and_update_null_channel_logos(db=db, write_lock=db_write_lock)
+        # The shared results are left as they are for the other callers
+        results = results + FetchResults(logo_seconds=time.perf_counter() - start)
+    return results
+
+
+async def _fetch_subscription(
+    db: Session, id: str, ignore_video_refresh: bool = False, use_cache: bool = True
+) -> FetchResults:
+    """
+    Fetch new data from yt-dlp for the subscription and update the subscription in the database.
+
+    The fetch is skipped while the circuit breaker of the subscription or of its service
+    handler is open.
+
     Args:
         db (Session): The database session.
         id: The id of the subscription to fetch and update.
+        use_cache (bool): Whether a cached info dict may be used.
 
     Returns:
         models.FetchResult: The result of the fetch.
+
+    Raises:
+        FetchCanceledError: If the fetch failed or was skipped by a circuit breaker.
     """
 
     db_subscription = await crud.subscription.get(id=id, db=db)
 
     info_message = f"Fetching {db_subscription.__repr__()}"
     logger.info(info_message)
+    stats = SubscriptionFetchStats(
+        subscription_id=db_subscription.id, subscription=db_subscription.__repr__()
+    )
 
-    # Fetch subscription information from yt-dlp and create the subscription object
+    # Skip the extraction while the subscription or its service is failing
+    subscription_breaker = subscription_breakers.get(
+        key=db_subscription.id, name=db_subscription.__repr__()
+    )
+    handler_breaker = handler_breakers.get(key=db_subscription.service_handler)
+    breakers = [subscription_breaker, handler_breaker]
+    allowed = [breaker.allow() for breaker in breakers]
+    if not all(allowed):
+        for breaker, is_allowed in zip(breakers, allowed):
+            if is_allowed:
+                breaker.cancel_trial()
+        open_breaker = breakers[allowed.index(False)]
+        logger.info(f"Skipped {db_subscription.__repr__()}. '{open_breaker.name}' is paused.")
+        raise FetchCanceledError from CircuitOpenError(f"'{open_breaker.name}' is paused.")
+
+    # Fetch subscription videos from yt-dlp, abandoning the extraction after the deadline.
+    # Time spent waiting for the rate limiters is counted as part of the extraction.
+    fetched_videos = None
+    timeout = settings.FETCH_SUBSCRIPTION_TIMEOUT_SECONDS or None
     try:
-        subscription_info_dict = await get_subscription_info_dict(
-            db_subscription=db_subscription,
-            reverse_import_order=True,
-        )
+        with track_rate_limit_wait() as rate_limit_wait:
+            try:
+                if settings.FETCH_STREAMING:
+                    # Videos are added to the subscription batch by batch while the feed is read
+                    added_videos, skipped_entries = await asyncio.wait_for(
+                        stream_new_videos_to_subscription(
+                            db=db,
+                            db_subscription=db_subscription,
+                            write_lock=db_write_lock,
+                            stats=stats,
+                            use_cache=use_cache,
+                        ),
+                        timeout=timeout,
+                    )
+                else:
+                    fetched_videos, skipped_entries = await asyncio.wait_for(
+                        fetch_subscription_videos(
+                            db=db, db_subscription=db_subscription, stats=stats, use_cache=use_cache
+                        ),
+                        timeout=timeout,
+                    )
+            except asyncio.TimeoutError as e:
+                raise FetchTimeoutError(
+                    f"Fetching {db_subscription.__repr__()} timed out after {timeout}s."
+                ) from e
+            finally:
+                stats.rate_limit_wait_seconds = rate_limit_wait.seconds
     except (NoUploadsError, Exception) as e:
         logger.error(e)
+        stats.error = e.__class__.__name__
+        fetch_status.record(stats=stats)
+        record_fetch_failure(
+            subscription_breaker=subscription_breaker, handler_breaker=handler_breaker, error=e
+        )
         raise FetchCanceledError from e
+    record_fetch_success(breakers=breakers)
 
-    # Use subscription_info_dict to add new videos to the subscription
-    new_videos = await add_new_subscription_info_dict_videos_to_subscription(
-        db=db, subscription_info_dict=subscription_info_dict, db_subscription=db_subscription
-    )
+    # Add new videos to the subscription
+    if fetched_videos is not None:
+        async with db_write_lock:
+            with stats.measure("ingest"):
+                new_videos = await add_new_videos_to_subscription(
+                    db=db, fetched_videos=fetched_videos, db_subscription=db_subscription
+                )
+        added_videos = len(new_videos)
+        stats.entries_new = added_videos
 
-    # Check channels for missing logos
-    await check_and_update_null_channel_logos(db=db)
+    stats.skipped_entries = skipped_entries
+    fetch_status.record(stats=stats)
 
     # Build RSS Files
     # await build_subscription_rss_files(subscription=db_subscription)
 
     success_message = (
-        f"Completed fetching {db_subscription.__repr__()}. Added {len(new_videos)} new videos. "
+        f"Completed fetching {db_subscription.__repr__()}. Added {added_videos} new videos. "
     )
     logger.success(success_message)
 
     return FetchResults(
         subscriptions=1,
-        added_videos=len(new_videos),
+        added_videos=added_videos,
         deleted_videos=0,
+        skipped_entries=skipped_entries,
+        entries_seen=stats.entries_seen,
+        rate_limit_wait_seconds=stats.rate_limit_wait_seconds,
+        stats=[stats],
     )
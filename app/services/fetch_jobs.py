@@ -0,0 +1,235 @@
+from typing import Callable
+
+import asyncio
+import datetime
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+
+from sqlmodel import Session
+
+from app import crud, logger
+from app.core.uuid import generate_uuid_random
+from app.db.session import SessionLocal
+from app.models import FetchJobEvent, FetchResults
+from app.services.fetch import fetch_subscriptions
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class FetchJobNotFoundError(Exception):
+    """
+    Raised when a fetch job does not exist or was already forgotten.
+    """
+
+
+class FetchJob:
+    def __init__(self, id: str, title: str) -> None:
+        """
+        A fetch of all subscriptions running in the background.
+
+        Every state change is stored as a `FetchJobEvent`, so listeners that connect late
+        still receive the whole progress of the job.
+
+        Args:
+            id (str): The id of the job.
+            title (str): What is fetched, shown to the user.
+        """
+        self.id = id
+        self.title = title
+        self.status = PENDING
+        self.created_at = datetime.datetime.utcnow()
+        self.done = 0
+        self.total = 0
+        self.results: FetchResults | None = None
+        self.events: list[FetchJobEvent] = []
+        self.task: asyncio.Task[None] | None = None
+        self.cancel_event = asyncio.Event()
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, CANCELLED, FAILED)
+
+    def add_event(self, event: FetchJobEvent) -> None:
+        """
+        Store an event and wake up the listeners.
+
+        Args:
+            event (FetchJobEvent): The event.
+        """
+        self.events.append(event)
+        # Listeners wait on the old event, later listeners on the new one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def iter_events(self) -> AsyncGenerator[FetchJobEvent, None]:
+        """
+        Iterate the events of the job, from the first one, until the job is finished.
+
+        Yields:
+            FetchJobEvent: The events in order.
+        """
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+
+class FetchJobManager:
+    def __init__(
+        self, session_factory: Callable[[], Session] = SessionLocal, max_jobs: int = 20
+    ) -> None:
+        """
+        Runs fetch jobs in the background and keeps the latest jobs for their listeners.
+
+        Args:
+            session_factory (Callable[[], Session]): Creates the database session of a job.
+            max_jobs (int): Number of jobs that are kept. Older finished jobs are forgotten.
+        """
+        self.session_factory = session_factory
+        self.max_jobs = max_jobs
+        self.jobs: OrderedDict[str, FetchJob] = OrderedDict()
+
+    def get(self, job_id: str) -> FetchJob:
+        """
+        Get a job.
+
+        Args:
+            job_id (str): The id of the job.
+
+        Returns:
+            FetchJob: The job.
+
+        Raises:
+            FetchJobNotFoundError: If the job does not exist.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise FetchJobNotFoundError(f"Fetch job {job_id} not found.")
+        return job
+
+    def cancel(self, job_id: str) -> FetchJob:
+        """
+        Cancel a running job.
+
+        Subscriptions that are still being fetched are abandoned, videos of the
+        subscriptions that were already fetched are kept.
+
+        Args:
+            job_id (str): The id of the job.
+
+        Returns:
+            FetchJob: The job.
+
+        Raises:
+            FetchJobNotFoundError: If the job does not exist.
+        """
+        job = self.get(job_id=job_id)
+        if not job.finished:
+            logger.info(f"Cancelling fetch job '{job.title}' ({job.id})...")
+            job.cancel_event.set()
+        return job
+
+    def start_fetch_all(self, title: str) -> FetchJob:
+        """
+        Start fetching all subscriptions in the background.
+
+        If a job is still running, no new job is started.
+
+        Args:
+            title (str): What is fetched, shown to the user.
+
+        Returns:
+            FetchJob: The started job, or the job that is still running.
+        """
+        for running_job in self.jobs.values():
+            if not running_job.finished:
+                return running_job
+
+        job = FetchJob(id=generate_uuid_random(), title=title)
+        self.jobs[job.id] = job
+        for old_job_id in [job_id for job_id, old_job in self.jobs.items() if old_job.finished]:
+            if len(self.jobs) <= self.max_jobs:
+                break
+            del self.jobs[old_job_id]
+
+        job.task = asyncio.create_task(self.run(job=job))
+        return job
+
+    async def run(self, job: FetchJob) -> None:
+        """
+        Fetch all subscriptions and report the progress of the job.
+
+        Args:
+            job (FetchJob): The job.
+        """
+        db = self.session_factory()
+        try:
+            subscriptions = await crud.subscription.get_all(db=db) or []
+            titles = {subscription.id: subscription.title for subscription in subscriptions}
+            job.status, job.total = RUNNING, len(subscriptions)
+
+            def on_progress(subscription_id: str, results: FetchResults) -> None:
+                job.done += 1
+                job.add_event(
+                    FetchJobEvent(
+                        job_id=job.id,
+                        event="progress",
+                        done=job.done,
+                        total=job.total,
+                        subscription_id=subscription_id,
+                        subscription=titles.get(subscription_id),
+                        added_videos=results.added_videos,
+                        error=next(iter(results.errors), None),
+                    )
+                )
+
+            job.results = await fetch_subscriptions(
+                db=db,
+                subscriptions=subscriptions,
+                on_progress=on_progress,
+                cancel_event=job.cancel_event,
+                # Jobs are started by users, who expect the current feeds
+                use_cache=False,
+            )
+            job.status = CANCELLED if job.cancel_event.is_set() else COMPLETED
+            job.add_event(
+                FetchJobEvent(
+                    job_id=job.id,
+                    event="cancelled" if job.status == CANCELLED else "done",
+                    done=job.done,
+                    total=job.total,
+                    added_videos=job.results.added_videos,
+                    results=FetchResults(**job.results.dict(exclude={"stats"})),
+                )
+            )
+            logger.success(
+                f"Fetch job '{job.title}' {job.status}. "
+                f"Added {job.results.added_videos} new videos."
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(e)
+            job.status = FAILED
+            job.add_event(
+                FetchJobEvent(
+                    job_id=job.id,
+                    event="failed",
+                    done=job.done,
+                    total=job.total,
+                    error=e.__class__.__name__,
+                )
+            )
+        finally:
+            db.close()
+
+
+fetch_jobs = FetchJobManager()
@@ -0,0 +1,548 @@
+from typing import Any, Callable, Coroutine, cast
+
+import asyncio
+import itertools
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.orm import ORMExecuteState, sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+from sqlmodel import Session
+
+from app import logger, settings
+from app.db.session import SessionLocal
+from app.models import CriteriaField, Filter, FilterReadStatus
+from app.services.channel_tags import channel_tag_index
+from app.services.video_snapshot import video_snapshot
+
+# Tables whose rows decide which videos a filter matches
+FILTER_INPUT_TABLES = frozenset(
+    {
+        "video",
+        "subscriptionvideolink",
+        "subscription",
+        "channel",
+        "channeltaglink",
+        "tag",
+        "filter",
+        "criteria",
+        "subscriptionfilterlink",
+    }
+)
+
+# Video columns that criteria or the order of a filter read, other than `is_read`
+FILTER_VIDEO_COLUMNS = frozenset(
+    {"title", "description", "duration", "created_at", "remote_channel_id"}
+)
+
+_CHANGES_KEY = "filter_changes"
+
+# Called with the changes of every commit of a tracked session, e.g. by the filter index
+commit_listeners: list[Callable[["FilterChanges"], None]] = []
+
+
+class FilterChanges:
+    def __init__(self) -> None:
+        """
+        The changes of filter inputs made by a transaction, as far as filters depend on them.
+        """
+        self.all = False  # changes that are not tracked precisely, e.g. deleted videos
+        self.read_status = False  # `Video.is_read`
+        self.hidden_channels = False  # `Channel.is_hidden`
+        self.tags = False  # tags of channels and tag names
+        self.subscription_ids: set[str] = set()  # subscriptions that gained or lost videos
+        self.filter_ids: set[str] = set()  # filters, their criteria and subscriptions
+        # The videos and channels that changed, for the filter index
+        self.video_ids: set[str] = set()  # videos that changed or were linked or unlinked
+        self.channel_ids: set[str] = set()  # channels whose tags or hidden flag changed
+        self.tag_ids: set[str] = set()  # tags that were renamed, added or deleted
+        self.rebuild = False  # changed videos or channels that are not known by id
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.all
+            or self.read_status
+            or self.hidden_channels
+            or self.tags
+            or self.subscription_ids
+            or self.filter_ids
+            or self.video_ids
+            or self.channel_ids
+            or self.tag_ids
+            or self.rebuild
+        )
+
+    def update(self, other: "FilterChanges") -> None:
+        self.all |= other.all
+        self.read_status |= other.read_status
+        self.hidden_channels |= other.hidden_channels
+        self.tags |= other.tags
+        self.subscription_ids |= other.subscription_ids
+        self.filter_ids |= other.filter_ids
+        self.video_ids |= other.video_ids
+        self.channel_ids |= other.channel_ids
+        self.tag_ids |= other.tag_ids
+        self.rebuild |= other.rebuild
+
+
+def get_history_values(instance: Any, key: str) -> list[Any]:
+    """
+    Get the added and removed values of an attribute that were not flushed yet.
+
+    Args:
+        instance (Any): The model instance.
+        key (str): The attribute.
+
+    Returns:
+        list[Any]: The added and removed values.
+    """
+    history = sa.inspect(instance).attrs[key].history
+    return [*(history.added or ()), *(history.deleted or ())]
+
+
+def get_changed_columns(instance: Any) -> set[str]:
+    state = sa.inspect(instance)
+    return {
+        attr.key
+        for attr in state.mapper.column_attrs
+        if state.attrs[attr.key].history.has_changes()
+    }
+
+
+def get_flush_changes(session: Session) -> FilterChanges:
+    """
+    Get the filter changes of the instances a session is about to flush.
+
+    Args:
+        session (Session): The session.
+
+    Returns:
+        FilterChanges: The changes.
+    """
+    changes = FilterChanges()
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        is_deleted = instance in session.deleted
+        if table == "video":
+            subscriptions = get_history_values(instance, "subscriptions")
+            changes.subscription_ids |= {subscription.id for subscription in subscriptions}
+            columns = get_changed_columns(instance)
+            if is_deleted:
+                changes.all = True
+            elif instance not in session.new:
+                changes.read_status |= "is_read" in columns
+                changes.all |= bool(columns & FILTER_VIDEO_COLUMNS)
+            if subscriptions or is_deleted or columns & {"is_read", *FILTER_VIDEO_COLUMNS}:
+                changes.video_ids.add(instance.id)
+        elif table == "channel":
+            columns = get_changed_columns(instance)
+            tags = get_history_values(instance, "tags")
+            if is_deleted:
+                changes.all = True
+            else:
+                changes.hidden_channels |= "is_hidden" in columns
+                changes.tags |= bool(tags)
+                changes.all |= "remote_channel_id" in columns
+            # Videos of the old remote channel id are not known
+            changes.rebuild |= "remote_channel_id" in columns and instance not in session.new
+            if is_deleted or tags or "is_hidden" in columns:
+                changes.channel_ids.add(instance.id)
+        elif table == "channeltaglink":
+            changes.tags = True
+            changes.channel_ids.add(instance.channel_id)
+        elif table == "tag":
+            changes.tags = True
+            # Not when only the channels of the tag changed
+            if instance in session.new or is_deleted or get_changed_columns(instance):
+                changes.tag_ids.add(instance.id)
+        elif table == "subscriptionvideolink":
+            changes.subscription_ids.add(instance.subscription_id)
+            changes.video_ids.add(instance.video_id)
+        elif table == "subscription":
+            changes.filter_ids |= {
+                filter_.id for filter_ in get_history_values(instance, "filters")
+            }
+            videos = get_history_values(instance, "videos")
+            changes.video_ids |= {video.id for video in videos}
+            if is_deleted or videos:
+                changes.subscription_ids.add(instance.id)
+            # The links of a deleted subscription are deleted without history
+            changes.rebuild |= is_deleted
+        elif table == "filter":
+            changes.filter_ids.add(instance.id)
+        elif table in ("criteria", "subscriptionfilterlink"):
+            changes.filter_ids |= {instance.filter_id, *get_history_values(instance, "filter_id")}
+    changes.filter_ids.discard(None)  # type: ignore[arg-type]
+    changes.video_ids.discard(None)  # type: ignore[arg-type]
+    changes.channel_ids.discard(None)  # type: ignore[arg-type]
+    return changes
+
+
+def get_where_values(statement: Any, key: str) -> set[Any] | None:
+    """
+    Get the values a bulk UPDATE or DELETE compares a column to, e.g. `Video.id.in_(ids)`.
+
+    Args:
+        statement (Any): The statement.
+        key (str): The column.
+
+    Returns:
+        set[Any] | None: The values, or None if the statement is not restricted to them.
+    """
+    where = getattr(statement, "whereclause", None)
+    clauses = (
+        where.clauses
+        if isinstance(where, BooleanClauseList) and where.operator is operators.and_
+        else [where]
+    )
+    for clause in clauses:
+        if (
+            isinstance(clause, BinaryExpression)
+            and getattr(clause.left, "key", None) == key
+            and isinstance(clause.right, BindParameter)
+        ):
+            if clause.operator is operators.eq:
+                return {clause.right.value}
+            if clause.operator is operators.in_op:
+                return set(clause.right.value)
+    return None
+
+
+def get_statement_changes(statement: Any) -> FilterChanges:
+    """
+    Get the filter changes of a bulk INSERT, UPDATE or DELETE statement.
+
+    Args:
+        statement (Any): The statement.
+
+    Returns:
+        FilterChanges: The changes.
+    """
+    changes = FilterChanges()
+    table = getattr(getattr(statement, "table", None), "name", None)
+    if table not in FILTER_INPUT_TABLES:
+        return changes
+
+    # Values of the statement, keyed by column name
+    rows = getattr(statement, "_multi_values", None) or [[getattr(statement, "_values", None)]]
+    values = [
+        {getattr(column, "key", column): value for column, value in row.items()}
+        for row in itertools.chain(*rows)
+        if row
+    ]
+    if isinstance(statement, sa.sql.Insert):
+        if table == "subscriptionvideolink" and values:
+            changes.subscription_ids = {row["subscription_id"] for row in values}
+            changes.video_ids = {row["video_id"] for row in values}
+        elif table == "video" and values:
+            # New videos are not linked yet, but upserts may update existing videos
+            changes.video_ids = {row["id"] for row in values}
+        # New channels are not tagged yet
+        elif table != "channel":
+            changes.all = changes.rebuild = True
+    elif isinstance(statement, sa.sql.Update) and len(values) == 1:
+        columns = set(values[0])
+        ids = get_where_values(statement=statement, key="id")
+        if table == "video":
+            changes.read_status = "is_read" in columns
+            changes.all = bool(columns & FILTER_VIDEO_COLUMNS)
+            if columns & {"is_read", *FILTER_VIDEO_COLUMNS}:
+                changes.video_ids = ids or set()
+                changes.rebuild = ids is None
+        elif table == "channel":
+            changes.hidden_channels = "is_hidden" in columns
+            changes.all = "remote_channel_id" in columns
+            if "is_hidden" in columns:
+                changes.channel_ids = ids or set()
+                changes.rebuild = ids is None
+            changes.rebuild |= "remote_channel_id" in columns
+        else:
+            changes.all = changes.rebuild = True
+    elif isinstance(statement, sa.sql.Delete):
+        changes.all = True
+        if table in ("video", "subscriptionvideolink"):
+            ids = get_where_values(
+                statement=statement, key="id" if table == "video" else "video_id"
+            )
+            changes.video_ids = ids or set()
+        elif table == "channeltaglink":
+            ids = get_where_values(statement=statement, key="channel_id")
+            changes.channel_ids = ids or set()
+        elif table in ("criteria", "subscriptionfilterlink"):
+            ids = get_where_values(statement=statement, key="filter_id")
+            changes.filter_ids = ids or set()
+        else:
+            ids = None
+        changes.rebuild = ids is None
+    else:
+        changes.all = changes.rebuild = True
+    return changes
+
+
+def get_session_changes(session: Session) -> FilterChanges:
+    """
+    Get the filter changes a session flushed or executed since its last commit.
+
+    Args:
+        session (Session): The session.
+
+    Returns:
+        FilterChanges: The changes.
+    """
+    changes: FilterChanges = session.info.setdefault(_CHANGES_KEY, FilterChanges())
+    return changes
+
+
+def _on_after_flush(session: Session, flush_context: Any) -> None:
+    get_session_changes(session).update(get_flush_changes(session=session))
+
+
+def _on_execute(orm_execute_state: ORMExecuteState) -> None:
+    # Bulk statements, e.g. the upserts of the ingest and the deletes of the retention job
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        changes = get_statement_changes(statement=orm_execute_state.statement)
+        get_session_changes(cast(Session, orm_execute_state.session)).update(changes)
+
+
+def invalidate_filter_caches(changes: FilterChanges) -> None:
+    """
+    Invalidate the cached filter results and indexes that depend on changes.
+
+    Args:
+        changes (FilterChanges): The changes.
+    """
+    filter_results.invalidate(changes=changes)
+    # Deleted channels and bulk statements also change the channel masks
+    if changes.tags or changes.all:
+        channel_tag_index.invalidate()
+    video_snapshot.invalidate(changes=changes)
+
+
+def _on_after_commit(session: Session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        invalidate_filter_caches(changes=changes)
+        for listener in commit_listeners:
+            listener(changes)
+
+
+def _on_after_rollback(session: Session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    # Rolled back changes may have been read into the results and indexes after their flush
+    if changes:
+        invalidate_filter_caches(changes=changes)
+
+
+def listen_for_filter_changes(session_factory: "sessionmaker[Session]") -> None:
+    """
+    Track the filter changes of the sessions of a factory, and invalidate the cached filter
+    results and indexes when they are committed or rolled back.
+
+    Sessions of other factories, e.g. of the benchmark database, leave the caches alone.
+
+    Args:
+        session_factory (sessionmaker): The factory of the sessions to track.
+    """
+    sa.event.listen(session_factory, "after_flush", _on_after_flush)
+    sa.event.listen(session_factory, "do_orm_execute", _on_execute)
+    sa.event.listen(session_factory, "after_commit", _on_after_commit)
+    sa.event.listen(session_factory, "after_rollback", _on_after_rollback)
+
+
+def clear_filter_caches() -> None:
+    """
+    Drop all cached filter results and indexes, e.g. after the database was changed
+    without a tracked session.
+    """
+    filter_results.clear()
+    channel_tag_index.invalidate()
+    video_snapshot.clear()
+
+
+class FilterResult:
+    def __init__(
+        self, filter_: Filter, count: int, video_ids: list[str] | None, limit: int | None
+    ) -> None:
+        """
+        The ordered ids and the count of the videos matching a filter.
+
+        The inputs the result depends on are taken from the filter, so that changes of
+        other inputs leave the result valid.
+
+        Args:
+            filter_ (Filter): The filter.
+            count (int): The number of matching videos.
+            video_ids (list[str] | None): The first `limit` matching video ids in filter
+                order, or None if only the count is known.
+            limit (int | None): The limit of the video ids. None if all ids are known.
+        """
+        self.filter_id = filter_.id
+        self.count = count
+        self.video_ids = video_ids
+        self.limit = limit
+        self.created_at = time.monotonic()
+        self.stale_at: float | None = None
+        self.subscription_ids = frozenset(subscription.id for subscription in filter_.subscriptions)
+        self.depends_on_read_status = filter_.read_status != FilterReadStatus.ALL.value
+        self.depends_on_hidden_channels = not filter_.show_hidden_channels
+        self.depends_on_tags = any(
+            criteria.field == CriteriaField.CHANNEL.value for criteria in filter_.criterias
+        )
+
+    def depends_on(self, changes: FilterChanges) -> bool:
+        """
+        Whether the result may be changed by the changes.
+
+        Args:
+            changes (FilterChanges): The changes.
+
+        Returns:
+            bool: True if the result must be recomputed.
+        """
+        return (
+            changes.all
+            or self.filter_id in changes.filter_ids
+            or bool(self.subscription_ids & changes.subscription_ids)
+            or (changes.read_status and self.depends_on_read_status)
+            or (changes.hidden_channels and self.depends_on_hidden_channels)
+            or (changes.tags and self.depends_on_tags)
+        )
+
+    def covers(self, limit: int | None) -> bool:
+        """
+        Whether the result holds the video ids of a request.
+
+        Args:
+            limit (int | None): The requested number of videos. None requests all videos.
+
+        Returns:
+            bool: True if the result holds the requested ids.
+        """
+        if self.video_ids is None:
+            return False
+        if self.limit is None or len(self.video_ids) >= self.count:
+            return True
+        return bool(limit) and limit <= self.limit  # type: ignore[operator]
+
+
+class FilterResultCache:
+    def __init__(
+        self,
+        ttl_seconds: float,
+        stale_seconds: float,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ) -> None:
+        """
+        Caches the results of filters until their inputs change.
+
+        Committed changes mark the results that depend on them as stale. Stale results
+        can still be served for `stale_seconds` while they are recomputed in the background.
+        Results expire after `ttl_seconds` in any case, as CREATED criteria match fewer
+        videos as time passes.
+
+        Args:
+            ttl_seconds (float): Max age of a result. 0 disables the cache.
+            stale_seconds (float): How long stale results may be served.
+            session_factory (Callable[[], Session]): Creates the database sessions of
+                background recomputations.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.session_factory = session_factory
+        self.results: dict[str, FilterResult] = {}
+        self.version = 0  # increased by every invalidation
+        self._refreshing: dict[str, asyncio.Task[None]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def clear(self) -> None:
+        self.results.clear()
+        self.version += 1
+
+    def invalidate(self, changes: FilterChanges) -> None:
+        """
+        Mark the results that depend on committed changes as stale.
+
+        Args:
+            changes (FilterChanges): The changes.
+        """
+        self.version += 1
+        now = time.monotonic()
+        for result in self.results.values():
+            if result.stale_at is None and result.depends_on(changes):
+                result.stale_at = now
+
+    def get(self, filter_id: str, limit: int | None = None) -> tuple[FilterResult | None, bool]:
+        """
+        Get the cached result of a filter.
+
+        Args:
+            filter_id (str): The id of the filter.
+            limit (int | None): The requested number of videos. The result must hold their
+                ids, unless 0 is given for a request of the count only.
+
+        Returns:
+            tuple[FilterResult | None, bool]: The result, or None if there is no usable one,
+                and whether it is stale.
+        """
+        result = self.results.get(filter_id)
+        now = time.monotonic()
+        if result is None or now - result.created_at >= self.ttl_seconds:
+            return None, False
+        if limit != 0 and not result.covers(limit=limit):
+            return None, False
+        if result.stale_at is None:
+            return result, False
+        if now - result.stale_at < self.stale_seconds:
+            return result, True
+        return None, True
+
+    def set(self, result: FilterResult, version: int) -> None:
+        """
+        Cache a result.
+
+        Args:
+            result (FilterResult): The result.
+            version (int): The cache version when the computation started. Results computed
+                across an invalidation may be outdated and are cached as stale.
+        """
+        if not self.enabled:
+            return
+        if version != self.version:
+            result.stale_at = time.monotonic()
+        self.results[result.filter_id] = result
+
+    def revalidate(self, key: str, refresh: Callable[[Session], Coroutine[Any, Any, None]]) -> None:
+        """
+        Recompute stale results in the background, unless they are already recomputed.
+
+        Args:
+            key (str): Identifies the recomputation, e.g. the ids of its filters.
+            refresh (Callable[[Session], Coroutine[Any, Any, None]]): Recomputes and caches
+                the results with its own database session.
+        """
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return
+
+        async def run() -> None:
+            db = self.session_factory()
+            try:
+                await refresh(db)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception(e)
+            finally:
+                db.close()
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(run())
+
+
+filter_results = FilterResultCache(
+    ttl_seconds=settings.FILTER_CACHE_TTL_SECONDS,
+    stale_seconds=settings.FILTER_CACHE_STALE_SECONDS,
+)
+listen_for_filter_changes(session_factory=SessionLocal)
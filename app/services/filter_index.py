@@ -0,0 +1,313 @@
+from typing import Any, Callable
+
+import asyncio
+from pathlib import Path
+
+import sqlalchemy as sa
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel import Session
+
+from app import logger, settings
+from app.db.session import SessionLocal
+from app.models import (
+    Channel,
+    CriteriaField,
+    Filter,
+    FilterVideoLink,
+    SubscriptionFilterLink,
+    SubscriptionVideoLink,
+    Video,
+)
+from app.paths import FILTER_INDEX_CURRENT_FILE
+from app.services.fetch import db_write_lock
+from app.services.filter_cache import FilterChanges, commit_listeners
+from app.services.filter_query import compile_filter
+
+# Max ids bound in one statement
+INDEX_BATCH_SIZE = 500
+
+
+def index_filter(
+    db: Session,
+    filter_: Filter,
+    video_ids: list[str] | None = None,
+    channel_ids: list[str] | None = None,
+) -> None:
+    """
+    Recompute which videos a filter matches and store them in the filter index.
+
+    Without video or channel ids, the filter is indexed from scratch. Otherwise only
+    the videos with the ids and the videos of the channels are recomputed.
+
+    Args:
+        db (Session): The database session.
+        filter_ (Filter): The filter.
+        video_ids (list[str] | None): The videos to recompute.
+        channel_ids (list[str] | None): The channels whose videos to recompute.
+    """
+    # CREATED criteria are applied when the index is read
+    matches = compile_filter(
+        filter_=filter_, dialect=db.get_bind().dialect.name, with_created=False
+    ).where
+    delete = sa.delete(FilterVideoLink).where(FilterVideoLink.filter_id == filter_.id)
+    if video_ids is not None or channel_ids is not None:
+        scope: list[ColumnElement[Any]] = []
+        if video_ids:
+            scope.append(Video.id.in_(video_ids))  # type: ignore[attr-defined]
+        if channel_ids:
+            scope.append(
+                Video.remote_channel_id.in_(  # type: ignore[attr-defined]
+                    sa.select(Channel.remote_channel_id).where(
+                        Channel.id.in_(channel_ids)  # type: ignore[attr-defined]
+                    )
+                )
+            )
+        # Links of deleted videos are removed by id, as the videos are gone
+        delete = delete.where(
+            sa.or_(
+                FilterVideoLink.video_id.in_(video_ids or []),  # type: ignore[attr-defined]
+                FilterVideoLink.video_id.in_(  # type: ignore[attr-defined]
+                    sa.select(Video.id).where(sa.or_(*scope))
+                ),
+            )
+        )
+        matches = [*matches, sa.or_(*scope)]
+
+    # The index is never loaded into the session, so there is nothing to synchronize
+    db.execute(delete.execution_options(synchronize_session=False))
+    db.execute(
+        sa.insert(FilterVideoLink).from_select(
+            ["filter_id", "video_id"],
+            sa.select(sa.literal(filter_.id), Video.id).where(*matches),
+        )
+    )
+
+
+def uses_tags(filter_: Filter) -> bool:
+    return any(criteria.field == CriteriaField.CHANNEL.value for criteria in filter_.criterias)
+
+
+def select_filter_ids_of_videos(video_ids: list[str] | sa.sql.Select) -> sa.sql.CompoundSelect:
+    """
+    Select the ids of the filters whose subscriptions have any of the videos, or whose index
+    has any of them.
+
+    Args:
+        video_ids (list[str] | sa.sql.Select): The ids of the videos.
+
+    Returns:
+        sa.sql.CompoundSelect: The statement.
+    """
+    return sa.union(
+        sa.select(SubscriptionFilterLink.filter_id)
+        .join(
+            SubscriptionVideoLink,
+            SubscriptionVideoLink.subscription_id == SubscriptionFilterLink.subscription_id,
+        )
+        .where(SubscriptionVideoLink.video_id.in_(video_ids)),  # type: ignore[attr-defined]
+        sa.select(FilterVideoLink.filter_id).where(
+            FilterVideoLink.video_id.in_(video_ids)  # type: ignore[attr-defined]
+        ),
+    )
+
+
+def affects_filter_index(changes: FilterChanges) -> bool:
+    return bool(
+        changes.rebuild
+        or changes.filter_ids
+        or changes.video_ids
+        or changes.channel_ids
+        or changes.tag_ids
+    )
+
+
+def update_filter_index(db: Session, changes: FilterChanges) -> None:
+    """
+    Update the filter index for the changes of a transaction.
+
+    Filters whose definition changed are indexed from scratch. The changed videos and the
+    videos of changed channels are recomputed only for the filters that have them, through
+    their subscriptions or their index. Changed channels are skipped by filters that depend
+    neither on hidden channels nor on tags.
+
+    Args:
+        db (Session): The database session.
+        changes (FilterChanges): The changes.
+    """
+    filters = db.execute(sa.select(Filter)).scalars().all()
+    deleted_filter_ids = changes.filter_ids - {filter_.id for filter_ in filters}
+    if deleted_filter_ids:
+        db.execute(
+            sa.delete(FilterVideoLink).where(
+                FilterVideoLink.filter_id.in_(deleted_filter_ids)  # type: ignore[attr-defined]
+            )
+        )
+
+    # Filters that are not indexed from scratch, by id
+    unchanged_filters: dict[str, Filter] = {}
+    for filter_ in filters:
+        if (
+            changes.rebuild
+            or filter_.id in changes.filter_ids
+            or (changes.tag_ids and uses_tags(filter_=filter_))
+        ):
+            index_filter(db=db, filter_=filter_)
+        else:
+            unchanged_filters[filter_.id] = filter_
+
+    video_ids = sorted(changes.video_ids)
+    for i in range(0, len(video_ids), INDEX_BATCH_SIZE):
+        batch = video_ids[i : i + INDEX_BATCH_SIZE]
+        for filter_id in db.execute(select_filter_ids_of_videos(video_ids=batch)).scalars():
+            if filter_id in unchanged_filters:
+                index_filter(db=db, filter_=unchanged_filters[filter_id], video_ids=batch)
+
+    channel_ids = sorted(changes.channel_ids)
+    for i in range(0, len(channel_ids), INDEX_BATCH_SIZE):
+        batch = channel_ids[i : i + INDEX_BATCH_SIZE]
+        channel_video_ids = sa.select(Video.id).where(
+            Video.remote_channel_id.in_(  # type: ignore[attr-defined]
+                sa.select(Channel.remote_channel_id).where(
+                    Channel.id.in_(batch)  # type: ignore[attr-defined]
+                )
+            )
+        )
+        for filter_id in db.execute(
+            select_filter_ids_of_videos(video_ids=channel_video_ids)
+        ).scalars():
+            filter_ = unchanged_filters.get(filter_id)
+            if filter_ and (not filter_.show_hidden_channels or uses_tags(filter_=filter_)):
+                index_filter(db=db, filter_=filter_, channel_ids=batch)
+
+
+def rebuild_filter_index(db: Session) -> None:
+    """
+    Index all filters from scratch, e.g. after the index was switched on.
+
+    Args:
+        db (Session): The database session.
+    """
+    db.execute(sa.delete(FilterVideoLink))
+    filters = db.execute(sa.select(Filter)).scalars().all()
+    for filter_ in filters:
+        index_filter(db=db, filter_=filter_)
+    db.commit()
+    logger.success(f"Indexed the videos of {len(filters)} filters.")
+
+
+class FilterIndexer:
+    def __init__(
+        self,
+        current_file: Path,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ) -> None:
+        """
+        Updates the filter index after commits, in the background.
+
+        The changes of committed transactions are queued, and one task at a time applies
+        them in its own session while holding the database write lock, so commits never
+        wait for the index. Until the queue is empty, filters are read as with "sql".
+
+        The index is left current when the app stops, which `current_file` records, so it
+        is only rebuilt at startup if changes may have been lost.
+
+        Args:
+            current_file (Path): Exists while no running app maintains the index, if the
+                last one left it current.
+            session_factory (Callable[[], Session]): Creates the database sessions that
+                update the index.
+        """
+        self.current_file = current_file
+        self.session_factory = session_factory
+        self.pending = FilterChanges()
+        self._started = False
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def is_current(self) -> bool:
+        return not self.pending and (self._task is None or self._task.done())
+
+    def enqueue(self, changes: FilterChanges) -> None:
+        """
+        Queue the committed changes of the filter inputs to be indexed.
+
+        Args:
+            changes (FilterChanges): The changes.
+        """
+        if settings.FILTER_BACKEND != "index" or not affects_filter_index(changes=changes):
+            return
+        self.pending.update(changes)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Commits outside of the event loop, e.g. of the CLI, are indexed right away
+            self.apply_pending()
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def apply_pending(self) -> None:
+        """
+        Index the queued changes, until no more changes are queued or indexing fails.
+        """
+        db = self.session_factory()
+        try:
+            while self.pending:
+                changes, self.pending = self.pending, FilterChanges()
+                try:
+                    update_filter_index(db=db, changes=changes)
+                    db.commit()
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.exception(e)
+                    db.rollback()
+                    # Retried with the next changes, and the index is rebuilt on restart
+                    self.pending.update(changes)
+                    self.current_file.unlink(missing_ok=True)
+                    return
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        """
+        Index the queued changes while holding the database write lock.
+        """
+        async with db_write_lock:
+            self.apply_pending()
+
+    async def join(self) -> None:
+        """
+        Wait until the queued changes are indexed.
+        """
+        while self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+
+    def start(self, db: Session) -> None:
+        """
+        Rebuild the index, unless the last app left it current, and maintain it from now on.
+
+        Args:
+            db (Session): The database session.
+        """
+        is_current = self.current_file.exists()
+        # Changes are not indexed by other backends, and may be lost if the app crashes
+        self.current_file.unlink(missing_ok=True)
+        if settings.FILTER_BACKEND != "index":
+            return
+        if is_current:
+            logger.debug("The filter index is current.")
+        else:
+            rebuild_filter_index(db=db)
+        self._started = True
+
+    async def stop(self) -> None:
+        """
+        Index the queued changes, and record that the index is current.
+        """
+        await self.join()
+        if self._started and self.is_current:
+            self.current_file.touch()
+        self._started = False
+
+
+filter_indexer = FilterIndexer(current_file=FILTER_INDEX_CURRENT_FILE)
+commit_listeners.append(filter_indexer.enqueue)
@@ -0,0 +1,283 @@
+from typing import Any, cast
+
+import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.sql.elements import ColumnElement
+
+from app import settings
+from app.models.channel import Channel
+from app.models.channel_tag_link import ChannelTagLink
+from app.models.criteria import Criteria, CriteriaField, CriteriaOperator, CriteriaUnitOfMeasure
+from app.models.filter import Filter, FilterReadStatus
+from app.models.filter_video_link import FilterVideoLink
+from app.models.subscription_video_link import SubscriptionVideoLink
+from app.models.tag import Tag
+from app.models.video import Video
+from app.services.video_fts import match_keyword
+
+ANY_TAG = "ANY"
+
+UNIT_SECONDS = {
+    CriteriaUnitOfMeasure.SECONDS.value: 1,
+    CriteriaUnitOfMeasure.MINUTES.value: 60,
+    CriteriaUnitOfMeasure.HOURS.value: 60 * 60,
+    CriteriaUnitOfMeasure.DAYS.value: 60 * 60 * 24,
+}
+
+
+class FilterQuery:
+    def __init__(self, where: list[ColumnElement[Any]], order_by: list[Any]) -> None:
+        """
+        The SQL compiled from a filter: which videos match and how they are ordered.
+
+        Args:
+            where (list[ColumnElement[Any]]): The conditions a video must meet.
+            order_by (list[Any]): The order of the videos.
+        """
+        self.where = where
+        self.order_by = order_by
+
+    def select_videos(self, limit: int | None = None) -> sa.sql.Select:
+        """
+        Select the matching videos in filter order.
+
+        Args:
+            limit (int | None): Max videos to select. None or 0 selects all.
+
+        Returns:
+            sa.sql.Select: The statement.
+        """
+        query = sa.select(Video).where(*self.where).order_by(*self.order_by)
+        return query.limit(limit) if limit else query
+
+    def select_video_ids(self, limit: int | None = None) -> sa.sql.Select:
+        """
+        Select the ids of the matching videos in filter order.
+
+        Args:
+            limit (int | None): Max ids to select. None or 0 selects all.
+
+        Returns:
+            sa.sql.Select: The statement.
+        """
+        query = sa.select(Video.id).where(*self.where).order_by(*self.order_by)
+        return query.limit(limit) if limit else query
+
+    def count_videos(self) -> sa.sql.Select:
+        """
+        Count the matching videos.
+
+        Returns:
+            sa.sql.Select: The statement.
+        """
+        return sa.select(sa.func.count()).select_from(Video).where(*self.where)
+
+
+def get_unit_seconds(unit_of_measure: str) -> int:
+    """
+    Get the seconds of a criteria unit of measure.
+
+    Args:
+        unit_of_measure (str): The unit of measure.
+
+    Returns:
+        int: The seconds of one unit.
+
+    Raises:
+        ValueError: If the unit is not a unit of time.
+    """
+    try:
+        return UNIT_SECONDS[unit_of_measure]
+    except KeyError as e:
+        raise ValueError("Unit of measure must be 'seconds', 'minutes', 'hours' or 'days'") from e
+
+
+def channel_has_tags(tag_names: list[str]) -> ColumnElement[Any]:
+    """
+    Whether the channel of the video has one of the tags.
+
+    Args:
+        tag_names (list[str]): The tag names. "ANY" matches any tag.
+
+    Returns:
+        ColumnElement[Any]: An EXISTS subquery on the channel's tags.
+    """
+    query = (
+        sa.select(ChannelTagLink.tag_id)
+        .join(Channel, Channel.id == ChannelTagLink.channel_id)
+        .where(Channel.remote_channel_id == Video.remote_channel_id)
+    )
+    if ANY_TAG not in tag_names:
+        query = query.join(Tag, Tag.id == ChannelTagLink.tag_id).where(
+            Tag.name.in_(tag_names)  # type: ignore[attr-defined]
+        )
+    return query.exists()
+
+
+def compile_criteria(
+    criterias: list[Criteria], now: datetime.datetime, dialect: str, with_created: bool = True
+) -> list[ColumnElement[Any]]:
+    """
+    Compile criteria into SQL conditions. A video must meet all of them.
+
+    Args:
+        criterias (list[Criteria]): The criteria of a filter.
+        now (datetime.datetime): The time CREATED criteria are relative to.
+        dialect (str): The name of the database dialect the conditions are run on.
+        with_created (bool): Whether to compile CREATED criteria, which depend on the time.
+
+    Returns:
+        list[ColumnElement[Any]]: The conditions.
+    """
+    where: list[ColumnElement[Any]] = []
+    must_contain_tags: list[str] = []
+    must_not_contain_tags: list[str] = []
+    for criteria in criterias:
+        if criteria.field == CriteriaField.CHANNEL.value:
+            if criteria.operator == CriteriaOperator.MUST_CONTAIN.value:
+                must_contain_tags.append(criteria.value)
+            elif criteria.operator == CriteriaOperator.MUST_NOT_CONTAIN.value:
+                must_not_contain_tags.append(criteria.value)
+
+        elif criteria.field == CriteriaField.DURATION.value:
+            seconds = int(criteria.value) * get_unit_seconds(criteria.unit_of_measure)
+            # Videos of unknown duration are kept
+            duration = cast(ColumnElement[Any], Video.duration)
+            unknown = sa.func.coalesce(duration, 0) == 0
+            if criteria.operator == CriteriaOperator.LONGER_THAN.value:
+                where.append(sa.or_(unknown, duration >= seconds))
+            elif criteria.operator == CriteriaOperator.SHORTER_THAN.value:
+                where.append(sa.or_(unknown, duration <= seconds))
+
+        elif criteria.field == CriteriaField.CREATED.value and with_created:
+            seconds = int(criteria.value) * get_unit_seconds(criteria.unit_of_measure)
+            created_at = cast(ColumnElement[Any], Video.created_at)
+            where.append(created_at >= now - datetime.timedelta(seconds=seconds))
+
+        elif criteria.field == CriteriaField.KEYWORD.value:
+            matches = match_keyword(
+                keyword=str(criteria.value), dialect=dialect, use_fts=settings.FILTER_KEYWORD_FTS
+            )
+            if criteria.operator == CriteriaOperator.MUST_CONTAIN.value:
+                where.append(matches)
+            elif criteria.operator == CriteriaOperator.MUST_NOT_CONTAIN.value:
+                where.append(sa.not_(matches))
+
+        elif criteria.field == CriteriaField.CHANNEL_ID.value:
+            remote_channel_id = cast(ColumnElement[Any], Video.remote_channel_id)
+            if criteria.operator == CriteriaOperator.IS.value:
+                where.append(remote_channel_id == criteria.value)
+            elif criteria.operator == CriteriaOperator.IS_NOT.value:
+                where.append(remote_channel_id != criteria.value)
+
+    if must_contain_tags:
+        where.append(channel_has_tags(tag_names=must_contain_tags))
+    if must_not_contain_tags:
+        where.append(sa.not_(channel_has_tags(tag_names=must_not_contain_tags)))
+    return where
+
+
+def compile_order_by(filter_: Filter) -> list[Any]:
+    """
+    Compile the order of a filter. Videos of the same time are ordered by id.
+
+    Args:
+        filter_ (Filter): The filter.
+
+    Returns:
+        list[Any]: The ORDER BY clauses.
+    """
+    order_column = getattr(Video, filter_.ordered_by)
+    if filter_.reverse_order:
+        return [order_column.desc(), Video.id.desc()]  # type: ignore[attr-defined]
+    return [order_column.asc(), Video.id.asc()]  # type: ignore[attr-defined]
+
+
+def compile_filter(
+    filter_: Filter,
+    dialect: str,
+    now: datetime.datetime | None = None,
+    with_created: bool = True,
+) -> FilterQuery:
+    """
+    Compile a filter into one SQL query over the videos of its subscriptions.
+
+    Read status, subscriptions, hidden channels and criteria become conditions of the
+    query, and the filter's order becomes its ORDER BY, so matching, sorting, limiting
+    and counting happen in the database.
+
+    Args:
+        filter_ (Filter): The filter.
+        dialect (str): The name of the database dialect the query is run on.
+        now (datetime.datetime | None): The time CREATED criteria are relative to.
+            Defaults to the current time.
+        with_created (bool): Whether to compile CREATED criteria, which depend on the time.
+
+    Returns:
+        FilterQuery: The compiled query.
+    """
+    now = now or datetime.datetime.utcnow()
+    subscription_ids = [subscription.id for subscription in filter_.subscriptions]
+    where: list[ColumnElement[Any]] = [
+        # EXISTS, so videos of several subscriptions are selected once
+        sa.select(SubscriptionVideoLink.video_id)
+        .where(
+            SubscriptionVideoLink.video_id == Video.id,
+            SubscriptionVideoLink.subscription_id.in_(subscription_ids),  # type: ignore
+        )
+        .exists()
+    ]
+
+    if filter_.read_status == FilterReadStatus.READ.value:
+        where.append(Video.is_read.is_(True))  # type: ignore[attr-defined]
+    elif filter_.read_status == FilterReadStatus.UNREAD.value:
+        where.append(Video.is_read.is_(False))  # type: ignore[attr-defined]
+
+    if not filter_.show_hidden_channels:
+        where.append(
+            sa.select(Channel.id)
+            .where(
+                Channel.remote_channel_id == Video.remote_channel_id,
+                Channel.is_hidden.is_(False),  # type: ignore[attr-defined]
+            )
+            .exists()
+        )
+
+    where.extend(
+        compile_criteria(
+            criterias=filter_.criterias, now=now, dialect=dialect, with_created=with_created
+        )
+    )
+    return FilterQuery(where=where, order_by=compile_order_by(filter_=filter_))
+
+
+def compile_indexed_filter(
+    filter_: Filter, dialect: str, now: datetime.datetime | None = None
+) -> FilterQuery:
+    """
+    Compile a filter into a query over its videos in the filter index.
+
+    The index holds the videos that match everything but the CREATED criteria, as
+    those depend on the time. They are applied to the indexed videos.
+
+    Args:
+        filter_ (Filter): The filter.
+        dialect (str): The name of the database dialect the query is run on.
+        now (datetime.datetime | None): The time CREATED criteria are relative to.
+            Defaults to the current time.
+
+    Returns:
+        FilterQuery: The compiled query.
+    """
+    now = now or datetime.datetime.utcnow()
+    created_criterias = [
+        criteria for criteria in filter_.criterias if criteria.field == CriteriaField.CREATED.value
+    ]
+    where: list[ColumnElement[Any]] = [
+        Video.id.in_(  # type: ignore[attr-defined]
+            sa.select(FilterVideoLink.video_id).where(FilterVideoLink.filter_id == filter_.id)
+        ),
+        *compile_criteria(criterias=created_criterias, now=now, dialect=dialect),
+    ]
+    return FilterQuery(where=where, order_by=compile_order_by(filter_=filter_))
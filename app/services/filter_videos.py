@@ -1,14 +1,325 @@
-from app.models.criteria import Criteria, CriteriaField, CriteriaOperator, CriteriaUnitOfMeasure
+import datetime
+import re
+from functools import partial
+
+import sqlalchemy as sa
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session
+
+from app import crud, settings
+from app.models.channel import Channel
+from app.models.criteria import Criteria, CriteriaField, CriteriaOperator
 from app.models.filter import Filter, FilterOrderedBy, FilterReadStatus
 from app.models.filtered_videos import FilteredVideos
 from app.models.subscription import Subscription
 from app.models.video import Video
+from app.services.channel_tags import ChannelTags, channel_tag_index
+from app.services.filter_cache import FilterResult, filter_results
+from app.services.filter_index import filter_indexer
+from app.services.filter_query import (
+    ANY_TAG,
+    FilterQuery,
+    compile_filter,
+    compile_indexed_filter,
+    get_unit_seconds,
+)
+from app.services.video_snapshot import video_snapshot
+
+COUNT_QUERY_MAX_FILTERS = 250
+
+
+async def get_filtered_videos(
+    db: Session, filter_: "Filter", max_videos: int | None = None, allow_stale: bool = False
+) -> FilteredVideos:
+    """
+    Filter videos based on the filter criteria.
+
+    With `settings.FILTER_BACKEND` "index", the videos of the filter are read from the
+    filter index, once the committed changes are indexed. With "sql", the filter is compiled
+    into one query over the videos of its subscriptions. Either way, one query selects the
+    ids of the limited videos and one counts all matching videos. The ids and the count
+    are cached until a commit changes an input of the filter, so repeated loads only select
+    the videos by id. With "python", the videos of the subscriptions are loaded and
+    filtered in Python, or the video snapshot is filtered if `settings.FILTER_SNAPSHOT` is
+    enabled.
+    """
+    if settings.FILTER_BACKEND == "python":
+        return await get_filtered_videos_in_python(db=db, filter_=filter_, max_videos=max_videos)
+
+    result, stale = filter_results.get(filter_id=filter_.id, limit=max_videos)
+    if result is None or (stale and not allow_stale):
+        result = await compute_filter_result(db=db, filter_=filter_, max_videos=max_videos)
+    elif stale:
+        filter_results.revalidate(
+            key=filter_.id,
+            refresh=partial(refresh_filter_result, filter_id=filter_.id, max_videos=max_videos),
+        )
 
+    video_ids = (result.video_ids or [])[:max_videos] if max_videos else result.video_ids or []
+    videos = await get_videos_by_ids(db=db, video_ids=video_ids)
 
-async def get_filtered_videos(filter_: "Filter", max_videos: int | None = None) -> FilteredVideos:
+    return FilteredVideos(
+        filter=filter_,
+        videos=videos,
+        videos_limited_count=len(videos),
+        videos_not_limited_count=result.count,
+        limit=max_videos,
+    )
+
+
+def get_filter_query(db: Session, filter_: Filter) -> FilterQuery:
     """
-    Filter videos based on the filter criteria.
+    Get the query of a filter for `settings.FILTER_BACKEND` "index" or "sql".
+
+    Args:
+        db (Session): The database session the query is run with.
+        filter_ (Filter): The filter.
+
+    Returns:
+        FilterQuery: The query.
+    """
+    # Committed changes may still be indexed in the background
+    dialect = db.get_bind().dialect.name
+    if settings.FILTER_BACKEND == "index" and filter_indexer.is_current:
+        return compile_indexed_filter(filter_=filter_, dialect=dialect)
+    return compile_filter(filter_=filter_, dialect=dialect)
+
+
+async def compute_filter_result(
+    db: Session, filter_: "Filter", max_videos: int | None = None
+) -> FilterResult:
+    """
+    Select the ordered ids and count the videos matching a filter, and cache them.
+
+    Args:
+        db (Session): The database session.
+        filter_ (Filter): The filter.
+        max_videos (int | None): Max video ids to select. None or 0 selects all.
+
+    Returns:
+        FilterResult: The result.
+    """
+    version = filter_results.version
+    filter_query = get_filter_query(db=db, filter_=filter_)
+    video_ids = db.execute(filter_query.select_video_ids(limit=max_videos)).scalars().all()
+    count = (
+        len(video_ids)
+        if not max_videos or len(video_ids) < max_videos
+        else db.execute(filter_query.count_videos()).scalar_one()
+    )
+    result = FilterResult(filter_=filter_, count=count, video_ids=video_ids, limit=max_videos)
+    filter_results.set(result=result, version=version)
+    return result
+
+
+async def refresh_filter_result(db: Session, filter_id: str, max_videos: int | None) -> None:
+    """
+    Recompute the cached result of a filter in its own session.
     """
+    db_filter = await crud.filter.get(db=db, id=filter_id)
+    await compute_filter_result(db=db, filter_=db_filter, max_videos=max_videos)
+
+
+async def get_videos_by_ids(db: Session, video_ids: list[str]) -> list[Video]:
+    """
+    Get videos in the order of their ids, with their channel and its tags.
+
+    Args:
+        db (Session): The database session.
+        video_ids (list[str]): The video ids.
+
+    Returns:
+        list[Video]: The videos. Ids of deleted videos are skipped.
+    """
+    if not video_ids:
+        return []
+    videos = {
+        video.id: video
+        for video in db.execute(
+            sa.select(Video).where(Video.id.in_(video_ids))  # type: ignore[attr-defined]
+            # Rendered with their channel and its tags
+            .options(selectinload(Video.channel).selectinload(Channel.tags))
+        ).scalars()
+    }
+    return [videos[video_id] for video_id in video_ids if video_id in videos]
+
+
+async def get_filter_counts(
+    db: Session, filters: list[Filter], allow_stale: bool = True
+) -> dict[str, int]:
+    """
+    Get the number of videos matching each filter.
+
+    Cached counts are reused, the others are counted at once and cached. Stale counts
+    are served while they are recounted in the background, if allowed.
+
+    Args:
+        db (Session): The database session.
+        filters (list[Filter]): The filters.
+        allow_stale (bool): Whether counts invalidated a moment ago may be served.
+
+    Returns:
+        dict[str, int]: The counts by filter id.
+    """
+    if settings.FILTER_BACKEND == "python":
+        return await count_filtered_videos(db=db, filters=filters)
+
+    counts: dict[str, int] = {}
+    stale_filter_ids: list[str] = []
+    uncached_filters: list[Filter] = []
+    for filter_ in filters:
+        result, stale = filter_results.get(filter_id=filter_.id, limit=0)
+        if result is None or (stale and not allow_stale):
+            uncached_filters.append(filter_)
+            continue
+        counts[filter_.id] = result.count
+        if stale:
+            stale_filter_ids.append(filter_.id)
+
+    if uncached_filters:
+        counts.update(await count_and_cache_filtered_videos(db=db, filters=uncached_filters))
+    if stale_filter_ids:
+        filter_results.revalidate(
+            key=",".join(stale_filter_ids),
+            refresh=partial(refresh_filter_counts, filter_ids=stale_filter_ids),
+        )
+    return counts
+
+
+async def count_and_cache_filtered_videos(db: Session, filters: list[Filter]) -> dict[str, int]:
+    """
+    Count the videos matching each filter at once and cache the counts.
+    """
+    version = filter_results.version
+    counts = await count_filtered_videos(db=db, filters=filters)
+    for filter_ in filters:
+        filter_results.set(
+            result=FilterResult(filter_=filter_, count=counts[filter_.id], video_ids=None, limit=0),
+            version=version,
+        )
+    return counts
+
+
+async def refresh_filter_counts(db: Session, filter_ids: list[str]) -> None:
+    """
+    Recount the cached counts of filters in their own session.
+    """
+    db_filters = [
+        db_filter for db_filter in await crud.filter.get_all(db=db) if db_filter.id in filter_ids
+    ]
+    await count_and_cache_filtered_videos(db=db, filters=db_filters)
+
+
+async def count_filtered_videos(db: Session, filters: list[Filter]) -> dict[str, int]:
+    """
+    Count the videos matching each filter, for all filters at once.
+
+    With `settings.FILTER_BACKEND` "index" or "sql", the counts of all filters are selected
+    with one query. With "python", every filter is evaluated over the video snapshot, or over
+    the videos of all subscriptions, loaded once.
+
+    Args:
+        db (Session): The database session.
+        filters (list[Filter]): The filters.
+
+    Returns:
+        dict[str, int]: The counts by filter id.
+    """
+    if not filters:
+        return {}
+    if settings.FILTER_BACKEND == "python":
+        return await count_filtered_videos_in_python(db=db, filters=filters)
+
+    counts: dict[str, int] = {}
+    # SQLite limits the number of SELECTs in one compound statement
+    for i in range(0, len(filters), COUNT_QUERY_MAX_FILTERS):
+        counts_query = sa.union_all(
+            *(
+                get_filter_query(db=db, filter_=filter_)
+                .count_videos()
+                .add_columns(sa.literal(filter_.id).label("filter_id"))
+                for filter_ in filters[i : i + COUNT_QUERY_MAX_FILTERS]
+            )
+        )
+        counts.update({filter_id: count for count, filter_id in db.execute(counts_query)})
+    return counts
+
+
+async def count_filtered_videos_in_python(db: Session, filters: list[Filter]) -> dict[str, int]:
+    """
+    Count the videos matching each filter over the video snapshot, or else over one shared
+    set of loaded videos.
+    """
+    channel_tags = channel_tag_index.get(db=db)
+    snapshot = video_snapshot.get(db=db)
+    if snapshot is not None:
+        return {
+            filter_.id: len(
+                snapshot.get_matching_rows(
+                    db=db,
+                    filter_=filter_,
+                    predicate=CriteriaPredicate(
+                        criterias=filter_.criterias, channel_tags=channel_tags
+                    ),
+                )
+            )
+            for filter_ in filters
+        }
+
+    videos: dict[str, Video] = {}
+    subscription_video_ids: dict[str, set[str]] = {}
+    for filter_ in filters:
+        for subscription in filter_.subscriptions:
+            if subscription.id not in subscription_video_ids:
+                subscription_videos = await get_videos_from_subscriptions([subscription])
+                subscription_video_ids[subscription.id] = {
+                    video.id for video in subscription_videos
+                }
+                videos.update({video.id: video for video in subscription_videos})
+
+    counts = {}
+    for filter_ in filters:
+        video_ids = set().union(
+            *(subscription_video_ids[subscription.id] for subscription in filter_.subscriptions)
+        )
+        filter_videos = await filter_by_read_status(
+            videos=[videos[video_id] for video_id in video_ids], read_status=filter_.read_status
+        )
+        if not filter_.show_hidden_channels:
+            filter_videos = await filter_hidden_channels(videos=filter_videos)
+        filter_videos = await filter_by_criterias(
+            videos=filter_videos, criterias=filter_.criterias, channel_tags=channel_tags
+        )
+        counts[filter_.id] = len(filter_videos)
+    return counts
+
+
+async def get_filtered_videos_in_python(
+    db: Session, filter_: "Filter", max_videos: int | None = None
+) -> FilteredVideos:
+    """
+    Filter videos based on the filter criteria, loading all videos of the subscriptions.
+
+    If `settings.FILTER_SNAPSHOT` is enabled, the filter is evaluated over the video snapshot instead, and
+    only the selected videos are loaded.
+    """
+    snapshot = video_snapshot.get(db=db)
+    if snapshot is not None:
+        predicate = CriteriaPredicate(
+            criterias=filter_.criterias, channel_tags=channel_tag_index.get(db=db)
+        )
+        video_ids, count = snapshot.select_video_ids(
+            db=db, filter_=filter_, predicate=predicate, max_videos=max_videos
+        )
+        videos = await get_videos_by_ids(db=db, video_ids=video_ids)
+        return FilteredVideos(
+            filter=filter_,
+            videos=videos,
+            videos_limited_count=len(videos),
+            videos_not_limited_count=count,
+            limit=max_videos,
+        )
+
     # Get videos
     videos = await get_videos_from_subscriptions(subscriptions=filter_.subscriptions)
 
@@ -16,10 +327,13 @@ async def get_filtered_videos(filter_: "Filter", max_videos: int | None = None)
     videos = await filter_by_read_status(videos=videos, read_status=filter_.read_status)
 
     # Filter Hidden Channels
-    videos = await filter_hidden_channels(videos=videos)
+    if not filter_.show_hidden_channels:
+        videos = await filter_hidden_channels(videos=videos)
 
     # Filter By Criterias
-    videos = await filter_by_criterias(videos=videos, criterias=filter_.criterias)
+    videos = await filter_by_criterias(
+        videos=videos, criterias=filter_.criterias, channel_tags=channel_tag_index.get(db=db)
+    )
 
     # Sort videos by Ordered By attribute
     videos = await sort_videos(
@@ -43,10 +357,12 @@ async def get_videos_from_subscriptions(subscriptions: list[Subscription]) -> li
     """
     Get all videos from subscriptions
     """
-    videos = []
+    # Videos of several subscriptions are kept once
+    videos: dict[str, Video] = {}
     for subscription in subscriptions:
-        videos.extend(subscription.videos)
-    return videos
+        for video in subscription.videos:
+            videos.setdefault(video.id, video)
+    return list(videos.values())
 
 
 async def filter_by_read_status(videos: list[Video], read_status: str) -> list[Video]:
@@ -67,113 +383,180 @@ async def filter_hidden_channels(videos: list[Video]) -> list[Video]:
     return [video for video in videos if video.channel.is_hidden is False]
 
 
-async def filter_by_criterias(videos: list[Video], criterias: list[Criteria]) -> list[Video]:
+class CriteriaPredicate:
+    def __init__(
+        self,
+        criterias: list[Criteria],
+        now: datetime.datetime | None = None,
+        channel_tags: ChannelTags | None = None,
+    ) -> None:
+        """
+        The criteria of a filter compiled into one predicate over videos.
+
+        Values are parsed once: keywords become one precompiled regex per operator,
+        CREATED criteria one cutoff, DURATION criteria integer bounds and tags bitmasks.
+        A video must meet all criteria, like in the SQL compiled by `compile_filter`.
+
+        Args:
+            criterias (list[Criteria]): The criteria of a filter.
+            now (datetime.datetime | None): The time CREATED criteria are relative to.
+                Defaults to the current time.
+            channel_tags (ChannelTags | None): The tags of the channels, needed by CHANNEL
+                criteria.
+
+        Raises:
+            ValueError: If there are CHANNEL criteria but no channel tags.
+        """
+        now = now or datetime.datetime.utcnow()
+        self.created_after: datetime.datetime | None = None
+        self.min_duration = 0
+        must_contain_keywords: list[str] = []
+        must_not_contain_keywords: list[str] = []
+        must_contain_tags: set[str] = set()
+        must_not_contain_tags: set[str] = set()
+        channel_ids: set[str] = set()
+        not_channel_ids: set[str] = set()
+        max_durations: list[int] = []
+
+        for criteria in criterias:
+            operator = criteria.operator
+            if criteria.field == CriteriaField.CHANNEL.value:
+                if operator == CriteriaOperator.MUST_CONTAIN.value:
+                    must_contain_tags.add(criteria.value)
+                elif operator == CriteriaOperator.MUST_NOT_CONTAIN.value:
+                    must_not_contain_tags.add(criteria.value)
+
+            elif criteria.field == CriteriaField.DURATION.value:
+                seconds = int(criteria.value) * get_unit_seconds(criteria.unit_of_measure)
+                if operator == CriteriaOperator.LONGER_THAN.value:
+                    self.min_duration = max(self.min_duration, seconds)
+                elif operator == CriteriaOperator.SHORTER_THAN.value:
+                    max_durations.append(seconds)
+
+            elif criteria.field == CriteriaField.CREATED.value:
+                seconds = int(criteria.value) * get_unit_seconds(criteria.unit_of_measure)
+                cutoff = now - datetime.timedelta(seconds=seconds)
+                self.created_after = max(self.created_after or cutoff, cutoff)
+
+            elif criteria.field == CriteriaField.KEYWORD.value:
+                if operator == CriteriaOperator.MUST_CONTAIN.value:
+                    must_contain_keywords.append(str(criteria.value))
+                elif operator == CriteriaOperator.MUST_NOT_CONTAIN.value:
+                    must_not_contain_keywords.append(str(criteria.value))
+
+            elif criteria.field == CriteriaField.CHANNEL_ID.value:
+                if operator == CriteriaOperator.IS.value:
+                    channel_ids.add(criteria.value)
+                elif operator == CriteriaOperator.IS_NOT.value:
+                    not_channel_ids.add(criteria.value)
+
+        self.max_duration: int | None = min(max_durations, default=None)
+
+        # Every keyword as a whole word, in one scan of the title and description
+        self.must_contain_pattern = (
+            re.compile(
+                "".join(rf"(?=.*\b{re.escape(keyword)}\b)" for keyword in must_contain_keywords),
+                re.IGNORECASE | re.DOTALL,
+            )
+            if must_contain_keywords
+            else None
+        )
+        self.must_not_contain_pattern = (
+            re.compile(
+                "|".join(rf"\b{re.escape(keyword)}\b" for keyword in must_not_contain_keywords),
+                re.IGNORECASE,
+            )
+            if must_not_contain_keywords
+            else None
+        )
+        self.channel_ids = frozenset(channel_ids)
+        self.not_channel_ids = frozenset(not_channel_ids)
+
+        # Tags become masks, "ANY" the mask of all tags and untagged channels have mask 0
+        self.has_tag_criteria = bool(must_contain_tags or must_not_contain_tags)
+        if self.has_tag_criteria and channel_tags is None:
+            raise ValueError("CHANNEL criteria need the tags of the channels")
+        self.channel_tags = channel_tags or ChannelTags(tag_bits={}, channel_masks={})
+        self.must_contain_mask = self.get_tags_mask(tag_names=must_contain_tags)
+        self.must_not_contain_mask = self.get_tags_mask(tag_names=must_not_contain_tags)
+        self.has_must_contain_tags = bool(must_contain_tags)
+
+    def get_tags_mask(self, tag_names: set[str]) -> int:
+        if ANY_TAG in tag_names:
+            return -1
+        return self.channel_tags.get_tags_mask(tag_names=tag_names)
+
+    def matches_channel(self, remote_channel_id: str) -> bool:
+        """
+        Check whether the channel of a video meets the CHANNEL and CHANNEL_ID criteria.
+
+        Args:
+            remote_channel_id (str): The remote id of the channel.
+
+        Returns:
+            bool: True if the channel meets the criteria.
+        """
+        if self.channel_ids and remote_channel_id not in self.channel_ids:
+            return False
+        if remote_channel_id in self.not_channel_ids:
+            return False
+        if not self.has_tag_criteria:
+            return True
+        mask = self.channel_tags.get_channel_mask(remote_channel_id=remote_channel_id)
+        if self.has_must_contain_tags and not mask & self.must_contain_mask:
+            return False
+        return not mask & self.must_not_contain_mask
+
+    def matches_text(self, text: str) -> bool:
+        """
+        Check whether the text of a video meets the KEYWORD criteria.
+
+        Args:
+            text (str): The title and the description, separated by a newline, as keywords
+                may be in either but do not span both.
+
+        Returns:
+            bool: True if the text meets the criteria.
+        """
+        if self.must_contain_pattern is not None and not self.must_contain_pattern.match(text):
+            return False
+        return self.must_not_contain_pattern is None or not self.must_not_contain_pattern.search(
+            text
+        )
+
+    def __call__(self, video: Video) -> bool:
+        """
+        Check whether a video meets all criteria.
+
+        Args:
+            video (Video): The video.
+
+        Returns:
+            bool: True if the video meets all criteria.
+        """
+        if self.created_after is not None and video.created_at < self.created_after:
+            return False
+        # Videos of unknown duration are kept
+        if video.duration and (
+            video.duration < self.min_duration
+            or (self.max_duration is not None and video.duration > self.max_duration)
+        ):
+            return False
+        if not self.matches_channel(remote_channel_id=video.remote_channel_id):
+            return False
+        return self.matches_text(text=f"{video.title or ''}\n{video.description or ''}")
+
+
+async def filter_by_criterias(
+    videos: list[Video], criterias: list[Criteria], channel_tags: ChannelTags | None = None
+) -> list[Video]:
     """
     Filter videos based on all filter criterias
     """
-
-    # Filter by Tags
-    videos = await filter_by_criteria_tags(videos=videos, criterias=criterias)
-
-    return videos
-
-
-async def filter_by_criteria_tags(videos: list[Video], criterias: list[Criteria]) -> list[Video]:
-    """
-    Filter videos based on criteria tags
-    """
-    criteria_must_contain_tags = [
-        criteria.value
-        for criteria in criterias
-        if criteria.field == CriteriaField.CHANNEL.value
-        and criteria.operator == CriteriaOperator.MUST_CONTAIN.value
-    ]
-
-    criteria_must_not_contain_tags = [
-        criteria.value
-        for criteria in criterias
-        if criteria.field == CriteriaField.CHANNEL.value
-        and criteria.operator == CriteriaOperator.MUST_NOT_CONTAIN.value
-    ]
-
-    criteria_duration = False
-    criteria_duration_greater_than = 0
-    criteria_duration_shorter_than = 86400
-    for criteria in criterias:
-        if criteria.field == CriteriaField.DURATION.value:
-            criteria_duration = True
-
-            # set value in seconds
-            if criteria.unit_of_measure == CriteriaUnitOfMeasure.MINUTES.value:
-                criteria_value_seconds = int(criteria.value) * 60
-            elif criteria.unit_of_measure == CriteriaUnitOfMeasure.HOURS.value:
-                criteria_value_seconds = int(criteria.value) * 60 * 60
-            else:
-                criteria_value_seconds = int(criteria.value)
-
-            if criteria.operator == CriteriaOperator.LONGER_THAN.value:
-                if criteria_value_seconds > criteria_duration_greater_than:
-                    criteria_duration_greater_than = criteria_value_seconds
-
-            if criteria.operator == CriteriaOperator.SHORTER_THAN.value:
-                if criteria_value_seconds < criteria_duration_shorter_than:
-                    criteria_duration_shorter_than = criteria_value_seconds
-
-    if (
-        not criteria_must_contain_tags
-        and not criteria_must_not_contain_tags
-        and not criteria_duration
-    ):
+    if not criterias:
         return videos
-
-    # Filter Tags
-
-    filtered_videos = []
-    for video in videos:
-        append_video = False
-        video_channel_tags = [tag.name for tag in video.channel.tags]
-
-        # Must Contain Tags
-        if criteria_must_contain_tags:
-            for video_channel_tag in video_channel_tags:
-                if (
-                    video_channel_tag in criteria_must_contain_tags
-                    or "ANY" in criteria_must_contain_tags
-                ):
-                    append_video = True
-                    break
-
-        # Must NOT Contain Tags
-        if criteria_must_not_contain_tags:
-            if "ANY" in criteria_must_not_contain_tags:
-                if not video_channel_tags:
-                    append_video = True
-            else:
-                for video_channel_tag in video_channel_tags:
-                    if video_channel_tag in criteria_must_not_contain_tags:
-                        append_video = False
-                        break
-                    else:
-                        append_video = True
-
-        # Duration
-        if criteria_duration:
-            if not video.duration:
-                append_video = True
-            else:
-                if (
-                    video.duration >= criteria_duration_greater_than
-                    and video.duration <= criteria_duration_shorter_than
-                ):
-                    append_video = True
-                else:
-                    append_video = False
-
-        # Append video
-        if append_video:
-            filtered_videos.append(video)
-
-    return filtered_videos
+    predicate = CriteriaPredicate(criterias=criterias, channel_tags=channel_tags)
+    return [video for video in videos if predicate(video)]
 
 
 async def sort_videos(
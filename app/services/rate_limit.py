@@ -0,0 +1,210 @@
+from typing import Any
+
+import asyncio
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+from loguru import logger as _logger
+
+from app.models.settings import Settings as _Settings
+
+settings = _Settings()
+
+logger = _logger.bind(name="logger")
+
+ANONYMOUS_IDENTITY = "anonymous"
+
+
+class RateLimitWait:
+    def __init__(self) -> None:
+        """
+        Accumulates the time spent waiting for rate limiters.
+        """
+        self.seconds = 0.0
+
+
+_current_wait: ContextVar[RateLimitWait | None] = ContextVar("rate_limit_wait", default=None)
+
+
+@contextmanager
+def track_rate_limit_wait() -> Iterator[RateLimitWait]:
+    """
+    Track the rate limiter waits of the block, including waits in tasks and threads it starts.
+
+    Yields:
+        RateLimitWait: The accumulated wait time.
+    """
+    wait = RateLimitWait()
+    token = _current_wait.set(wait)
+    try:
+        yield wait
+    finally:
+        _current_wait.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst: int, min_rate_ratio: float) -> None:
+        """
+        A token bucket that spaces out calls to a service.
+
+        The bucket holds up to `burst` tokens and refills at the current rate. A call takes a
+        token, or waits until one is available. When the service throttles, the rate is
+        halved down to `min_rate_ratio` of the configured rate, and it recovers additively
+        with every successful call.
+
+        Args:
+            rate_per_minute (float): The configured number of calls per minute.
+            burst (int): Max tokens, i.e. calls that can be made at once after an idle period.
+            min_rate_ratio (float): Lower bound of the rate as a fraction of the configured rate.
+        """
+        self.base_rate = max(rate_per_minute, 0.001) / 60
+        self.rate = self.base_rate
+        self.min_rate = self.base_rate * min(max(min_rate_ratio, 0.001), 1)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> float:
+        """
+        Take a token, waiting until one is available.
+
+        Returns:
+            float: The seconds waited.
+        """
+        start = time.monotonic()
+        # Waiters are served in order
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+        return time.monotonic() - start
+
+    def penalize(self) -> None:
+        """
+        Halve the rate and drop the saved tokens after the service throttled a call.
+        """
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+
+    def reward(self) -> None:
+        """
+        Raise the rate back towards the configured rate after a successful call.
+        """
+        if self.rate < self.base_rate:
+            self._refill()
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+def get_service_name(url: str) -> str:
+    """
+    Get the name of the service handler of a URL, or its domain if no handler matches.
+
+    Args:
+        url (str): The URL to extract.
+
+    Returns:
+        str: The service name, e.g. "YoutubeHandler".
+    """
+    # Handlers use yt-dlp themselves, so they are imported when they are needed
+    from app.handlers import get_service_handler_from_url  # pylint: disable=import-outside-toplevel
+    from app.handlers.exceptions import (  # pylint: disable=import-outside-toplevel
+        HandlerNotFoundError,
+    )
+
+    try:
+        return get_service_handler_from_url(url=url).name
+    except HandlerNotFoundError:
+        return ".".join(urlparse(url).netloc.split(".")[-2:]) or "unknown"
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rates_per_minute: dict[str, float],
+        default_rate_per_minute: float,
+        burst: int,
+        min_rate_ratio: float,
+        enabled: bool = True,
+    ) -> None:
+        """
+        Keeps one token bucket per service handler and cookie identity.
+
+        Args:
+            rates_per_minute (dict[str, float]): Calls per minute by service handler name.
+            default_rate_per_minute (float): Calls per minute of other services.
+            burst (int): Max calls that can be made at once after an idle period.
+            min_rate_ratio (float): Lower bound of an adapted rate as a fraction of its rate.
+            enabled (bool): Whether calls are limited at all.
+        """
+        self.rates_per_minute = rates_per_minute
+        self.default_rate_per_minute = default_rate_per_minute
+        self.burst = burst
+        self.min_rate_ratio = min_rate_ratio
+        self.enabled = enabled
+        self.buckets: dict[tuple[str, str], TokenBucket] = {}
+
+    def get_bucket(self, url: str, ydl_opts: dict[str, Any]) -> TokenBucket:
+        """
+        Get the bucket of the service and cookie identity of an extraction.
+
+        Args:
+            url (str): The URL to extract.
+            ydl_opts (dict[str, Any]): The yt-dlp options. The `cookiefile` is the identity.
+
+        Returns:
+            TokenBucket: The bucket.
+        """
+        service = get_service_name(url=url)
+        identity = str(ydl_opts.get("cookiefile") or ANONYMOUS_IDENTITY)
+        bucket = self.buckets.get((service, identity))
+        if bucket is None:
+            bucket = TokenBucket(
+                rate_per_minute=self.rates_per_minute.get(service, self.default_rate_per_minute),
+                burst=self.burst,
+                min_rate_ratio=self.min_rate_ratio,
+            )
+            self.buckets[(service, identity)] = bucket
+        return bucket
+
+    async def acquire(self, url: str, ydl_opts: dict[str, Any]) -> TokenBucket | None:
+        """
+        Wait for the bucket of an extraction and add the wait to the tracked wait time.
+
+        Args:
+            url (str): The URL to extract.
+            ydl_opts (dict[str, Any]): The yt-dlp options.
+
+        Returns:
+            TokenBucket | None: The bucket, to report throttling to, or None if disabled.
+        """
+        if not self.enabled:
+            return None
+        bucket = self.get_bucket(url=url, ydl_opts=ydl_opts)
+        waited = await bucket.acquire()
+        if waited > 0.001:
+            logger.debug(f"Waited {waited:.2f}s for the rate limit of {url}.")
+        wait = _current_wait.get()
+        if wait is not None:
+            wait.seconds += waited
+        return bucket
+
+
+rate_limiter = RateLimiter(
+    rates_per_minute=settings.YTDLP_RATE_LIMITS_PER_MINUTE,
+    default_rate_per_minute=settings.YTDLP_RATE_LIMIT_DEFAULT_PER_MINUTE,
+    burst=settings.YTDLP_RATE_LIMIT_BURST,
+    min_rate_ratio=settings.YTDLP_RATE_LIMIT_MIN_RATIO,
+    enabled=settings.YTDLP_RATE_LIMIT_ENABLED,
+)
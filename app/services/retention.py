@@ -0,0 +1,247 @@
+from typing import Callable
+
+import asyncio
+import datetime
+
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app import logger, settings
+from app.db.session import SessionLocal
+from app.models import FetchResults, FilterVideoLink, PlaylistItem, SubscriptionVideoLink, Video
+from app.services.fetch import db_write_lock
+from app.services.video_fts import rebuild_video_fts
+
+
+def select_orphaned_video_ids(batch_size: int) -> sa.sql.Select:
+    """
+    Select the ids of fetched videos that are not linked to any subscription.
+
+    Videos created by hand have no remote video id and are never linked to a subscription,
+    so they are kept.
+
+    Args:
+        batch_size (int): Max ids to select.
+
+    Returns:
+        sa.sql.Select: The statement.
+    """
+    linked = sa.select(SubscriptionVideoLink.video_id).where(
+        SubscriptionVideoLink.video_id == Video.id
+    )
+    return (
+        sa.select(Video.id)
+        .where(
+            Video.remote_video_id.is_not(None),  # type: ignore[union-attr]
+            ~linked.exists(),
+        )
+        .limit(batch_size)
+    )
+
+
+def select_aged_read_video_ids(cutoff: datetime.datetime, batch_size: int) -> sa.sql.Select:
+    """
+    Select the ids of fetched read videos released before the cutoff that are in no playlist.
+
+    Args:
+        cutoff (datetime.datetime): Videos released before are aged.
+        batch_size (int): Max ids to select.
+
+    Returns:
+        sa.sql.Select: The statement.
+    """
+    in_playlist = sa.select(PlaylistItem.id).where(PlaylistItem.url == Video.url)
+    return (
+        sa.select(Video.id)
+        .where(
+            Video.remote_video_id.is_not(None),  # type: ignore[union-attr]
+            Video.is_read.is_(True),  # type: ignore[attr-defined]
+            # Feeds do not always tell the release date, then the video ages from its fetch
+            sa.func.coalesce(Video.released_at, Video.created_at) < cutoff,
+            ~in_playlist.exists(),
+        )
+        .limit(batch_size)
+    )
+
+
+async def delete_videos_in_batches(db: Session, select_ids: sa.sql.Select) -> int:
+    """
+    Delete the selected videos and their subscription and filter links, one batch per
+    transaction.
+
+    Every batch is selected, deleted with set-based DELETEs and committed while holding
+    the database write lock, so fetches only wait for one batch at a time.
+
+    Args:
+        db (Session): The database session.
+        select_ids (sa.sql.Select): Selects the ids of the next batch of videos to delete.
+
+    Returns:
+        int: The number of deleted videos.
+    """
+    deleted = 0
+    while True:
+        async with db_write_lock:
+            video_ids = db.execute(select_ids).scalars().all()
+            if video_ids:
+                db.execute(
+                    sa.delete(SubscriptionVideoLink).where(
+                        SubscriptionVideoLink.video_id.in_(video_ids)  # type: ignore[attr-defined]
+                    )
+                )
+                db.execute(
+                    sa.delete(FilterVideoLink).where(
+                        FilterVideoLink.video_id.in_(video_ids)  # type: ignore[attr-defined]
+                    )
+                )
+                db.execute(sa.delete(Video).where(Video.id.in_(video_ids)))  # type: ignore
+            db.commit()
+        if not video_ids:
+            return deleted
+        deleted += len(video_ids)
+        # Let fetches and requests run between batches
+        await asyncio.sleep(0)
+
+
+def optimize_database(db: Session, vacuum: bool) -> None:
+    """
+    Let SQLite refresh its query planner statistics and optionally reclaim free pages.
+
+    Args:
+        db (Session): The database session.
+        vacuum (bool): Whether to run VACUUM, which rewrites the whole database file.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    if vacuum:
+        # VACUUM cannot run inside a transaction
+        with bind.engine.connect() as connection:
+            try:
+                connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+            except sa.exc.OperationalError as e:
+                logger.warning(f"Could not vacuum the database. {e}")
+            else:
+                # VACUUM may renumber the rowids the full-text index refers to
+                rebuild_video_fts(db=db)
+    db.execute(sa.text("PRAGMA optimize"))
+    db.commit()
+
+
+async def collect_garbage(
+    db: Session, read_video_max_age_days: int, batch_size: int, vacuum: bool = True
+) -> FetchResults:
+    """
+    Delete videos that are no longer needed.
+
+    Videos that no subscription links to are deleted, as well as read videos that were
+    released more than `read_video_max_age_days` ago, unless they are in a playlist.
+
+    Args:
+        db (Session): The database session.
+        read_video_max_age_days (int): Max age of read videos. 0 keeps read videos.
+        batch_size (int): Max videos deleted per transaction.
+        vacuum (bool): Whether to VACUUM the database if videos were deleted.
+
+    Returns:
+        FetchResults: The results, with the number of deleted videos.
+    """
+    batch_size = max(1, batch_size)
+    results = FetchResults()
+    if read_video_max_age_days > 0:
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=read_video_max_age_days)
+        results.deleted_videos += await delete_videos_in_batches(
+            db=db, select_ids=select_aged_read_video_ids(cutoff=cutoff, batch_size=batch_size)
+        )
+    results.deleted_videos += await delete_videos_in_batches(
+        db=db, select_ids=select_orphaned_video_ids(batch_size=batch_size)
+    )
+
+    async with db_write_lock:
+        optimize_database(db=db, vacuum=vacuum and results.deleted_videos > 0)
+
+    logger.success(f"Garbage collection deleted {results.deleted_videos} videos.")
+    return results
+
+
+class RetentionJob:
+    def __init__(
+        self,
+        interval_hours: float,
+        read_video_max_age_days: int,
+        batch_size: int,
+        vacuum: bool = True,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ) -> None:
+        """
+        Periodically deletes orphaned and aged videos in the background.
+
+        Args:
+            interval_hours (float): Time between two garbage collections.
+            read_video_max_age_days (int): Max age of read videos. 0 keeps read videos.
+            batch_size (int): Max videos deleted per transaction.
+            vacuum (bool): Whether to VACUUM the database after videos were deleted.
+            session_factory (Callable[[], Session]): Creates the database session of a run.
+        """
+        self.interval_seconds = max(1.0, interval_hours * 3600)
+        self.read_video_max_age_days = read_video_max_age_days
+        self.batch_size = batch_size
+        self.vacuum = vacuum
+        self.session_factory = session_factory
+        self.last_results: FetchResults | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def run_once(self) -> FetchResults:
+        """
+        Run one garbage collection.
+
+        Returns:
+            FetchResults: The results, with the number of deleted videos.
+        """
+        db = self.session_factory()
+        try:
+            self.last_results = await collect_garbage(
+                db=db,
+                read_video_max_age_days=self.read_video_max_age_days,
+                batch_size=self.batch_size,
+                vacuum=self.vacuum,
+            )
+        finally:
+            db.close()
+        return self.last_results
+
+    async def run(self) -> None:
+        """
+        Run the garbage collection every interval until cancelled.
+        """
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception(e)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        """
+        Start the garbage collection loop in the background.
+        """
+        if self._task is None or self._task.done():
+            logger.debug("Starting retention job...")
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stop the garbage collection loop.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+retention_job = RetentionJob(
+    interval_hours=settings.RETENTION_INTERVAL_HOURS,
+    read_video_max_age_days=settings.RETENTION_READ_VIDEO_MAX_AGE_DAYS,
+    batch_size=settings.RETENTION_BATCH_SIZE,
+    vacuum=settings.RETENTION_VACUUM,
+)
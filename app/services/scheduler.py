@@ -0,0 +1,308 @@
+import asyncio
+import datetime
+import heapq
+import random
+from functools import partial
+
+from sqlmodel import Session
+
+from app import crud, logger, settings
+from app.models import Subscription
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.fetch import FetchCanceledError, db_write_lock, fetch_subscription
+
+
+class FetchScheduler:
+    def __init__(
+        self,
+        max_concurrent_jobs: int,
+        jitter_ratio: float,
+        max_backoff_minutes: int,
+        sync_interval_seconds: float = 60,
+    ) -> None:
+        """
+        Schedules subscription fetches individually instead of refetching everything at once.
+
+        Every subscription has its own `next_fetch_at` and fetch interval stored in the
+        database. Due subscriptions are kept in a min-heap ordered by `next_fetch_at`, at
+        most `max_concurrent_jobs` fetches run at the same time, the next fetch time is
+        jittered so fetches drift apart, and failing subscriptions back off exponentially.
+
+        Args:
+            max_concurrent_jobs (int): Max subscription fetches running at the same time.
+            jitter_ratio (float): Max jitter as a fraction of the fetch interval.
+            max_backoff_minutes (int): Upper bound of the delay after repeated failures.
+            sync_interval_seconds (float): How often new subscriptions are picked up.
+        """
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.jitter_ratio = max(0.0, jitter_ratio)
+        self.max_backoff = datetime.timedelta(minutes=max(1, max_backoff_minutes))
+        self.sync_interval_seconds = sync_interval_seconds
+
+        self._due: list[tuple[datetime.datetime, str]] = []
+        self._scheduled: dict[str, datetime.datetime] = {}
+        self._running: dict[str, asyncio.Task[None]] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def get_interval(self, db_subscription: Subscription) -> datetime.timedelta:
+        """
+        Get the fetch interval of a subscription.
+
+        Args:
+            db_subscription (Subscription): The subscription.
+
+        Returns:
+            datetime.timedelta: The subscription's interval, or the global default.
+        """
+        minutes = (
+            db_subscription.fetch_interval_minutes
+            or settings.REFRESH_SUBSCRIPTIONS_INTERVAL_MINUTES
+        )
+        return datetime.timedelta(minutes=max(1, minutes))
+
+    def get_next_fetch_at(
+        self, db_subscription: Subscription, now: datetime.datetime
+    ) -> datetime.datetime:
+        """
+        Calculate when a subscription should be fetched next.
+
+        The delay is the subscription's interval, doubled for every consecutive failure up to
+        `max_backoff`, and moved by a random jitter of up to `jitter_ratio` of the delay.
+
+        Args:
+            db_subscription (Subscription): The subscription.
+            now (datetime.datetime): The current time.
+
+        Returns:
+            datetime.datetime: The next fetch time.
+        """
+        delay = self.get_interval(db_subscription=db_subscription)
+        if db_subscription.fetch_failures > 0:
+            delay = min(delay * 2 ** min(db_subscription.fetch_failures, 16), self.max_backoff)
+        jitter = delay * random.uniform(-self.jitter_ratio, self.jitter_ratio)
+        return now + delay + jitter
+
+    def schedule(self, subscription_id: str, due_at: datetime.datetime) -> None:
+        """
+        Add a subscription to the due-queue, replacing any earlier entry for it.
+
+        Args:
+            subscription_id (str): The id of the subscription.
+            due_at (datetime.datetime): When the subscription is due.
+        """
+        # Replaced entries stay in the heap and are skipped when popped.
+        self._scheduled[subscription_id] = due_at
+        heapq.heappush(self._due, (due_at, subscription_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def pop_due(self, now: datetime.datetime, limit: int) -> list[str]:
+        """
+        Pop subscriptions that are due.
+
+        Args:
+            now (datetime.datetime): The current time.
+            limit (int): Max number of subscriptions to pop.
+
+        Returns:
+            list[str]: The ids of the due subscriptions, earliest first.
+        """
+        due_ids: list[str] = []
+        while self._due and len(due_ids) < limit and self._due[0][0] <= now:
+            due_at, subscription_id = heapq.heappop(self._due)
+            if self._scheduled.get(subscription_id) != due_at:
+                continue
+            del self._scheduled[subscription_id]
+            due_ids.append(subscription_id)
+        return due_ids
+
+    def get_seconds_until_next_due(self, now: datetime.datetime) -> float | None:
+        """
+        Get the seconds until the earliest scheduled subscription is due.
+
+        Args:
+            now (datetime.datetime): The current time.
+
+        Returns:
+            float | None: The seconds to wait, or None if nothing is scheduled.
+        """
+        while self._due and self._scheduled.get(self._due[0][1]) != self._due[0][0]:
+            heapq.heappop(self._due)
+        if not self._due:
+            return None
+        return max(0.0, (self._due[0][0] - now).total_seconds())
+
+    async def sync(self, db: Session) -> None:
+        """
+        Schedule subscriptions that are not in the due-queue yet.
+
+        Subscriptions without a stored `next_fetch_at` get a random time within their
+        interval, so that a fresh install does not fetch everything at once.
+
+        Args:
+            db (Session): The database session.
+        """
+        now = datetime.datetime.utcnow()
+        subscriptions = await crud.subscription.get_all(db=db)
+        subscription_ids = {subscription.id for subscription in subscriptions}
+        for subscription_id in list(self._scheduled):
+            if subscription_id not in subscription_ids:
+                del self._scheduled[subscription_id]
+
+        assigned = False
+        for subscription in subscriptions:
+            if subscription.id in self._scheduled or subscription.id in self._running:
+                continue
+            if subscription.next_fetch_at is None:
+                interval = self.get_interval(db_subscription=subscription)
+                subscription.next_fetch_at = now + interval * random.random()
+                assigned = True
+            self.schedule(subscription_id=subscription.id, due_at=subscription.next_fetch_at)
+
+        if assigned:
+            async with db_write_lock:
+                db.commit()
+
+    async def run_job(self, db: Session, subscription_id: str) -> None:
+        """
+        Fetch a subscription and schedule its next fetch.
+
+        Args:
+            db (Session): The database session.
+            subscription_id (str): The id of the subscription to fetch.
+        """
+        failed = False
+        try:
+            await fetch_subscription(db=db, id=subscription_id)
+        except crud.RecordNotFoundError:
+            return
+        except FetchCanceledError as e:
+            # Skips by an open circuit breaker are not failures of the subscription
+            failed = not isinstance(e.__cause__, CircuitOpenError)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(e)
+            failed = True
+
+        async with db_write_lock:
+            try:
+                db_subscription = await crud.subscription.get(db=db, id=subscription_id)
+            except crud.RecordNotFoundError:
+                return
+            now = datetime.datetime.utcnow()
+            db_subscription.fetch_failures = db_subscription.fetch_failures + 1 if failed else 0
+            db_subscription.last_fetched_at = now
+            db_subscription.next_fetch_at = self.get_next_fetch_at(
+                db_subscription=db_subscription, now=now
+            )
+            db.commit()
+
+        if failed:
+            logger.warning(
+                f"Fetch of {db_subscription.__repr__()} failed "
+                f"{db_subscription.fetch_failures} time(s) in a row. "
+                f"Retrying at {db_subscription.next_fetch_at}."
+            )
+        self.schedule(subscription_id=subscription_id, due_at=db_subscription.next_fetch_at)
+
+    async def reschedule(self, db: Session, db_subscription: Subscription) -> None:
+        """
+        Recalculate the next fetch of a subscription after its fetch interval changed.
+
+        The next fetch is counted from the last one, so that a shorter interval takes effect
+        right away instead of after the fetch that was scheduled with the old interval.
+
+        Args:
+            db (Session): The database session.
+            db_subscription (Subscription): The updated subscription.
+        """
+        subscription_id = db_subscription.id
+        if db_subscription.last_fetched_at is None:
+            interval = self.get_interval(db_subscription=db_subscription)
+            next_fetch_at = datetime.datetime.utcnow() + interval * random.random()
+        else:
+            next_fetch_at = self.get_next_fetch_at(
+                db_subscription=db_subscription, now=db_subscription.last_fetched_at
+            )
+        async with db_write_lock:
+            db_subscription.next_fetch_at = next_fetch_at
+            db.commit()
+
+        # A running fetch schedules the next one with the new interval when it is done
+        if subscription_id not in self._running:
+            self.schedule(subscription_id=subscription_id, due_at=next_fetch_at)
+
+    def _on_job_done(
+        self, subscription_id: str, task: "asyncio.Task[None]"  # pylint: disable=unused-argument
+    ) -> None:
+        self._running.pop(subscription_id, None)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self, db: Session) -> None:
+        """
+        Run the scheduler loop until cancelled.
+
+        Args:
+            db (Session): The database session.
+        """
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        last_sync = -self.sync_interval_seconds
+        while True:
+            if loop.time() - last_sync >= self.sync_interval_seconds:
+                try:
+                    await self.sync(db=db)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.exception(e)
+                last_sync = loop.time()
+
+            now = datetime.datetime.utcnow()
+            free_slots = self.max_concurrent_jobs - len(self._running)
+            for subscription_id in self.pop_due(now=now, limit=free_slots):
+                task = asyncio.create_task(self.run_job(db=db, subscription_id=subscription_id))
+                task.add_done_callback(partial(self._on_job_done, subscription_id))
+                self._running[subscription_id] = task
+
+            timeout = self.sync_interval_seconds
+            if len(self._running) < self.max_concurrent_jobs:
+                seconds_until_next_due = self.get_seconds_until_next_due(now=now)
+                if seconds_until_next_due is not None:
+                    timeout = min(timeout, seconds_until_next_due)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, db: Session) -> None:
+        """
+        Start the scheduler loop in the background.
+
+        Args:
+            db (Session): The database session.
+        """
+        if self._task is None or self._task.done():
+            logger.debug("Starting fetch scheduler...")
+            self._task = asyncio.create_task(self.run(db=db))
+
+    async def stop(self) -> None:
+        """
+        Stop the scheduler loop and cancel running fetches.
+        """
+        tasks = [*self._running.values()]
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._wakeup = None
+        self._running.clear()
+
+
+fetch_scheduler = FetchScheduler(
+    max_concurrent_jobs=settings.SCHEDULER_MAX_CONCURRENT_JOBS,
+    jitter_ratio=settings.SCHEDULER_JITTER_RATIO,
+    max_backoff_minutes=settings.SCHEDULER_MAX_BACKOFF_MINUTES,
+)
@@ -1,17 +1,23 @@
 from typing import Any
 
+import asyncio
+import datetime
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+
 from sqlmodel import Session
 
-from app import crud
-from app.models import Subscription, VideoCreate
-from app.models.channel import ChannelCreate, ChannelUpdate
-from app.services.ytdlp import get_info_dict
+from app import crud, logger, settings
+from app.models import Subscription, SubscriptionFetchStats, VideoCreate
+from app.models.channel import ChannelCreate
+from app.services.ytdlp import LazyExtractionNotSupportedError, get_info_dict, iter_playlist_entries
 
 
 async def get_subscription_info_dict(
     db_subscription: Subscription,
     reverse_import_order: bool = False,
     max_videos: int = 100,
+    use_cache: bool = True,
 ) -> dict[str, Any]:
     """
     Retrieve the info_dict from yt-dlp for a Subscription
@@ -19,6 +25,7 @@ async def get_subscription_info_dict(
     Parameters:
         db_subscription: The Subscription object
         reverse_import_order (bool): Whether to reverse the order of the videos in the playlist.
+        use_cache (bool): Whether a cached info dict may be used.
 
     Returns:
         dict: The info dictionary for the Subscription
@@ -36,6 +43,7 @@ async def get_subscription_info_dict(
     _subscription_info_dict = await get_info_dict(
         url=db_subscription.url,
         ydl_opts=ydl_opts,
+        use_cache=use_cache,
         # custom_extractors=custom_extractors,
         # ie_key="CustomRumbleChannel",
     )
@@ -44,11 +52,306 @@ async def get_subscription_info_dict(
     return _subscription_info_dict
 
 
+async def fetch_subscription_videos(
+    db: Session,
+    db_subscription: Subscription,
+    stats: SubscriptionFetchStats | None = None,
+    use_cache: bool = True,
+) -> tuple[list[VideoCreate], int]:
+    """
+    Fetch the videos of a Subscription's feed from yt-dlp.
+
+    If `settings.FETCH_INCREMENTAL` is enabled, the feed is read lazily and stops at the
+    first run of already known videos. It falls back to a full fetch if the feed
+    cannot be read lazily.
+
+    Args:
+        db (Session): The database session.
+        db_subscription: The Subscription object
+        stats (SubscriptionFetchStats | None): Receives the extraction and mapping times
+            and the number of entries read.
+        use_cache (bool): Whether a cached info dict may be used for a full fetch.
+
+    Returns:
+        tuple[list[VideoCreate], int]: The fetched videos, in import order, and the number
+            of entries of the fetch window that were skipped.
+    """
+    if settings.FETCH_INCREMENTAL:
+        known_remote_video_ids = await crud.video.get_remote_video_ids_by_subscription_id(
+            db=db, subscription_id=db_subscription.id
+        )
+        try:
+            return await get_subscription_videos_incremental(
+                db_subscription=db_subscription,
+                known_remote_video_ids=known_remote_video_ids,
+                reverse_import_order=True,
+                stats=stats,
+            )
+        except LazyExtractionNotSupportedError as e:
+            logger.warning(
+                f"Incremental fetch not supported for {db_subscription.__repr__()}. "
+                f"Falling back to a full fetch. {e}"
+            )
+
+    stats = stats or SubscriptionFetchStats(subscription_id=db_subscription.id)
+    with stats.measure("extract"):
+        subscription_info_dict = await get_subscription_info_dict(
+            db_subscription=db_subscription, reverse_import_order=True, use_cache=use_cache
+        )
+    with stats.measure("mapping"):
+        fetched_videos = get_subscription_videos_from_subscription_info_dict(
+            subscription_info_dict=subscription_info_dict, db_subscription=db_subscription
+        )
+    stats.entries_seen += count_subscription_info_dict_entries(
+        subscription_info_dict=subscription_info_dict
+    )
+    return fetched_videos, 0
+
+
+async def get_subscription_videos_incremental(
+    db_subscription: Subscription,
+    known_remote_video_ids: set[str],
+    reverse_import_order: bool = False,
+    stats: SubscriptionFetchStats | None = None,
+) -> tuple[list[VideoCreate], int]:
+    """
+    Read a Subscription's feed lazily, newest first, until a run of known videos is found.
+
+    Reading stops after `settings.FETCH_INCREMENTAL_KNOWN_RUN` consecutive entries whose
+    remote video id is in `known_remote_video_ids`. If no such run is found, the whole
+    `max_videos_per_fetch` window is read, like a full fetch.
+
+    Parameters:
+        db_subscription: The Subscription object
+        known_remote_video_ids (set[str]): Remote video ids already in the subscription.
+        reverse_import_order (bool): Whether to return the videos oldest first.
+        stats (SubscriptionFetchStats | None): Receives the extraction and mapping times
+            and the number of entries read.
+
+    Returns:
+        tuple[list[VideoCreate], int]: The new videos and the number of entries of the
+            fetch window that were skipped.
+
+    Raises:
+        LazyExtractionNotSupportedError: If an entry of the feed cannot be mapped to a video.
+    """
+    stats = stats or SubscriptionFetchStats(subscription_id=db_subscription.id)
+    fetched_videos = []
+    async with aclosing(
+        iter_subscription_video_batches(
+            db_subscription=db_subscription,
+            stats=stats,
+            known_remote_video_ids=known_remote_video_ids,
+        )
+    ) as batches:
+        async for batch in batches:
+            fetched_videos.extend(batch)
+
+    if reverse_import_order:
+        fetched_videos.reverse()
+    return fetched_videos, stats.skipped_entries
+
+
+async def iter_subscription_video_batches(
+    db_subscription: Subscription,
+    stats: SubscriptionFetchStats,
+    known_remote_video_ids: set[str] | None = None,
+    batch_size: int | None = None,
+) -> AsyncGenerator[list[VideoCreate], None]:
+    """
+    Stream the videos of a Subscription's feed in batches, newest first.
+
+    Entries are read lazily from yt-dlp, filtered (live, private, deleted and the handler's
+    `match_filter`), mapped and validated one at a time. The feed is only advanced when the
+    consumer asks for the next batch, so at most one batch is held in memory.
+
+    Videos get decreasing `created_at` timestamps in feed order, so that they are listed in
+    the same order as videos imported by a full fetch.
+
+    If `known_remote_video_ids` is given, reading stops after
+    `settings.FETCH_INCREMENTAL_KNOWN_RUN` consecutive known entries, and
+    `stats.skipped_entries` is set to the unread part of the fetch window.
+
+    Parameters:
+        db_subscription: The Subscription object
+        stats (SubscriptionFetchStats): Receives the extraction and mapping times and the
+            number of entries read.
+        known_remote_video_ids (set[str] | None): Remote video ids already in the
+            subscription. Known entries are not yielded.
+        batch_size (int | None): Videos per batch. Defaults to `settings.FETCH_BATCH_SIZE`.
+
+    Yields:
+        list[VideoCreate]: The next batch of videos.
+
+    Raises:
+        LazyExtractionNotSupportedError: If an entry of the feed cannot be mapped to a video.
+    """
+    ydl_opts = db_subscription.subscription_handler_obj.get_subscription_ydl_opts(
+        playlistend=db_subscription.max_videos_per_fetch
+    )
+    match_filter = ydl_opts.get("match_filter")
+    service_handler = db_subscription.service_handler_obj
+    max_videos = db_subscription.max_videos_per_fetch
+    batch_size = max(1, batch_size or settings.FETCH_BATCH_SIZE)
+    known_remote_video_ids = known_remote_video_ids or set()
+    known_run_length = max(1, settings.FETCH_INCREMENTAL_KNOWN_RUN)
+    fetched_at = datetime.datetime.utcnow()
+
+    batch: list[VideoCreate] = []
+    consumed_entries = 0
+    known_run = 0
+    async with aclosing(
+        iter_playlist_entries(url=db_subscription.url, ydl_opts=ydl_opts)
+    ) as entries:
+        while consumed_entries < max_videos:
+            with stats.measure("extract"):
+                entry_info_dict = await anext(entries, None)
+            if entry_info_dict is None:
+                break
+            consumed_entries += 1
+            stats.entries_seen += 1
+
+            if entry_info_dict.get("id") in known_remote_video_ids:
+                known_run += 1
+                if known_run >= known_run_length:
+                    stats.skipped_entries = max_videos - consumed_entries
+                    break
+                continue
+            known_run = 0
+
+            # process=False skips yt-dlp's match_filter, so apply it here
+            if not is_importable_entry(entry_info_dict=entry_info_dict) or (
+                match_filter and match_filter(entry_info_dict, incomplete=True) is not None
+            ):
+                continue
+
+            with stats.measure("mapping"):
+                try:
+                    video_dict = service_handler.map_subscription_info_dict_entity_to_video_dict(
+                        subscription_id=db_subscription.id,
+                        entry_info_dict=entry_info_dict,
+                    )
+                    video_dict["created_at"] = fetched_at - datetime.timedelta(
+                        microseconds=consumed_entries
+                    )
+                    batch.append(VideoCreate(**video_dict))
+                except (KeyError, IndexError, TypeError) as e:
+                    raise LazyExtractionNotSupportedError(
+                        f"Could not map feed entry {entry_info_dict.get('id')=}. {e=}"
+                    ) from e
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+async def stream_new_videos_to_subscription(
+    db: Session,
+    db_subscription: Subscription,
+    write_lock: asyncio.Lock,
+    stats: SubscriptionFetchStats | None = None,
+    use_cache: bool = True,
+) -> tuple[int, int]:
+    """
+    Stream a Subscription's feed into the database batch by batch.
+
+    Extraction runs in a producer task that hands batches to the ingest through a queue of
+    `settings.FETCH_STREAM_QUEUE_BATCHES` batches. When the ingest falls behind, the queue
+    fills up and the producer stops reading the feed until there is room again.
+
+    If `settings.FETCH_INCREMENTAL` is enabled, the feed stops at the first run of known
+    videos. If the feed cannot be read lazily, the rest of it is fetched in full.
+
+    Args:
+        db (Session): The database session.
+        db_subscription: The Subscription object in the database to add the new videos to.
+        write_lock (asyncio.Lock): Lock held while a batch is written to the database.
+        stats (SubscriptionFetchStats | None): Receives the stage times and entry counts.
+        use_cache (bool): Whether a cached info dict may be used for a full fetch.
+
+    Returns:
+        tuple[int, int]: The number of videos added to the subscription and the number of
+            entries of the fetch window that were skipped.
+    """
+    stats = stats or SubscriptionFetchStats(subscription_id=db_subscription.id)
+    known_remote_video_ids = None
+    if settings.FETCH_INCREMENTAL:
+        known_remote_video_ids = await crud.video.get_remote_video_ids_by_subscription_id(
+            db=db, subscription_id=db_subscription.id
+        )
+
+    queue: asyncio.Queue[list[VideoCreate] | None] = asyncio.Queue(
+        maxsize=max(1, settings.FETCH_STREAM_QUEUE_BATCHES)
+    )
+
+    async def produce() -> None:
+        async with aclosing(
+            iter_subscription_video_batches(
+                db_subscription=db_subscription,
+                stats=stats,
+                known_remote_video_ids=known_remote_video_ids,
+            )
+        ) as batches:
+            async for batch in batches:
+                await queue.put(batch)
+        await queue.put(None)
+
+    async def ingest(batch: list[VideoCreate]) -> int:
+        async with write_lock:
+            with stats.measure("ingest"):
+                new_videos = await add_new_videos_to_subscription(
+                    db=db, fetched_videos=batch, db_subscription=db_subscription
+                )
+        stats.entries_new += len(new_videos)
+        return len(new_videos)
+
+    producer = asyncio.create_task(produce())
+    added_videos = 0
+    try:
+        while True:
+            queue_get = asyncio.create_task(queue.get())
+            await asyncio.wait({queue_get, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if not queue_get.done() and producer.exception() is not None:
+                # The producer failed before queueing the next batch
+                queue_get.cancel()
+                await producer
+            batch = await queue_get
+            if batch is None:
+                break
+            added_videos += await ingest(batch=batch)
+        await producer
+    except LazyExtractionNotSupportedError as e:
+        logger.warning(
+            f"Streaming fetch not supported for {db_subscription.__repr__()}. "
+            f"Falling back to a full fetch. {e}"
+        )
+        with stats.measure("extract"):
+            subscription_info_dict = await get_subscription_info_dict(
+                db_subscription=db_subscription, reverse_import_order=True, use_cache=use_cache
+            )
+        with stats.measure("mapping"):
+            fetched_videos = get_subscription_videos_from_subscription_info_dict(
+                subscription_info_dict=subscription_info_dict, db_subscription=db_subscription
+            )
+        # Videos of batches that were already ingested are skipped by the ingest
+        added_videos += await ingest(batch=fetched_videos)
+        stats.skipped_entries = 0
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    return added_videos, stats.skipped_entries
+
+
 async def add_new_subscription_info_dict_videos_to_subscription(
     subscription_info_dict: dict[str, Any], db_subscription: Subscription, db: Session
 ) -> list[VideoCreate]:
     """
-    Add new videos from a list of fetched videos to a Subscription in the database.
+    Add new videos from a subscription_info_dict to a Subscription in the database.
 
     Args:
         subscription_info_dict: the subscription_info_dict
@@ -58,59 +361,88 @@ async def add_new_subscription_info_dict_videos_to_subscription(
     Returns:
         A list of Video objects that were added to the database.
     """
-
-    # Check if is Subscription Feed (user is subscribed to all channels in feed)
-    is_subscription_feed = db_subscription.subscription_handler_obj.IS_SUBSCRIPTION_FEED
-
-    # Fetch Videos from Feed
     fetched_videos = get_subscription_videos_from_subscription_info_dict(
         subscription_info_dict=subscription_info_dict, db_subscription=db_subscription
     )
-    db_video_ids = [video.id for video in db_subscription.videos]
-
-    # Add videos that were fetched, but not in the database.
-    new_videos = []
-    for fetched_video in fetched_videos:
-        if fetched_video.id not in db_video_ids:
-            # Get Channel in Database
-            db_channel = await crud.channel.get_or_none(
-                db=db, remote_channel_id=fetched_video.remote_channel_id
-            )
+    return await add_new_videos_to_subscription(
+        db=db, fetched_videos=fetched_videos, db_subscription=db_subscription
+    )
 
-            # Create Channel if Needed
-            if not db_channel:
-                new_channel = ChannelCreate(
-                    service_handler=db_subscription.service_handler,
-                    remote_channel_id=fetched_video.remote_channel_id,
-                    name=fetched_video.remote_channel_name,
-                    is_subscribed=True if is_subscription_feed else False,
-                )
-                try:
-                    db_channel = await crud.channel.create(obj_in=new_channel, db=db)
-                except crud.RecordAlreadyExistsError:  # pragma: no cover
-                    db_channel = await crud.channel.get(
-                        db=db, remote_channel_id=new_channel.remote_channel_id
-                    )
 
-            # Check if channel is subscribed to
-            if db_channel.is_subscribed is False and is_subscription_feed:
-                channel_update = ChannelUpdate(is_subscribed=True)
-                db_channel = await crud.channel.update(
-                    db=db, id=db_channel.id, obj_in=channel_update
-                )
+async def add_new_videos_to_subscription(
+    fetched_videos: list[VideoCreate], db_subscription: Subscription, db: Session
+) -> list[VideoCreate]:
+    """
+    Add new videos from a list of fetched videos to a Subscription in the database.
 
-            # Create Video in Database
-            new_video = VideoCreate(**fetched_video.dict())
-            new_videos.append(new_video)
+    The ingest is set-based: one `IN (...)` lookup for the videos already linked to the
+    subscription and one for their channels, then bulk `INSERT ... ON CONFLICT` statements
+    for the missing channels, videos and links, committed once.
 
-            db_video = await crud.video.get_or_none(db=db, id=new_video.id)
-            if not db_video:
-                try:
-                    db_video = await crud.video.create(obj_in=new_video, db=db)
-                except crud.RecordAlreadyExistsError:  # pragma: no cover
-                    db_video = await crud.video.get(db=db, id=new_video.id)  # pragma: no cover
+    Args:
+        fetched_videos: The videos fetched from the Subscription's feed.
+        db_subscription: The Subscription object in the database to add the new videos to.
+        db (Session): The database session.
+
+    Returns:
+        A list of Video objects that were added to the database.
+    """
+
+    # Check if is Subscription Feed (user is subscribed to all channels in feed)
+    is_subscription_feed = db_subscription.subscription_handler_obj.IS_SUBSCRIPTION_FEED
 
-            db_subscription.videos.append(db_video)
+    # Keep videos that were fetched, but are not linked to the subscription yet.
+    fetched_videos_by_id = {fetched_video.id: fetched_video for fetched_video in fetched_videos}
+    linked_video_ids = await crud.subscription.get_linked_video_ids(
+        db=db, subscription_id=db_subscription.id, video_ids=fetched_videos_by_id.keys()
+    )
+    new_videos = [
+        VideoCreate(**fetched_video.dict())
+        for video_id, fetched_video in fetched_videos_by_id.items()
+        if video_id not in linked_video_ids
+    ]
+    if not new_videos:
+        return []
+
+    # Create missing Channels, and mark existing ones as subscribed if needed
+    db_channels = await crud.channel.get_multi_by_remote_channel_ids(
+        db=db, remote_channel_ids={new_video.remote_channel_id for new_video in new_videos}
+    )
+    db_channels_by_remote_id = {
+        db_channel.remote_channel_id: db_channel for db_channel in db_channels
+    }
+    new_channels: dict[str, ChannelCreate] = {}
+    for new_video in new_videos:
+        if new_video.remote_channel_id in db_channels_by_remote_id:
+            continue
+        new_channels.setdefault(
+            new_video.remote_channel_id,
+            ChannelCreate(
+                service_handler=db_subscription.service_handler,
+                remote_channel_id=new_video.remote_channel_id,
+                name=new_video.remote_channel_name,
+                is_subscribed=True if is_subscription_feed else False,
+            ),
+        )
+    await crud.channel.upsert_multi(db=db, objs_in=list(new_channels.values()), commit=False)
+    if is_subscription_feed:
+        await crud.channel.set_subscribed(
+            db=db,
+            channel_ids=[
+                db_channel.id for db_channel in db_channels if db_channel.is_subscribed is False
+            ],
+            commit=False,
+        )
+
+    # Create Videos and link them to the Subscription
+    await crud.video.upsert_multi(db=db, objs_in=new_videos, commit=False)
+    await crud.subscription.add_video_links(
+        db=db,
+        subscription_id=db_subscription.id,
+        video_ids=[new_video.id for new_video in new_videos],
+        commit=False,
+    )
+    db.commit()
 
     return new_videos
 
@@ -138,15 +470,7 @@ def get_subscription_videos_from_subscription_info_dict(
     video_dicts = []
     for playlist in playlists:
         for entry_info_dict in playlist.get("entries", []):
-            if (
-                not entry_info_dict.get("live_status")
-                or entry_info_dict.get("live_status") == "was_live"
-            ):
-                if (
-                    "[private video]" in str(entry_info_dict.get("title")).lower()
-                    or "[deleted video]" in str(entry_info_dict.get("title")).lower()
-                ):
-                    continue
+            if is_importable_entry(entry_info_dict=entry_info_dict):
                 service_handler = db_subscription.service_handler_obj
                 video_dict = service_handler.map_subscription_info_dict_entity_to_video_dict(
                     subscription_id=db_subscription.id,
@@ -155,3 +479,37 @@ def get_subscription_videos_from_subscription_info_dict(
                 video_dicts.append(video_dict)
 
     return [VideoCreate(**video_dict) for video_dict in video_dicts]
+
+
+def count_subscription_info_dict_entries(subscription_info_dict: dict[str, Any]) -> int:
+    """
+    Count the feed entries of a subscription_info_dict, including entries of nested playlists.
+
+    Parameters:
+        subscription_info_dict (dict): The subscription_info_dict.
+
+    Returns:
+        int: The number of entries.
+    """
+    entries = subscription_info_dict.get("entries") or []
+    if len(entries) > 0 and entries[0].get("_type") == "playlist":
+        return sum(len(playlist.get("entries") or []) for playlist in entries)
+    return len(entries)
+
+
+def is_importable_entry(entry_info_dict: dict[str, Any]) -> bool:
+    """
+    Check if a feed entry is a video that can be imported.
+
+    Live and upcoming videos, private videos and deleted videos are not imported.
+
+    Parameters:
+        entry_info_dict (dict): The entry info dict from the feed.
+
+    Returns:
+        bool: True if the entry can be imported.
+    """
+    if entry_info_dict.get("live_status") and entry_info_dict.get("live_status") != "was_live":
+        return False
+    title = str(entry_info_dict.get("title")).lower()
+    return "[private video]" not in title and "[deleted video]" not in title
@@ -0,0 +1,80 @@
+from typing import Any
+
+import re
+
+import sqlalchemy as sa
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel import Session
+
+from app import logger
+from app.models import VIDEO_FTS_TABLE, Video
+
+# Keywords the full-text index matches like a `\b` word boundary regex: words of ASCII
+# letters, digits and underscores, separated by single spaces. The index folds the case of
+# other letters differently, e.g. of "ı", so keywords with them are matched with the regex.
+FTS_KEYWORD_PATTERN = re.compile(r"[0-9A-Za-z_]+(?: [0-9A-Za-z_]+)*")
+
+
+def get_fts_phrase(keyword: str) -> str | None:
+    """
+    Get the full-text query of a keyword as a phrase of whole words.
+
+    Args:
+        keyword (str): The keyword.
+
+    Returns:
+        str | None: The query, or None if the index could match the keyword differently
+            than a regex, e.g. for "c++" or "café".
+    """
+    if not FTS_KEYWORD_PATTERN.fullmatch(keyword):
+        return None
+    return f'"{keyword}"'
+
+
+def match_keyword(keyword: str, dialect: str, use_fts: bool = True) -> ColumnElement[Any]:
+    """
+    Whether the title or the description of the video contains the keyword as whole words,
+    case-insensitive.
+
+    Args:
+        keyword (str): The keyword.
+        dialect (str): The name of the database dialect. The full-text index only exists
+            on SQLite, other databases match the keyword with a regex.
+        use_fts (bool): Whether to look the keyword up in the full-text index. Keywords
+            the index cannot match exactly are matched with a regex anyway. Titles may
+            still be split into words differently next to characters the index keeps in
+            words but the regex does not, like the combining mark of a decomposed "naïve"
+            or emoji newer than Unicode 6.1, and only the regex matches "i" to "İ".
+
+    Returns:
+        ColumnElement[Any]: A lookup in the full-text index, or regex conditions that
+            scan the titles and descriptions.
+    """
+    phrase = get_fts_phrase(keyword=keyword) if use_fts and dialect == "sqlite" else None
+    if phrase is not None:
+        return sa.literal_column("video.rowid").in_(
+            sa.select(sa.literal_column("rowid"))
+            .select_from(sa.table(VIDEO_FTS_TABLE))
+            .where(sa.literal_column(VIDEO_FTS_TABLE).op("MATCH")(phrase))
+        )
+    pattern = rf"(?i)\b{re.escape(keyword.lower())}\b"
+    return sa.or_(
+        sa.func.coalesce(Video.title, "").regexp_match(pattern),
+        sa.func.coalesce(Video.description, "").regexp_match(pattern),
+    )
+
+
+def rebuild_video_fts(db: Session) -> None:
+    """
+    Rebuild the full-text index from the titles and descriptions of all videos.
+
+    Needed after VACUUM, which may renumber the rowids the index refers to.
+
+    Args:
+        db (Session): The database session.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    db.execute(sa.text(f"INSERT INTO {VIDEO_FTS_TABLE}({VIDEO_FTS_TABLE}) VALUES ('rebuild')"))
+    db.commit()
+    logger.success("Rebuilt the full-text index of the videos.")
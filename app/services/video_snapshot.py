@@ -0,0 +1,393 @@
+from typing import TYPE_CHECKING, Any
+
+import datetime
+
+import numpy as np
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app import logger, settings
+from app.models import (
+    Channel,
+    Criteria,
+    CriteriaField,
+    Filter,
+    FilterReadStatus,
+    SubscriptionVideoLink,
+    Video,
+)
+from app.services.filter_query import compile_criteria
+
+if TYPE_CHECKING:
+    from app.services.filter_cache import FilterChanges
+    from app.services.filter_videos import CriteriaPredicate
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Max ids bound in one statement
+SNAPSHOT_BATCH_SIZE = 500
+
+
+def get_epoch_microseconds(value: datetime.datetime) -> int:
+    """
+    Get a naive UTC time as microseconds since the epoch, without float rounding.
+
+    Args:
+        value (datetime.datetime): The time.
+
+    Returns:
+        int: The microseconds.
+    """
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class VideoSnapshot:
+    def __init__(self) -> None:
+        """
+        The fields filters read of all videos, as one numpy array per field.
+
+        Row i of every array belongs to the video `video_ids[i]`. The subscriptions of a
+        video are a bitmap with one bit per subscription, packed into bytes. Rows of deleted
+        videos are kept without subscriptions, so that no filter matches them. Titles and
+        descriptions are not kept, KEYWORD criteria are matched in the database.
+        """
+        self.video_ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.created_at = np.zeros(0, dtype=np.int64)  # microseconds since the epoch
+        self.duration = np.zeros(0, dtype=np.int64)  # 0 if unknown
+        self.is_read = np.zeros(0, dtype=bool)
+        self.view_count = np.zeros(0, dtype=np.int64)
+        self.channel = np.zeros(0, dtype=np.int32)  # row of the channel
+        self.subscriptions = np.zeros((0, 0), dtype=np.uint8)
+        self.order = np.zeros(0, dtype=np.int64)  # rank by created_at, then id
+        self.subscription_bits: dict[str, int] = {}
+        # The channels of the videos, by row
+        self.channel_ids: list[str] = []  # remote channel ids
+        self.channel_rows: dict[str, int] = {}
+        self.channel_hidden = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.video_ids)
+
+    def get_channel_row(self, remote_channel_id: str) -> int:
+        row = self.channel_rows.get(remote_channel_id)
+        if row is None:
+            row = self.channel_rows[remote_channel_id] = len(self.channel_ids)
+            self.channel_ids.append(remote_channel_id)
+        return row
+
+    def get_subscription_bit(self, subscription_id: str) -> int:
+        bit = self.subscription_bits.get(subscription_id)
+        if bit is None:
+            bit = self.subscription_bits[subscription_id] = len(self.subscription_bits)
+        return bit
+
+    def get_subscriptions_mask(self, subscription_ids: list[str]) -> Any:
+        """
+        Get the bitmap of subscriptions, packed like the subscriptions of the videos.
+
+        Args:
+            subscription_ids (list[str]): The subscription ids. Unknown ids are ignored.
+
+        Returns:
+            Any: The packed bitmap.
+        """
+        bits = np.zeros(self.subscriptions.shape[1] * 8, dtype=bool)
+        for subscription_id in subscription_ids:
+            if subscription_id in self.subscription_bits:
+                bits[self.subscription_bits[subscription_id]] = True
+        return np.packbits(bits)
+
+    def load_videos(self, db: Session, video_ids: list[str] | None = None) -> None:
+        """
+        Load the fields and subscriptions of videos into the snapshot.
+
+        Args:
+            db (Session): The database session.
+            video_ids (list[str] | None): The videos to load or reload. None loads all videos.
+        """
+        columns = [
+            Video.id,
+            Video.created_at,
+            Video.duration,
+            Video.is_read,
+            Video.view_count,
+            Video.remote_channel_id,
+        ]
+        links = sa.select(SubscriptionVideoLink.video_id, SubscriptionVideoLink.subscription_id)
+        if video_ids is None:
+            self.update_rows(
+                video_ids=None,
+                videos=db.execute(sa.select(*columns)).all(),
+                links=db.execute(links).all(),
+            )
+            return
+        for i in range(0, len(video_ids), SNAPSHOT_BATCH_SIZE):
+            batch = video_ids[i : i + SNAPSHOT_BATCH_SIZE]
+            self.update_rows(
+                video_ids=batch,
+                videos=db.execute(
+                    sa.select(*columns).where(Video.id.in_(batch))  # type: ignore[attr-defined]
+                ).all(),
+                links=db.execute(
+                    links.where(
+                        SubscriptionVideoLink.video_id.in_(batch)  # type: ignore[attr-defined]
+                    )
+                ).all(),
+            )
+
+    def update_rows(self, video_ids: list[str] | None, videos: list[Any], links: list[Any]) -> None:
+        """
+        Write loaded videos into their rows, appending rows for new videos.
+
+        Args:
+            video_ids (list[str] | None): The videos that were loaded, or None for all.
+                Those that are not among the loaded videos were deleted.
+            videos (list[Any]): The loaded columns of the videos.
+            links (list[Any]): The loaded subscriptions of the videos.
+        """
+        new_video_ids = [video.id for video in videos if video.id not in self.rows]
+        for video_id in new_video_ids:
+            self.rows[video_id] = len(self.video_ids)
+            self.video_ids.append(video_id)
+        size = len(self.video_ids)
+        for name in ("created_at", "duration", "is_read", "view_count", "channel"):
+            column = getattr(self, name)
+            if len(column) < size:
+                padding = np.zeros(size - len(column), dtype=column.dtype)
+                setattr(self, name, np.concatenate([column, padding]))
+
+        for subscription_id in {subscription_id for _, subscription_id in links}:
+            self.get_subscription_bit(subscription_id=subscription_id)
+        width = (len(self.subscription_bits) + 7) // 8
+        if self.subscriptions.shape != (size, width):
+            subscriptions = np.zeros((size, width), dtype=np.uint8)
+            old_size, old_width = self.subscriptions.shape
+            subscriptions[:old_size, :old_width] = self.subscriptions
+            self.subscriptions = subscriptions
+
+        rows = np.array([self.rows[video.id] for video in videos], dtype=np.int64)
+        self.created_at[rows] = [get_epoch_microseconds(video.created_at) for video in videos]
+        self.duration[rows] = [video.duration or 0 for video in videos]
+        self.is_read[rows] = [video.is_read for video in videos]
+        self.view_count[rows] = [video.view_count or 0 for video in videos]
+        self.channel[rows] = [self.get_channel_row(video.remote_channel_id) for video in videos]
+
+        # Subscriptions are rewritten, which also unlinks deleted videos
+        if video_ids is None:
+            self.subscriptions[:] = 0
+        else:
+            self.subscriptions[[self.rows[id_] for id_ in video_ids if id_ in self.rows]] = 0
+        for video_id, subscription_id in links:
+            bit = self.subscription_bits[subscription_id]
+            self.subscriptions[self.rows[video_id], bit >> 3] |= 0x80 >> (bit & 7)
+
+        if videos:
+            self.order = np.empty(size, dtype=np.int64)
+            self.order[np.lexsort((np.array(self.video_ids), self.created_at))] = np.arange(size)
+
+    def load_channels(self, db: Session) -> None:
+        """
+        Load which channels are hidden.
+
+        Args:
+            db (Session): The database session.
+        """
+        hidden = dict(db.execute(sa.select(Channel.remote_channel_id, Channel.is_hidden)).all())
+        for remote_channel_id in hidden:
+            self.get_channel_row(remote_channel_id=remote_channel_id)
+        self.channel_hidden = np.array(
+            [bool(hidden.get(remote_channel_id)) for remote_channel_id in self.channel_ids],
+            dtype=bool,
+        )
+
+    def get_matching_rows(
+        self, db: Session, filter_: Filter, predicate: "CriteriaPredicate"
+    ) -> Any:
+        """
+        Get the rows of the videos matching a filter.
+
+        Subscriptions, read status, hidden channels, DURATION and CREATED criteria are
+        evaluated as boolean masks over all rows, CHANNEL and CHANNEL_ID criteria once per
+        channel. KEYWORD criteria are matched in the database for the remaining videos only.
+
+        Args:
+            db (Session): The database session, to match KEYWORD criteria with.
+            filter_ (Filter): The filter.
+            predicate (CriteriaPredicate): The criteria of the filter.
+
+        Returns:
+            Any: The rows, in ascending order.
+        """
+        subscriptions_mask = self.get_subscriptions_mask(
+            subscription_ids=[subscription.id for subscription in filter_.subscriptions]
+        )
+        mask = np.bitwise_and(self.subscriptions, subscriptions_mask).any(axis=1)
+        if filter_.read_status == FilterReadStatus.READ.value:
+            mask &= self.is_read
+        elif filter_.read_status == FilterReadStatus.UNREAD.value:
+            mask &= ~self.is_read
+
+        channels_mask = np.fromiter(
+            (
+                predicate.matches_channel(remote_channel_id=remote_channel_id)
+                for remote_channel_id in self.channel_ids
+            ),
+            dtype=bool,
+            count=len(self.channel_ids),
+        )
+        if not filter_.show_hidden_channels:
+            channels_mask &= ~self.channel_hidden
+        mask &= channels_mask[self.channel]
+
+        if predicate.created_after is not None:
+            mask &= self.created_at >= get_epoch_microseconds(predicate.created_after)
+        # Videos of unknown duration are kept
+        if predicate.min_duration or predicate.max_duration is not None:
+            in_range = self.duration >= predicate.min_duration
+            if predicate.max_duration is not None:
+                in_range &= self.duration <= predicate.max_duration
+            mask &= (self.duration == 0) | in_range
+
+        rows = np.flatnonzero(mask)
+        keyword_criterias = [
+            criteria
+            for criteria in filter_.criterias
+            if criteria.field == CriteriaField.KEYWORD.value
+        ]
+        if keyword_criterias and len(rows):
+            rows = self.match_keywords(db=db, rows=rows, criterias=keyword_criterias)
+        return rows
+
+    def match_keywords(self, db: Session, rows: Any, criterias: list[Criteria]) -> Any:
+        """
+        Keep the rows of the videos whose title and description meet KEYWORD criteria.
+
+        Args:
+            db (Session): The database session.
+            rows (Any): The rows, in ascending order.
+            criterias (list[Criteria]): The KEYWORD criteria.
+
+        Returns:
+            Any: The rows that meet the criteria, in ascending order.
+        """
+        where = compile_criteria(
+            criterias=criterias,
+            now=datetime.datetime.utcnow(),
+            dialect=db.get_bind().dialect.name,
+        )
+        video_ids = [self.video_ids[row] for row in rows.tolist()]
+        matching_ids: set[str] = set()
+        for i in range(0, len(video_ids), SNAPSHOT_BATCH_SIZE):
+            batch = video_ids[i : i + SNAPSHOT_BATCH_SIZE]
+            matching_ids.update(
+                db.execute(
+                    sa.select(Video.id).where(
+                        Video.id.in_(batch), *where  # type: ignore[attr-defined]
+                    )
+                ).scalars()
+            )
+        return rows[
+            np.fromiter(
+                (video_id in matching_ids for video_id in video_ids),
+                dtype=bool,
+                count=len(video_ids),
+            )
+        ]
+
+    def select_video_ids(
+        self,
+        db: Session,
+        filter_: Filter,
+        predicate: "CriteriaPredicate",
+        max_videos: int | None = None,
+    ) -> tuple[list[str], int]:
+        """
+        Select the ordered ids of the videos matching a filter, and count them.
+
+        The first videos are selected with a partition, so only they are sorted.
+
+        Args:
+            db (Session): The database session, to match KEYWORD criteria with.
+            filter_ (Filter): The filter.
+            predicate (CriteriaPredicate): The criteria of the filter.
+            max_videos (int | None): Max video ids to select. None or 0 selects all.
+
+        Returns:
+            tuple[list[str], int]: The video ids in filter order, and the number of all
+                matching videos.
+        """
+        rows = self.get_matching_rows(db=db, filter_=filter_, predicate=predicate)
+        count = len(rows)
+        keys = -self.order[rows] if filter_.reverse_order else self.order[rows]
+        if max_videos and count > max_videos:
+            first = np.argpartition(keys, max_videos - 1)[:max_videos]
+            rows, keys = rows[first], keys[first]
+        rows = rows[np.argsort(keys)]
+        return [self.video_ids[row] for row in rows.tolist()], count
+
+
+class VideoSnapshotIndex:
+    def __init__(self) -> None:
+        """
+        Keeps a snapshot of all videos, reloading the videos and channels commits change.
+
+        Commits that change videos in ways that are not tracked by id, e.g. bulk deletes,
+        drop the snapshot, and it is loaded from scratch when it is needed again.
+        """
+        self._snapshot: VideoSnapshot | None = None
+        self._video_ids: set[str] = set()
+        self._channels = False
+
+    @property
+    def enabled(self) -> bool:
+        return settings.FILTER_SNAPSHOT
+
+    def clear(self) -> None:
+        self._snapshot = None
+        self._video_ids.clear()
+        self._channels = False
+
+    def invalidate(self, changes: "FilterChanges") -> None:
+        """
+        Mark the videos and channels of committed or rolled back changes to be reloaded.
+
+        Args:
+            changes (FilterChanges): The changes.
+        """
+        if self._snapshot is None:
+            return
+        if changes.all or changes.rebuild:
+            self.clear()
+            return
+        self._video_ids |= changes.video_ids
+        self._channels |= bool(changes.hidden_channels or changes.channel_ids)
+
+    def get(self, db: Session) -> VideoSnapshot | None:
+        """
+        Get the snapshot, loading it or the changed videos and channels first.
+
+        Args:
+            db (Session): The database session.
+
+        Returns:
+            VideoSnapshot | None: The snapshot, or None if it is disabled.
+        """
+        if not self.enabled:
+            return None
+        if self._snapshot is None:
+            snapshot = VideoSnapshot()
+            snapshot.load_videos(db=db)
+            snapshot.load_channels(db=db)
+            self._snapshot = snapshot
+            logger.debug(f"Loaded a snapshot of {len(snapshot)} videos.")
+        elif self._video_ids or self._channels:
+            self._snapshot.load_videos(db=db, video_ids=sorted(self._video_ids))
+            self._snapshot.load_channels(db=db)
+            self._video_ids.clear()
+            self._channels = False
+        return self._snapshot
+
+
+video_snapshot = VideoSnapshotIndex()
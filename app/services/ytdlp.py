@@ -1,4 +1,8 @@
-from typing import Any, Type
+from typing import Any, Callable, NoReturn, Type
+
+import asyncio
+import re
+from collections.abc import AsyncGenerator, Iterator
 
 from loguru import logger as _logger
 from yt_dlp import YoutubeDL
@@ -6,7 +10,13 @@ from yt_dlp.extractor.common import InfoExtractor
 from yt_dlp.utils import DownloadError, ExtractorError, YoutubeDLError
 
 # from app.core.loggers import ytdlp_logger as logger
-from app.core.notify import notify
+from app.models.settings import Settings as _Settings
+from app.services.rate_limit import rate_limiter
+from app.services.ytdlp_cache import get_cache_key, info_dict_cache
+from app.services.ytdlp_pool import extractor_pool, is_picklable
+from app.services.ytdlp_replay import iter_flat_entries, replay_backend
+
+settings = _Settings()
 
 # YoutubeDL Logger
 logger = _logger.bind(name="logger")
@@ -35,6 +45,12 @@ class Http410Error(YoutubeDLError):
     """
 
 
+class Http429Error(YoutubeDLError):
+    """
+    Raised after a HTTP 429 "Too Many Requests" error.
+    """
+
+
 class IsPrivateVideoError(YoutubeDLError):
     """
     Raised when a video is private.
@@ -71,6 +87,12 @@ class VideoUnavailableError(YoutubeDLError):
     """
 
 
+class LazyExtractionNotSupportedError(YoutubeDLError):
+    """
+    Raised when a URL cannot be iterated lazily as a flat playlist.
+    """
+
+
 class FormatNotFoundError(Exception):
     """
     Exception raised when a format cannot be found.
@@ -88,10 +110,25 @@ async def get_info_dict(
     ydl_opts: dict[str, Any],
     ie_key: str | None = None,
     custom_extractors: list[Type[InfoExtractor]] | None = None,
+    use_cache: bool = True,
 ) -> dict[str, Any]:
     """
     Use YouTube-DL to get the info dictionary for a given URL.
 
+    If `settings.YTDLP_BACKEND` is "pool", the extraction runs in a warm worker process.
+    Options that cannot be sent to a worker (e.g. a `match_filter` closure) are
+    extracted in-process instead.
+
+    Extractions are cached on disk for `settings.YTDLP_CACHE_TTL_SECONDS`, keyed by the URL
+    and the normalized options.
+
+    If `settings.YTDLP_BACKEND` is "replay", recorded fixtures or synthetic feeds are
+    served instead and yt-dlp is not used. With `settings.YTDLP_RECORD_FIXTURES`, every
+    extracted info dict is saved as the fixture of its URL.
+
+    Extractions wait for the rate limiter of their service and cookie identity, which
+    slows down after HTTP 410 and 429 errors.
+
     Parameters:
         url (str): The URL of the object to retrieve info for.
         ydl_opts (dict[str, Any]): The options to use with YouTube-DL.
@@ -99,25 +136,112 @@ async def get_info_dict(
             If not provided, the default extractor will be used.
         custom_extractors (Optional[list[Type[InfoExtractor]]]): A list of
             Custom Extractors to make available to yt-dlp.
+        use_cache (bool): Whether to read and write the info dict cache.
+            Set to False to bypass it.
 
     Returns:
         dict[str, Any]: The info dictionary for the object.
     """
+    metadata = {
+        "url": url,
+        "ydl_opts": ydl_opts,
+        "ie_key": ie_key,
+        "custom_extractors": custom_extractors,
+    }
+    if replay_backend.enabled:
+        info_dict = await replay_backend.get_info_dict(url=url, ydl_opts=ydl_opts)
+        info_dict["metadata"] = metadata
+        return info_dict
+
+    cache_key = None
+    if use_cache and info_dict_cache.enabled:
+        cache_key = get_cache_key(
+            url=url, ydl_opts=ydl_opts, ie_key=ie_key, custom_extractors=custom_extractors
+        )
+        cached_info_dict = await info_dict_cache.get(key=cache_key)
+        if cached_info_dict is not None:
+            logger.debug(f"Using cached yt-dlp info dict for {url}.")
+            cached_info_dict["metadata"] = metadata
+            return cached_info_dict
+
+    bucket = await rate_limiter.acquire(url=url, ydl_opts=ydl_opts)
     try:
-        with YoutubeDL(ydl_opts) as ydl:
-            # Extract info dict, handle if no videos uploaded
-            info_dict = await get_info_dict_from_ydl(
-                ydl=ydl,
+        if settings.YTDLP_BACKEND == "pool" and is_picklable(ydl_opts, custom_extractors):
+            info_dict = await get_info_dict_from_pool(
                 url=url,
                 ydl_opts=ydl_opts,
                 ie_key=ie_key,
                 custom_extractors=custom_extractors,
             )
+        else:
+            with YoutubeDL(ydl_opts) as ydl:
+                # Extract info dict, handle if no videos uploaded
+                info_dict = await get_info_dict_from_ydl(
+                    ydl=ydl,
+                    url=url,
+                    ydl_opts=ydl_opts,
+                    ie_key=ie_key,
+                    custom_extractors=custom_extractors,
+                )
     except NoUploadsError as e:
         # TODO: Handle this error.
         # Test: https://www.youtube.com/channel/UCeTX6IZlqeB6qhNBAB6cgTQ
         # See: https://github.com/yt-dlp/yt-dlp/issues/5906
         raise e
+    except (Http410Error, Http429Error):
+        if bucket is not None:
+            bucket.penalize()
+        raise
+    if bucket is not None:
+        bucket.reward()
+
+    if cache_key is not None or replay_backend.record:
+        # Metadata holds the options, which may not be serializable
+        sanitized_info_dict = YoutubeDL.sanitize_info(
+            {key: value for key, value in info_dict.items() if key != "metadata"}
+        )
+        if cache_key is not None:
+            await info_dict_cache.set(key=cache_key, info_dict=sanitized_info_dict)
+        if replay_backend.record:
+            await replay_backend.save(url=url, ydl_opts=ydl_opts, info_dict=sanitized_info_dict)
+    return info_dict
+
+
+async def get_info_dict_from_pool(
+    url: str,
+    ydl_opts: dict[str, Any],
+    ie_key: str | None = None,
+    custom_extractors: list[Type[InfoExtractor]] | None = None,
+) -> dict[str, Any]:
+    """
+    Use the extractor pool to get the info dictionary for a given URL.
+
+    Parameters:
+        url (str): The URL of the object to retrieve info for.
+        ydl_opts (dict[str, Any]): The options to use with YouTube-DL.
+        ie_key (Optional[str]): The name of the YouTube-DL info extractor to use.
+        custom_extractors (Optional[list[Type[InfoExtractor]]]): A list of
+            Custom Extractors to make available to yt-dlp.
+
+    Returns:
+        dict[str, Any]: The info dictionary for the object.
+    """
+    try:
+        info_dict = await extractor_pool.extract_info(
+            url=url, ydl_opts=ydl_opts, ie_key=ie_key, custom_extractors=custom_extractors
+        )
+    except (YoutubeDLError, DownloadError, ExtractorError) as e:
+        await raise_ydl_extract_info_error(e=e, url=url)
+
+    info_dict = check_extracted_info_dict(info_dict=info_dict, url=url, ie_key=ie_key)
+
+    # Append Metadata to info_dict
+    info_dict["metadata"] = {
+        "url": url,
+        "ydl_opts": ydl_opts,
+        "ie_key": ie_key,
+        "custom_extractors": custom_extractors,
+    }
     return info_dict
 
 
@@ -161,12 +285,89 @@ async def get_info_dict_from_ydl(
     return info_dict
 
 
+def get_next_entry(entries: Iterator[dict[str, Any]]) -> dict[str, Any] | None:
+    return next(entries, None)
+
+
+async def iter_playlist_entries(
+    url: str, ydl_opts: dict[str, Any], ie_key: str | None = None
+) -> AsyncGenerator[dict[str, Any], None]:
+    """
+    Lazily yield the raw entries of a playlist in feed order.
+
+    The playlist is extracted with `process=False`, so yt-dlp only requests the
+    pages of the feed that are actually consumed. `playlistend` and `playlistreverse`
+    are not applied; the caller decides how many entries to consume.
+    Nested playlists are flattened.
+
+    Parameters:
+        url (str): The URL of the playlist.
+        ydl_opts (dict[str, Any]): The options to use with YouTube-DL.
+        ie_key (Optional[str]): The name of the YouTube-DL info extractor to use.
+
+    Yields:
+        dict[str, Any]: The raw (unprocessed) entry info dicts.
+
+    Raises:
+        LazyExtractionNotSupportedError: If the URL does not resolve to a playlist.
+    """
+    if replay_backend.enabled:
+        info_dict = await replay_backend.get_raw_info_dict(url=url)
+        if info_dict.get("_type") != "playlist":
+            raise LazyExtractionNotSupportedError(
+                f"{url=} resolved to '{info_dict.get('_type')}', not a playlist."
+            )
+        for flat_entry in iter_flat_entries(info_dict=info_dict):
+            yield flat_entry
+        return
+
+    bucket = await rate_limiter.acquire(url=url, ydl_opts=ydl_opts)
+    try:
+        with YoutubeDL(ydl_opts) as ydl:
+            try:
+                raw_info_dict: dict[str, Any] | None = await asyncio.to_thread(
+                    ydl.extract_info, url, download=False, ie_key=ie_key, process=False
+                )
+            except (YoutubeDLError, DownloadError, ExtractorError) as e:
+                await raise_ydl_extract_info_error(e=e, url=url)
+            info_dict = check_extracted_info_dict(info_dict=raw_info_dict, url=url, ie_key=ie_key)
+
+            if info_dict.get("_type") != "playlist":
+                raise LazyExtractionNotSupportedError(
+                    f"{url=} resolved to '{info_dict.get('_type')}', not a playlist."
+                )
+
+            playlists: list[Iterator[dict[str, Any]]] = [iter(info_dict.get("entries") or [])]
+            while playlists:
+                try:
+                    # Advancing the iterator may fetch the next page of the feed
+                    entry = await asyncio.to_thread(get_next_entry, playlists[-1])
+                except (YoutubeDLError, DownloadError, ExtractorError) as e:
+                    await raise_ydl_extract_info_error(e=e, url=url)
+
+                if entry is None:
+                    playlists.pop()
+                elif entry.get("_type") == "playlist":
+                    playlists.append(iter(entry.get("entries") or []))
+                else:
+                    yield entry
+    except (Http410Error, Http429Error):
+        if bucket is not None:
+            bucket.penalize()
+        raise
+    if bucket is not None:
+        bucket.reward()
+
+
 async def ydl_extract_info(
     ydl: YoutubeDL, url: str, ie_key: str | None, download: bool = False
 ) -> dict[str, Any]:
     """
     Use YouTube-DL to extract info for a given URL.
 
+    The blocking `YoutubeDL.extract_info()` call runs in the default executor,
+    so the event loop stays responsive while yt-dlp does its network round trips.
+
     Parameters:
         ydl (YoutubeDL): The YouTube-DL object to use.
         url (str): The URL of the object to retrieve info for.
@@ -184,48 +385,153 @@ async def ydl_extract_info(
         Http410Error: If a HTTP 410 "GONE" error is encountered.
     """
     try:
-        info_dict: dict[str, Any] | None = ydl.extract_info(
-            url, download=download, ie_key=ie_key, process=True
+        info_dict: dict[str, Any] | None = await asyncio.to_thread(
+            ydl.extract_info, url, download=download, ie_key=ie_key, process=True
         )
     except (YoutubeDLError, DownloadError, ExtractorError) as e:
-        if "This account has been terminated" in str(e):
-            try:
-                error_msg = e.exc_info[1].orig_msg  # type: ignore
-            except AttributeError:
-                error_msg = "This account has been terminated."
-            raise AccountNotFoundError(str(error_msg)) from e
-        if "Video unavailable" in str(e):
-            raise VideoUnavailableError(str(e)) from e
-        if "This channel has no uploads" in str(e):
-            raise NoUploadsError("This channel has no uploads.") from e
-        if "The playlist does not exist." in str(e):
-            raise PlaylistNotFoundError("The playlist does not exist.") from e
-        if "No video formats found" in str(e):
-            raise IsLiveEventError("No video formats found.") from e
-        if "this live event will begin in" in str(e):
-            raise IsLiveEventError("This video is a live event.") from e
-        if "[Private video]" in str(e):
-            raise IsPrivateVideoError("This video is a private video.") from e
-        if "[Deleted video]" in str(e):
-            raise IsDeletedVideoError("This video is a deleted video.") from e
-        if "Requested format is not available." in str(e):
-            raise FormatNotFoundError(e) from e
-        if "Internal Server Error" in str(e):
-            raise VideoUnavailableError(e) from e
-        if e.__class__.__name__ == "DownloadError":
-            if "HTTP Error 410" in str(e):
-                raise Http410Error from e
-
-        err_msg = f"yt-dlp could not extract info for {url}. {e=}"
-        logger.critical(err_msg)
-        ytdlp_logger.critical(err_msg)
-        await notify(telegram=True, email=False, text=err_msg)
-        raise YoutubeDLError(err_msg) from e
+        await raise_ydl_extract_info_error(e=e, url=url)
+
+    return check_extracted_info_dict(info_dict=info_dict, url=url, ie_key=ie_key)
+
+
+def get_account_terminated_msg(e: Exception) -> str:
+    """
+    Get the reason yt-dlp gave for a terminated account.
+
+    Parameters:
+        e (Exception): The error raised by yt-dlp.
+
+    Returns:
+        str: The original message of the extractor error, or a generic message.
+    """
+    try:
+        return str(e.exc_info[1].orig_msg)  # type: ignore
+    except (AttributeError, TypeError):
+        return "This account has been terminated."
+
+
+# Error classifiers, by priority. Each maps a substring of a yt-dlp error message to a
+# factory of the exception to raise. A factory may return None to leave the error unclassified.
+YDL_ERROR_CLASSIFIERS: list[tuple[str, Callable[[Exception, str], Exception | None]]] = [
+    (
+        "This account has been terminated",
+        lambda e, msg: AccountNotFoundError(get_account_terminated_msg(e)),
+    ),
+    ("Video unavailable", lambda e, msg: VideoUnavailableError(msg)),
+    ("This channel has no uploads", lambda e, msg: NoUploadsError("This channel has no uploads.")),
+    (
+        "The playlist does not exist.",
+        lambda e, msg: PlaylistNotFoundError("The playlist does not exist."),
+    ),
+    ("No video formats found", lambda e, msg: IsLiveEventError("No video formats found.")),
+    (
+        "this live event will begin in",
+        lambda e, msg: IsLiveEventError("This video is a live event."),
+    ),
+    ("[Private video]", lambda e, msg: IsPrivateVideoError("This video is a private video.")),
+    ("[Deleted video]", lambda e, msg: IsDeletedVideoError("This video is a deleted video.")),
+    ("Requested format is not available.", lambda e, msg: FormatNotFoundError(e)),
+    ("Internal Server Error", lambda e, msg: VideoUnavailableError(e)),
+    ("HTTP Error 410", lambda e, msg: Http410Error() if isinstance(e, DownloadError) else None),
+    ("HTTP Error 429", lambda e, msg: Http429Error() if isinstance(e, DownloadError) else None),
+]
+YDL_ERROR_PATTERN = re.compile(
+    "|".join(f"({re.escape(text)})" for text, _ in YDL_ERROR_CLASSIFIERS)
+)
+
+# Errors caused by the requested content rather than by the service or our session.
+YDL_CONTENT_ERRORS = (
+    AccountNotFoundError,
+    VideoUnavailableError,
+    NoUploadsError,
+    PlaylistNotFoundError,
+    IsLiveEventError,
+    IsPrivateVideoError,
+    IsDeletedVideoError,
+    FormatNotFoundError,
+)
+
+
+def classify_ydl_error(e: Exception) -> Exception | None:
+    """
+    Translate a yt-dlp error into the matching exception of this module.
 
+    The error message is rendered once and scanned once with a single compiled pattern.
+    If several classifiers match, the one listed first in `YDL_ERROR_CLASSIFIERS` wins.
+
+    Parameters:
+        e (Exception): The error raised by yt-dlp.
+
+    Returns:
+        Exception | None: The classified exception, or None if the error is unknown.
+    """
+    msg = str(e)
+    # Each classifier is one group of the pattern, so a match always has a `lastindex`
+    matched = sorted({match.lastindex or 0 for match in YDL_ERROR_PATTERN.finditer(msg)})
+    for index in matched:
+        _, factory = YDL_ERROR_CLASSIFIERS[index - 1]
+        error = factory(e, msg)
+        if error is not None:
+            return error
+    return None
+
+
+async def raise_ydl_extract_info_error(e: Exception, url: str) -> NoReturn:
+    """
+    Translate a yt-dlp error into the matching exception of this module and raise it.
+
+    Unclassified errors are logged. Alerts for failing services are sent by the fetch
+    circuit breakers, not once per error.
+
+    Parameters:
+        e (Exception): The error raised by yt-dlp.
+        url (str): The URL that was being extracted.
+
+    Raises:
+        AccountNotFoundError: If the channel has been terminated.
+        VideoUnavailableError: If the video is unavailable.
+        NoUploadsError: If the channel has no uploads.
+        PlaylistNotFoundError: If the playlist does not exist.
+        IsLiveEventError: If the video is a live event.
+        IsPrivateVideoError: If the video is private.
+        IsDeletedVideoError: If the video is deleted.
+        FormatNotFoundError: If the requested format is not available.
+        Http410Error: If a HTTP 410 "GONE" error is encountered.
+        Http429Error: If a HTTP 429 "Too Many Requests" error is encountered.
+        YoutubeDLError: If the error could not be classified.
+    """
+    error = classify_ydl_error(e)
+    if error is not None:
+        raise error from e
+
+    err_msg = f"yt-dlp could not extract info for {url}. {e=}"
+    logger.critical(err_msg)
+    ytdlp_logger.critical(err_msg)
+    raise YoutubeDLError(err_msg) from e
+
+
+def check_extracted_info_dict(
+    info_dict: dict[str, Any] | None, url: str, ie_key: str | None
+) -> dict[str, Any]:
+    """
+    Check that yt-dlp returned a usable info_dict.
+
+    Parameters:
+        info_dict (dict[str, Any] | None): The info dictionary returned by yt-dlp.
+        url (str): The URL that was extracted.
+        ie_key (Optional[str]): The name of the YouTube-DL info extractor used.
+
+    Returns:
+        dict[str, Any]: The info dictionary.
+
+    Raises:
+        YoutubeDLError: If the info dictionary is None.
+        IsLiveEventError: If the video is a live event.
+    """
     # Handle if info_dict is None/Empty
     if info_dict is None:
         raise YoutubeDLError(
-            f"yt-dlp did not download a info_dict object. {info_dict=} {url=} {ie_key=} {ydl=}"
+            f"yt-dlp did not download a info_dict object. {info_dict=} {url=} {ie_key=}"
         )
 
     # Handle if video is a live event
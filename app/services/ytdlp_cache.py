@@ -0,0 +1,211 @@
+from types import FunctionType
+from typing import Any, Type
+
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger as _logger
+from yt_dlp.extractor.common import InfoExtractor
+
+from app.models.settings import Settings as _Settings
+from app.paths import CACHE_PATH
+
+settings = _Settings()
+
+logger = _logger.bind(name="logger")
+
+CACHE_FILE_SUFFIX = ".json.gz"
+
+
+def normalize_ydl_opts(value: Any) -> Any:
+    """
+    Convert yt-dlp options into a JSON serializable value that is stable between calls.
+
+    Functions are represented by their qualified name and the values they close over, and
+    other objects such as a `match_filter` by their repr, so equal filters built by
+    separate calls produce the same value.
+
+    Args:
+        value (Any): The options, or a value inside the options.
+
+    Returns:
+        Any: The normalized value.
+    """
+    if isinstance(value, dict):
+        return {str(key): normalize_ydl_opts(value[key]) for key in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [normalize_ydl_opts(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((normalize_ydl_opts(item) for item in value), key=repr)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, FunctionType):
+        return {
+            "callable": f"{value.__module__}.{value.__qualname__}",
+            "closure": [normalize_ydl_opts(cell.cell_contents) for cell in value.__closure__ or ()],
+        }
+    return repr(value)
+
+
+def get_cache_key(
+    url: str,
+    ydl_opts: dict[str, Any],
+    ie_key: str | None = None,
+    custom_extractors: list[Type[InfoExtractor]] | None = None,
+) -> str:
+    """
+    Build the content address of an extraction.
+
+    Args:
+        url (str): The URL to extract.
+        ydl_opts (dict[str, Any]): The yt-dlp options.
+        ie_key (str | None): The name of the yt-dlp info extractor to use.
+        custom_extractors (list[Type[InfoExtractor]] | None): Custom extractors to add.
+
+    Returns:
+        str: The sha256 hex digest of the normalized request.
+    """
+    request = [url, normalize_ydl_opts(ydl_opts), ie_key, normalize_ydl_opts(custom_extractors)]
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf8")).hexdigest()
+
+
+class InfoDictCache:
+    def __init__(self, path: Path, ttl_seconds: int, max_mb: int, enabled: bool = True) -> None:
+        """
+        An on-disk cache of gzip compressed yt-dlp info dicts.
+
+        Entries expire `ttl_seconds` after they were stored. When the cache grows beyond
+        `max_mb`, the least recently used entries are evicted.
+
+        Args:
+            path (Path): The directory to store entries in.
+            ttl_seconds (int): Seconds an entry stays valid.
+            max_mb (int): Max total size of the stored entries in MB.
+            enabled (bool): Whether the cache is used at all.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max(0, max_mb) * 1024 * 1024
+        self.enabled = enabled and ttl_seconds > 0 and max_mb > 0
+        self._entries: OrderedDict[str, int] | None = None
+        self._size = 0
+        # Entries are read and written in worker threads.
+        self._lock = threading.RLock()
+
+    def _get_file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}{CACHE_FILE_SUFFIX}"
+
+    def _load_entries(self) -> OrderedDict[str, int]:
+        """
+        Index the entries on disk, least recently stored first.
+
+        Returns:
+            OrderedDict[str, int]: The size of each entry by key.
+        """
+        with self._lock:
+            if self._entries is not None:
+                return self._entries
+            files = []
+            for file in self.path.glob(f"*/*{CACHE_FILE_SUFFIX}"):
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, file.name[: -len(CACHE_FILE_SUFFIX)], stat.st_size))
+            self._entries = OrderedDict((key, size) for _, key, size in sorted(files))
+            self._size = sum(self._entries.values())
+            return self._entries
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            self._size -= self._load_entries().pop(key, 0)
+            self._get_file(key).unlink(missing_ok=True)
+
+    def _read(self, key: str) -> dict[str, Any] | None:
+        file = self._get_file(key)
+        try:
+            if time.time() - file.stat().st_mtime > self.ttl_seconds:
+                self._remove(key)
+                return None
+            with gzip.open(file, "rt", encoding="utf8") as f:
+                info_dict: dict[str, Any] = json.load(f)
+        except FileNotFoundError:
+            self._remove(key)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Removing unreadable yt-dlp cache entry {file}. {e=}")
+            self._remove(key)
+            return None
+        return info_dict
+
+    def _write(self, key: str, info_dict: dict[str, Any]) -> None:
+        data = gzip.compress(json.dumps(info_dict, default=str).encode("utf8"))
+        file = self._get_file(key)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_suffix(".tmp")
+        tmp_file.write_bytes(data)
+        tmp_file.replace(file)
+
+        with self._lock:
+            entries = self._load_entries()
+            self._size += len(data) - entries.pop(key, 0)
+            entries[key] = len(data)
+            while self._size > self.max_bytes and entries:
+                self._remove(next(iter(entries)))
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Get a stored info dict.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict[str, Any] | None: The info dict, or None if it is missing or expired.
+        """
+        if not self.enabled:
+            return None
+        info_dict = await asyncio.to_thread(self._read, key)
+        if info_dict is not None:
+            with self._lock:
+                entries = self._load_entries()
+                if key in entries:
+                    entries.move_to_end(key)
+        return info_dict
+
+    async def set(self, key: str, info_dict: dict[str, Any]) -> None:
+        """
+        Store an info dict.
+
+        Args:
+            key (str): The cache key.
+            info_dict (dict[str, Any]): The sanitized info dict.
+        """
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, info_dict)
+        except OSError as e:
+            logger.warning(f"Could not write yt-dlp cache entry {key}. {e=}")
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            for key in list(self._load_entries()):
+                self._remove(key)
+
+
+info_dict_cache = InfoDictCache(
+    path=CACHE_PATH / "ytdlp",
+    ttl_seconds=settings.YTDLP_CACHE_TTL_SECONDS,
+    max_mb=settings.YTDLP_CACHE_MAX_MB,
+    enabled=settings.YTDLP_CACHE_ENABLED,
+)
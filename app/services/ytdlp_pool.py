@@ -0,0 +1,424 @@
+from typing import Any, Type
+
+import asyncio
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import traceback
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+
+from loguru import logger as _logger
+from yt_dlp import YoutubeDL
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.utils import YoutubeDLError
+
+from app.models.settings import Settings as _Settings
+
+settings = _Settings()
+
+logger = _logger.bind(name="logger")
+
+
+class ExtractorWorkerError(YoutubeDLError):
+    """
+    Raised when an extractor worker process dies while handling a task.
+    """
+
+
+class ExtractorWorkerTraceback(Exception):
+    """
+    The traceback of an error raised in an extractor worker, as the cause of the rebuilt error.
+    """
+
+    def __str__(self) -> str:
+        return f"\n\n{self.args[0]}"
+
+
+# Types of the attributes of errors that are sent to the parent process
+ERROR_ATTRIBUTE_TYPES = (str, int, float, bool, type(None))
+
+# An error sent by a worker: class path, message, traceback, attributes like `orig_msg` and
+# the payload of the error in `exc_info`, which yt-dlp sets on a `DownloadError` to the
+# error it wraps
+ErrorPayload = tuple[str, str, str, dict[str, Any], "ErrorPayload | None"]
+
+
+def get_error_payload(e: BaseException) -> ErrorPayload:
+    """
+    Describe an error so that it can be sent to the parent process and raised there again.
+
+    Args:
+        e (BaseException): The error.
+
+    Returns:
+        ErrorPayload: The description of the error.
+    """
+    exc_info = getattr(e, "exc_info", None)
+    cause = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) == 3 else None
+    return (
+        f"{type(e).__module__}.{type(e).__qualname__}",
+        str(e),
+        "".join(traceback.format_exception(type(e), e, e.__traceback__)),
+        {
+            name: value
+            for name, value in vars(e).items()
+            if isinstance(value, ERROR_ATTRIBUTE_TYPES) and not name.startswith("_")
+        },
+        get_error_payload(cause) if isinstance(cause, BaseException) and cause is not e else None,
+    )
+
+
+def get_loaded_class(class_path: str) -> Any:
+    """
+    Look up a class by its module and qualified name, among the modules already loaded.
+
+    Args:
+        class_path (str): The module and the qualified name, e.g. "yt_dlp.utils.DownloadError".
+
+    Returns:
+        Any: The class, or None if it is not found.
+    """
+    parts = class_path.split(".")
+    for i in range(len(parts) - 1, 0, -1):
+        module = sys.modules.get(".".join(parts[:i]))
+        if module is not None:
+            obj: Any = module
+            for name in parts[i:]:
+                obj = getattr(obj, name, None)
+            return obj
+    return None
+
+
+def rebuild_error(payload: ErrorPayload) -> Exception:
+    """
+    Rebuild an error sent by a worker, with its original type.
+
+    The class is looked up in the modules already loaded, and the error is created without
+    calling its `__init__`, so that its message and attributes are kept as they were. Errors of unknown classes
+    are rebuilt as `YoutubeDLError`. The traceback of the worker becomes the cause.
+
+    Args:
+        payload (ErrorPayload): The description of the error.
+
+    Returns:
+        Exception: The error.
+    """
+    class_path, msg, worker_traceback, attributes, cause_payload = payload
+    found_class = get_loaded_class(class_path=class_path)
+    error_class: type[Exception] = (
+        found_class
+        if isinstance(found_class, type) and issubclass(found_class, Exception)
+        else YoutubeDLError
+    )
+    error = error_class.__new__(error_class)
+    Exception.__init__(error, msg)
+    # Set past `__setattr__`, which yt-dlp overrides to reformat the message
+    vars(error).update(attributes)
+    if cause_payload is not None:
+        cause = rebuild_error(payload=cause_payload)
+        vars(error)["exc_info"] = (type(cause), cause, None)
+    error.__cause__ = ExtractorWorkerTraceback(worker_traceback)
+    return error
+
+
+def get_ydl_opts_profile(
+    ydl_opts: dict[str, Any], custom_extractors: list[Type[InfoExtractor]] | None = None
+) -> str:
+    """
+    Build a stable key for a set of yt-dlp options.
+
+    Workers keep one `YoutubeDL` instance per profile and reuse it for every task
+    with the same options.
+
+    Args:
+        ydl_opts (dict[str, Any]): The yt-dlp options.
+        custom_extractors (list[Type[InfoExtractor]] | None): Custom extractors to add.
+
+    Returns:
+        str: The profile key.
+    """
+    extractor_names = [extractor.__name__ for extractor in custom_extractors or []]
+    return json.dumps([ydl_opts, extractor_names], sort_keys=True, default=str)
+
+
+def is_picklable(*objs: Any) -> bool:
+    """
+    Check if objects can be sent to a worker process.
+
+    Args:
+        objs (Any): The objects to check.
+
+    Returns:
+        bool: True if all objects can be pickled.
+    """
+    try:
+        pickle.dumps(objs)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def get_rss_bytes() -> int:
+    """
+    Get the resident set size of the current process.
+
+    Returns:
+        int: The RSS in bytes, or 0 if it cannot be determined on this platform.
+    """
+    try:
+        with open("/proc/self/statm", encoding="utf8") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def worker_main(conn: Connection, max_tasks: int, max_rss_bytes: int) -> None:
+    """
+    Entrypoint of an extractor worker process.
+
+    Receives `(url, ydl_opts, ie_key, custom_extractors)` tasks over `conn` and sends back
+    `(status, payload, recycle)`. The worker exits after replying with `recycle=True`,
+    which happens once it has handled `max_tasks` tasks or its RSS exceeds `max_rss_bytes`.
+
+    Args:
+        conn (Connection): The worker end of the pipe.
+        max_tasks (int): Number of tasks after which the worker recycles itself.
+        max_rss_bytes (int): RSS ceiling after which the worker recycles itself.
+    """
+    ydls: dict[str, YoutubeDL] = {}
+    tasks_done = 0
+    try:
+        while True:
+            try:
+                task = conn.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+
+            url, ydl_opts, ie_key, custom_extractors = task
+            profile = get_ydl_opts_profile(ydl_opts=ydl_opts, custom_extractors=custom_extractors)
+            ydl = ydls.get(profile)
+            if ydl is None:
+                ydl = YoutubeDL(ydl_opts)
+                for custom_extractor in custom_extractors or []:
+                    ydl.add_info_extractor(custom_extractor())
+                ydls[profile] = ydl
+
+            try:
+                info_dict = ydl.extract_info(url, download=False, ie_key=ie_key, process=True)
+                status, payload = "ok", ydl.sanitize_info(info_dict) if info_dict else None
+            except Exception as e:  # pylint: disable=broad-except
+                status, payload = "error", get_error_payload(e)
+
+            tasks_done += 1
+            recycle = tasks_done >= max_tasks or (0 < max_rss_bytes <= get_rss_bytes())
+            conn.send((status, payload, recycle))
+            if recycle:
+                break
+    finally:
+        for ydl in ydls.values():
+            ydl.close()
+        conn.close()
+
+
+class ExtractorWorker:
+    def __init__(self, max_tasks: int, max_rss_bytes: int) -> None:
+        """
+        Start a new extractor worker process.
+
+        Args:
+            max_tasks (int): Number of tasks after which the worker recycles itself.
+            max_rss_bytes (int): RSS ceiling after which the worker recycles itself.
+        """
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process: BaseProcess = ctx.Process(
+            target=worker_main,
+            args=(child_conn, max_tasks, max_rss_bytes),
+            name="ytdlp-extractor",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.is_retired = False
+
+    def run(self, task: tuple[Any, ...]) -> tuple[str, Any]:
+        """
+        Send a task to the worker and block until it replies.
+
+        Args:
+            task (tuple[Any, ...]): The task to run.
+
+        Returns:
+            tuple[str, Any]: The status and payload of the reply.
+
+        Raises:
+            ExtractorWorkerError: If the worker died before replying.
+        """
+        try:
+            self.conn.send(task)
+            status, payload, recycle = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.is_retired = True
+            self.process.join(timeout=1)
+            raise ExtractorWorkerError(f"yt-dlp extractor worker died. {e=}") from e
+        self.is_retired = recycle
+        return status, payload
+
+    def abandon(self) -> None:
+        """
+        Kill the worker while it runs a task that is no longer awaited.
+
+        Does not wait for the process to exit, as it is called on the event loop. The blocked
+        `run` call then fails with `ExtractorWorkerError` and reaps the process in its thread.
+        """
+        self.is_retired = True
+        self.process.kill()
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Stop the worker process.
+
+        Args:
+            timeout (float): Seconds to wait for the process to exit before killing it.
+        """
+        if self.process.is_alive() and not self.is_retired:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def kill_started_worker(start: "asyncio.Future[ExtractorWorker]") -> None:
+    if start.cancelled() or start.exception() is not None:
+        return
+    worker = start.result()
+    logger.debug(f"Killing yt-dlp extractor worker (pid={worker.process.pid}).")
+    worker.abandon()
+    # No `run` call reaps the process, so it is stopped in a thread off the event loop
+    asyncio.get_running_loop().run_in_executor(None, worker.stop)
+
+
+class ExtractorPool:
+    def __init__(self, workers: int, max_tasks_per_worker: int, max_rss_mb: int) -> None:
+        """
+        A pool of worker processes that each keep warm `YoutubeDL` instances.
+
+        Workers are started lazily on first use and replaced after they retire.
+
+        Args:
+            workers (int): Number of worker processes.
+            max_tasks_per_worker (int): Tasks after which a worker is recycled.
+            max_rss_mb (int): RSS ceiling in MB after which a worker is recycled. 0 disables it.
+        """
+        self.workers = max(1, workers)
+        self.max_tasks_per_worker = max(1, max_tasks_per_worker)
+        self.max_rss_bytes = max(0, max_rss_mb) * 1024 * 1024
+        self._idle_workers: asyncio.Queue[ExtractorWorker | None] | None = None
+
+    def _start_worker(self) -> ExtractorWorker:
+        return ExtractorWorker(
+            max_tasks=self.max_tasks_per_worker, max_rss_bytes=self.max_rss_bytes
+        )
+
+    async def _spawn_worker(self) -> ExtractorWorker:
+        """
+        Start a worker in a thread, as spawning a process blocks.
+
+        If the caller is cancelled meanwhile, the worker is killed once it has started,
+        so that no process is left without an owner.
+
+        Returns:
+            ExtractorWorker: The worker.
+        """
+        start = asyncio.ensure_future(asyncio.to_thread(self._start_worker))
+        try:
+            return await asyncio.shield(start)
+        except asyncio.CancelledError:
+            start.add_done_callback(kill_started_worker)
+            raise
+
+    def _get_idle_workers(self) -> asyncio.Queue[ExtractorWorker | None]:
+        if self._idle_workers is None:
+            # Slots are filled with `None` and workers are spawned when a slot is first used.
+            self._idle_workers = asyncio.Queue()
+            for _ in range(self.workers):
+                self._idle_workers.put_nowait(None)
+        return self._idle_workers
+
+    async def extract_info(
+        self,
+        url: str,
+        ydl_opts: dict[str, Any],
+        ie_key: str | None = None,
+        custom_extractors: list[Type[InfoExtractor]] | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Extract the info dict for a URL in a worker process.
+
+        Args:
+            url (str): The URL to extract.
+            ydl_opts (dict[str, Any]): The yt-dlp options. Must be picklable.
+            ie_key (str | None): The name of the yt-dlp info extractor to use.
+            custom_extractors (list[Type[InfoExtractor]] | None): Custom extractors to add.
+
+        Returns:
+            dict[str, Any] | None: The sanitized info dict.
+
+        Raises:
+            Exception: The error yt-dlp raised in the worker, rebuilt with its original type.
+        """
+        idle_workers = self._get_idle_workers()
+        worker = await idle_workers.get()
+        try:
+            if worker is None:
+                worker = await self._spawn_worker()
+            status, payload = await asyncio.to_thread(
+                worker.run, (url, ydl_opts, ie_key, custom_extractors)
+            )
+        except asyncio.CancelledError:
+            if worker is not None:
+                # The worker is still busy with the abandoned extraction
+                logger.debug(f"Killing yt-dlp extractor worker (pid={worker.process.pid}).")
+                worker.abandon()
+                worker = None
+            raise
+        finally:
+            if worker is not None and worker.is_retired:
+                logger.debug(f"Recycling yt-dlp extractor worker (pid={worker.process.pid}).")
+                await asyncio.to_thread(worker.stop)
+                worker = None
+            idle_workers.put_nowait(worker)
+
+        if status == "error":
+            raise rebuild_error(payload=payload)
+        return payload  # type: ignore[no-any-return]
+
+    async def close(self) -> None:
+        """
+        Stop all worker processes.
+        """
+        if self._idle_workers is None:
+            return
+        while not self._idle_workers.empty():
+            worker = self._idle_workers.get_nowait()
+            if worker is not None:
+                await asyncio.to_thread(worker.stop)
+        self._idle_workers = None
+
+
+extractor_pool = ExtractorPool(
+    workers=settings.YTDLP_POOL_WORKERS,
+    max_tasks_per_worker=settings.YTDLP_POOL_MAX_TASKS_PER_WORKER,
+    max_rss_mb=settings.YTDLP_POOL_MAX_RSS_MB,
+)
@@ -0,0 +1,242 @@
+from typing import Any
+
+import asyncio
+import gzip
+import hashlib
+import json
+from collections import defaultdict
+from collections.abc import Iterator
+from pathlib import Path
+
+from loguru import logger as _logger
+from yt_dlp.utils import YoutubeDLError
+
+from app.models.settings import Settings as _Settings
+from app.paths import FIXTURES_PATH
+
+settings = _Settings()
+
+logger = _logger.bind(name="logger")
+
+FIXTURE_FILE_SUFFIX = ".json.gz"
+SYNTHETIC_CHANNELS_PER_FEED = 20
+
+
+class FixtureNotFoundError(YoutubeDLError):
+    """
+    Raised when the replay backend has no fixture for a URL and synthetic feeds are disabled.
+    """
+
+
+def get_fixture_key(url: str) -> str:
+    """
+    Get the name of the fixture of a URL.
+
+    Args:
+        url (str): The extracted URL.
+
+    Returns:
+        str: The sha256 hex digest of the URL.
+    """
+    return hashlib.sha256(url.encode("utf8")).hexdigest()
+
+
+def build_synthetic_entry(feed_key: str, index: int) -> dict[str, Any]:
+    """
+    Build a flat playlist entry like the ones yt-dlp returns for a YouTube feed.
+
+    Args:
+        feed_key (str): The fixture key of the feed.
+        index (int): The position of the entry over all extractions of the feed.
+
+    Returns:
+        dict[str, Any]: The entry info dict.
+    """
+    remote_video_id = f"{feed_key[:8]}{index:08d}"
+    channel = index % SYNTHETIC_CHANNELS_PER_FEED
+    return {
+        "_type": "url",
+        "ie_key": "Youtube",
+        "id": remote_video_id,
+        "url": f"https://www.youtube.com/watch?v={remote_video_id}",
+        "title": f"Synthetic video {index}",
+        "description": None,
+        "duration": 60 + index % 3600,
+        "thumbnails": [{"url": f"https://i.ytimg.com/vi/{remote_video_id}/hqdefault.jpg"}],
+        "channel_id": f"UC{feed_key[:8]}{channel:04d}",
+        "channel": f"Synthetic channel {channel}",
+        "view_count": index,
+    }
+
+
+def apply_playlist_opts(info_dict: dict[str, Any], ydl_opts: dict[str, Any]) -> dict[str, Any]:
+    """
+    Apply the `playlistend` and `playlistreverse` options to a playlist info dict,
+    like yt-dlp does when it processes a playlist.
+
+    Args:
+        info_dict (dict[str, Any]): The info dict in feed order.
+        ydl_opts (dict[str, Any]): The yt-dlp options.
+
+    Returns:
+        dict[str, Any]: The info dict with the selected entries.
+    """
+    if info_dict.get("_type") != "playlist":
+        return info_dict
+    entries = list(info_dict.get("entries") or [])
+    if ydl_opts.get("playlistend"):
+        entries = entries[: ydl_opts["playlistend"]]
+    if ydl_opts.get("playlistreverse"):
+        entries.reverse()
+    return {**info_dict, "entries": entries}
+
+
+def iter_flat_entries(info_dict: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """
+    Iterate the entries of a playlist info dict in feed order, flattening nested playlists.
+
+    Args:
+        info_dict (dict[str, Any]): The playlist info dict.
+
+    Yields:
+        dict[str, Any]: The entry info dicts.
+    """
+    for entry in info_dict.get("entries") or []:
+        if entry.get("_type") == "playlist":
+            yield from iter_flat_entries(info_dict=entry)
+        else:
+            yield entry
+
+
+class ReplayBackend:
+    def __init__(
+        self, path: Path, synthetic_entries: int, enabled: bool = False, record: bool = False
+    ) -> None:
+        """
+        Serves recorded or synthetic info dicts in place of yt-dlp.
+
+        Recorded fixtures are gzip compressed info dicts stored per URL under `path`.
+        URLs without a fixture get a synthetic playlist of `synthetic_entries` entries.
+        Every extraction of a synthetic feed returns entries that were not returned before,
+        like a feed that received that many new uploads.
+
+        Args:
+            path (Path): The directory of the fixtures.
+            synthetic_entries (int): Entries of a synthetic feed. 0 disables synthetic feeds.
+            enabled (bool): Whether extractions are served by this backend.
+            record (bool): Whether info dicts extracted by yt-dlp are saved as fixtures.
+        """
+        self.path = path
+        self.synthetic_entries = synthetic_entries
+        self.enabled = enabled
+        self.record = record
+        self._synthetic_offsets: defaultdict[str, int] = defaultdict(int)
+
+    def _get_file(self, url: str) -> Path:
+        return self.path / f"{get_fixture_key(url)}{FIXTURE_FILE_SUFFIX}"
+
+    def _write(self, url: str, fixture: dict[str, Any]) -> None:
+        file = self._get_file(url)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_suffix(".tmp")
+        tmp_file.write_bytes(gzip.compress(json.dumps(fixture, default=str).encode("utf8")))
+        tmp_file.replace(file)
+
+    def _read(self, url: str) -> dict[str, Any] | None:
+        try:
+            with gzip.open(self._get_file(url), "rt", encoding="utf8") as f:
+                fixture: dict[str, Any] = json.load(f)
+        except FileNotFoundError:
+            return None
+        info_dict: dict[str, Any] = fixture["info_dict"]
+        if fixture.get("playlistreverse") and info_dict.get("_type") == "playlist":
+            # Fixtures are served in feed order
+            info_dict["entries"] = list(reversed(info_dict.get("entries") or []))
+        return info_dict
+
+    async def save(self, url: str, ydl_opts: dict[str, Any], info_dict: dict[str, Any]) -> None:
+        """
+        Save a sanitized info dict as the fixture of a URL.
+
+        Args:
+            url (str): The extracted URL.
+            ydl_opts (dict[str, Any]): The yt-dlp options the info dict was extracted with.
+            info_dict (dict[str, Any]): The sanitized info dict.
+        """
+        fixture = {
+            "url": url,
+            "playlistreverse": bool(ydl_opts.get("playlistreverse")),
+            "info_dict": info_dict,
+        }
+        try:
+            await asyncio.to_thread(self._write, url, fixture)
+        except OSError as e:
+            logger.warning(f"Could not record yt-dlp fixture for {url}. {e=}")
+
+    def build_synthetic_info_dict(self, url: str) -> dict[str, Any]:
+        """
+        Build a synthetic playlist with entries that were not returned for the URL before.
+
+        Args:
+            url (str): The extracted URL.
+
+        Returns:
+            dict[str, Any]: The playlist info dict, newest entry first.
+        """
+        feed_key = get_fixture_key(url)
+        offset = self._synthetic_offsets[feed_key]
+        self._synthetic_offsets[feed_key] += self.synthetic_entries
+        newest = offset + self.synthetic_entries - 1
+        return {
+            "_type": "playlist",
+            "id": feed_key[:16],
+            "title": f"Synthetic feed {feed_key[:8]}",
+            "webpage_url": url,
+            "thumbnails": [{"url": f"https://yt3.ggpht.com/{feed_key[:16]}=s900"}],
+            "entries": [
+                build_synthetic_entry(feed_key=feed_key, index=index)
+                for index in range(newest, offset - 1, -1)
+            ],
+        }
+
+    async def get_raw_info_dict(self, url: str) -> dict[str, Any]:
+        """
+        Get the unprocessed info dict of a URL, in feed order.
+
+        Args:
+            url (str): The URL to extract.
+
+        Returns:
+            dict[str, Any]: The recorded fixture, or a synthetic playlist.
+
+        Raises:
+            FixtureNotFoundError: If there is no fixture and synthetic feeds are disabled.
+        """
+        info_dict = await asyncio.to_thread(self._read, url)
+        if info_dict is not None:
+            return info_dict
+        if self.synthetic_entries > 0:
+            return self.build_synthetic_info_dict(url=url)
+        raise FixtureNotFoundError(f"No yt-dlp fixture recorded for {url=}.")
+
+    async def get_info_dict(self, url: str, ydl_opts: dict[str, Any]) -> dict[str, Any]:
+        """
+        Replay the extraction of a URL.
+
+        Args:
+            url (str): The URL to extract.
+            ydl_opts (dict[str, Any]): The yt-dlp options. Only the playlist options are used.
+
+        Returns:
+            dict[str, Any]: The info dict.
+        """
+        info_dict = await self.get_raw_info_dict(url=url)
+        return apply_playlist_opts(info_dict=info_dict, ydl_opts=ydl_opts)
+
+
+replay_backend = ReplayBackend(
+    path=FIXTURES_PATH / "ytdlp",
+    synthetic_entries=settings.YTDLP_REPLAY_SYNTHETIC_ENTRIES,
+    enabled=settings.YTDLP_BACKEND == "replay",
+    record=settings.YTDLP_RECORD_FIXTURES,
+)
@@ -0,0 +1,164 @@
+from collections.abc import AsyncGenerator
+
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from sqlmodel import Session
+
+from app import crud, models
+from app.services.fetch import fetch_status
+from app.services.fetch_jobs import FetchJobNotFoundError, fetch_jobs
+from app.views import deps, templates
+
+router = APIRouter()
+
+
+@router.get("/fetch-status", response_class=HTMLResponse)
+async def view_fetch_status(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(  # pylint: disable=unused-argument
+        deps.get_current_active_user
+    ),
+) -> Response:
+    """
+    Returns HTML response with the stats of the latest fetch of each subscription.
+
+    Args:
+        request(Request): The request object
+        db(Session): The database session.
+        current_user(User): The authenticated user.
+
+    Returns:
+        Response: HTML page with the fetch stats, slowest subscription first
+
+    """
+    # Get alerts dict from cookies
+    alerts = models.Alerts().from_cookies(request.cookies)
+
+    subscriptions = {
+        subscription.id: subscription for subscription in await crud.subscription.get_all(db=db)
+    }
+    fetch_stats = [
+        (subscriptions[stats.subscription_id], stats)
+        for stats in fetch_status.get_all()
+        if stats.subscription_id in subscriptions
+    ]
+    return templates.TemplateResponse(
+        "fetch/status.html",
+        {
+            "request": request,
+            "fetch_stats": fetch_stats,
+            "current_user": current_user,
+            "alerts": alerts,
+        },
+    )
+
+
+@router.get("/fetch-job/{job_id}", response_class=HTMLResponse)
+async def view_fetch_job(
+    request: Request,
+    job_id: str,
+    current_user: models.User = Depends(  # pylint: disable=unused-argument
+        deps.get_current_active_user
+    ),
+) -> Response:
+    """
+    Returns HTML response with the live progress of a fetch job.
+
+    Args:
+        request(Request): The request object
+        job_id(str): The fetch job id
+        current_user(User): The authenticated user.
+
+    Returns:
+        Response: HTML page with the progress of the job, or a redirect to the fetch status
+            page if the job does not exist.
+    """
+    # Get alerts dict from cookies
+    alerts = models.Alerts().from_cookies(request.cookies)
+
+    try:
+        job = fetch_jobs.get(job_id=job_id)
+    except FetchJobNotFoundError:
+        alerts.danger.append("Fetch job not found")
+        response = RedirectResponse(url="/fetch-status", status_code=status.HTTP_303_SEE_OTHER)
+        response.set_cookie(key="alerts", value=alerts.json(), max_age=5, httponly=True)
+        return response
+
+    return templates.TemplateResponse(
+        "fetch/job.html",
+        {
+            "request": request,
+            "job": job,
+            "current_user": current_user,
+            "alerts": alerts,
+        },
+    )
+
+
+@router.get("/fetch-job/{job_id}/events")
+async def stream_fetch_job_events(
+    job_id: str,
+    current_user: models.User = Depends(  # pylint: disable=unused-argument
+        deps.get_current_active_user
+    ),
+) -> Response:
+    """
+    Stream the progress of a fetch job as Server-Sent Events.
+
+    Every event is sent from the start of the job, then the stream follows the job until
+    it is finished.
+
+    Args:
+        job_id(str): The fetch job id
+        current_user(User): The authenticated user.
+
+    Returns:
+        Response: A `text/event-stream` response of `FetchJobEvent`s.
+    """
+    try:
+        job = fetch_jobs.get(job_id=job_id)
+    except FetchJobNotFoundError:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        async for event in job.iter_events():
+            yield f"event: {event.event}\ndata: {event.json()}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/fetch-job/{job_id}/cancel", response_class=HTMLResponse)
+async def cancel_fetch_job(
+    job_id: str,
+    current_user: models.User = Depends(  # pylint: disable=unused-argument
+        deps.get_current_active_superuser
+    ),
+) -> Response:
+    """
+    Cancel a running fetch job.
+
+    Args:
+        job_id(str): The fetch job id
+        current_user(User): The authenticated superuser.
+
+    Returns:
+        Response: Cancels the job and redirects back to its progress page.
+    """
+    alerts = models.Alerts()
+    try:
+        fetch_jobs.cancel(job_id=job_id)
+    except FetchJobNotFoundError:
+        alerts.danger.append("Fetch job not found")
+        response = RedirectResponse(url="/fetch-status", status_code=status.HTTP_303_SEE_OTHER)
+    else:
+        alerts.warning.append("Cancelling the fetch job")
+        response = RedirectResponse(
+            url=f"/fetch-job/{job_id}", status_code=status.HTTP_303_SEE_OTHER
+        )
+    response.set_cookie(key="alerts", value=alerts.json(), max_age=5, httponly=True)
+    return response
@@ -6,7 +6,8 @@ from sqlmodel import Session
 
 from app import crud, models
 from app.models.filtered_videos import FilteredVideos
-from app.services.fetch import fetch_all_subscriptions, fetch_filter_group
+from app.services.fetch import fetch_filter_group
+from app.services.fetch_jobs import fetch_jobs
 from app.services.filter_videos import get_filtered_videos
 from app.views import deps, templates
 
@@ -275,7 +276,6 @@ async def handle_edit_filter_group(
 @router.get("/filter-groups/fetch", response_class=HTMLResponse)
 async def fetch_all_filter_groups(
     request: Request,
-    db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(  # pylint: disable=unused-argument
         deps.get_current_active_user
     ),
@@ -285,19 +285,18 @@ async def fetch_all_filter_groups(
 
     Args:
         filter_group_id(str): The filter_group id
-        db(Session): The database session.
         current_user(User): The authenticated user.
 
     Returns:
-        Fetches videos and redirects back to /filter_group/filter_group_id.
+        Starts a background fetch job and redirects to its progress page.
     """
     alerts = models.Alerts()
 
-    fetch_results = await fetch_all_subscriptions(db=db)
+    job = fetch_jobs.start_fetch_all(title="All Subscriptions")
 
-    alerts.success.append(f"Fetched {fetch_results.added_videos} new videos")
+    alerts.info.append(f"Fetching all subscriptions in the background (job {job.id})")
 
-    response = RedirectResponse(url="/filter-groups", status_code=status.HTTP_303_SEE_OTHER)
+    response = RedirectResponse(url=f"/fetch-job/{job.id}", status_code=status.HTTP_303_SEE_OTHER)
     response.set_cookie(key="alerts", value=alerts.json(), max_age=5, httponly=True)
     return response
 
@@ -324,7 +323,9 @@ async def fetch_all_filter_group(
     """
     alerts = models.Alerts()
 
-    fetch_results = await fetch_filter_group(db=db, filter_group_id=filter_group_id)
+    fetch_results = await fetch_filter_group(
+        db=db, filter_group_id=filter_group_id, use_cache=False
+    )
 
     alerts.success.append(f"Fetched {fetch_results.added_videos} new videos")
 
@@ -382,7 +383,7 @@ async def view_filter_group(
             continue
 
         # Get filtered videos
-        filtered_videos = await get_filtered_videos(filter_=db_filter, max_videos=20)
+        filtered_videos = await get_filtered_videos(db=db, filter_=db_filter, max_videos=20)
         if filtered_videos.videos_not_limited_count == 0:
             continue
 
@@ -4,8 +4,9 @@ from sqlmodel import Session
 
 from app import crud, models
 from app.handlers import get_registered_subscription_handlers
-from app.services.fetch import fetch_all_subscriptions, fetch_filter
-from app.services.filter_videos import get_filtered_videos
+from app.services.fetch import fetch_filter
+from app.services.fetch_jobs import fetch_jobs
+from app.services.filter_videos import get_filter_counts, get_filtered_videos
 from app.services.videos import mark_videos_as_read
 from app.views import deps, templates
 
@@ -42,10 +43,7 @@ async def list_filters(
     filters.sort(key=lambda x: x.name)
 
     # Get unread count for each filter
-    filters_unread_count = {}
-    for filter_ in filters:
-        filtered_videos = await get_filtered_videos(filter_=filter_)
-        filters_unread_count[filter_.id] = filtered_videos.videos_not_limited_count
+    filters_unread_count = await get_filter_counts(db=db, filters=filters)
 
     # Seperate read filters
     read_filters = []
@@ -249,7 +247,7 @@ async def view_filter(
         response.set_cookie(key="alerts", value=alerts.json(), httponly=True, max_age=5)
         return response
 
-    filtered_videos = await get_filtered_videos(filter_=db_filter, max_videos=20)
+    filtered_videos = await get_filtered_videos(db=db, filter_=db_filter, max_videos=20)
 
     # Redirect to /filters if no unread videos in filter
     if filtered_videos.videos_not_limited_count == 0:
@@ -492,7 +490,6 @@ async def delete_filter(
 @router.get("/filters/fetch", response_class=HTMLResponse)
 async def fetch_all_filters(
     request: Request,
-    db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(  # pylint: disable=unused-argument
         deps.get_current_active_user
     ),
@@ -502,19 +499,18 @@ async def fetch_all_filters(
 
     Args:
         filter_id(str): The filter id
-        db(Session): The database session.
         current_user(User): The authenticated user.
 
     Returns:
-        Fetches videos and redirects back to /filter/filter_id.
+        Starts a background fetch job and redirects to its progress page.
     """
     alerts = models.Alerts()
 
-    fetch_results = await fetch_all_subscriptions(db=db)
+    job = fetch_jobs.start_fetch_all(title="All Subscriptions")
 
-    alerts.success.append(f"Fetched {fetch_results.added_videos} new videos")
+    alerts.info.append(f"Fetching all subscriptions in the background (job {job.id})")
 
-    response = RedirectResponse(url="/filters", status_code=status.HTTP_303_SEE_OTHER)
+    response = RedirectResponse(url=f"/fetch-job/{job.id}", status_code=status.HTTP_303_SEE_OTHER)
     response.set_cookie(key="alerts", value=alerts.json(), max_age=5, httponly=True)
     return response
 
@@ -548,7 +544,7 @@ async def fetch_filter_page(
         response.set_cookie(key="alerts", value=alerts.json(), httponly=True, max_age=5)
         return response
 
-    fetch_results = await fetch_filter(db=db, filter_id=filter_id)
+    fetch_results = await fetch_filter(db=db, filter_id=filter_id, use_cache=False)
 
     alerts.success.append(f"Fetched {fetch_results.added_videos} new videos")
 
@@ -5,6 +5,7 @@ from sqlmodel import Session
 from app import crud, models
 from app.handlers import get_registered_subscription_handlers, get_subscription_handler_from_string
 from app.services.fetch import fetch_subscription
+from app.services.scheduler import fetch_scheduler
 from app.views import deps, templates
 
 router = APIRouter()
@@ -254,6 +255,7 @@ async def handle_edit_subscription(
     service_handler: str = Form(...),
     subscription_handler: str = Form(...),
     max_videos_per_fetch: int = Form(...),
+    fetch_interval_minutes: int | None = Form(None),
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(  # pylint: disable=unused-argument
         deps.get_current_active_user
@@ -267,6 +269,8 @@ async def handle_edit_subscription(
         subscription_id(str): The subscription id
         service_handler(str): The service_handler of the subscription
         subscription_handler(str): The subscription_handler of the subscription
+        max_videos_per_fetch(int): The max number of videos to fetch
+        fetch_interval_minutes(int | None): The fetch interval, 0 for the default
         db(Session): The database session.
         current_user(User): The authenticated user.
 
@@ -278,9 +282,12 @@ async def handle_edit_subscription(
         service_handler=service_handler,
         subscription_handler=subscription_handler,
         max_videos_per_fetch=max_videos_per_fetch,
+        fetch_interval_minutes=fetch_interval_minutes,
     )
 
     try:
+        db_subscription = await crud.subscription.get(db=db, id=subscription_id)
+        old_fetch_interval_minutes = db_subscription.fetch_interval_minutes
         new_subscription = await crud.subscription.update(
             db=db, obj_in=subscription_update, id=subscription_id
         )
@@ -290,6 +297,8 @@ async def handle_edit_subscription(
         response.headers["Method"] = "GET"
         response.set_cookie(key="alerts", value=alerts.json(), httponly=True, max_age=5)
         return response
+    if new_subscription.fetch_interval_minutes != old_fetch_interval_minutes:
+        await fetch_scheduler.reschedule(db=db, db_subscription=new_subscription)
     alerts.success.append("Subscription updated")
     return templates.TemplateResponse(
         "subscription/edit.html",
@@ -368,6 +377,7 @@ async def fetch_subscription_page(
         fetch_subscription,
         id=subscription.id,
         db=db,
+        use_cache=False,
     )
     alerts.success.append(f"Subscription '{subscription.title}' was fetched.")
 
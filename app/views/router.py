@@ -4,6 +4,7 @@ from app.views.pages import (
     account,
     channels,
     criteria,
+    fetch_status,
     filter_groups,
     filters,
     login,
@@ -26,6 +27,7 @@ views_router.include_router(criteria.router, tags=["Criteria"])
 views_router.include_router(playlist.router, tags=["Playlists"])
 views_router.include_router(playlist_item.router, tags=["Playlist Items"])
 views_router.include_router(channels.router, tags=["Channels"])
+views_router.include_router(fetch_status.router, tags=["Fetch Status"])
 views_router.include_router(tag.router, tags=["Tags"])
 views_router.include_router(login.router, tags=["Logins"])
 views_router.include_router(account.router, prefix="/account", tags=["Account"])
@@ -0,0 +1,69 @@
+"""add video_fts
+
+Revision ID: b7e31d0c5a92
+Revises: 9a4c2e61f0b8
+Create Date: 2026-10-18 14:26:51.730112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # added
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e31d0c5a92"
+down_revision = "9a4c2e61f0b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # FTS5 and the triggers that keep the index in sync are SQLite-only
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS video_fts USING fts5(
+            title, description, content='video', content_rowid='rowid',
+            tokenize="unicode61 remove_diacritics 0 tokenchars '_'"
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS video_fts_insert AFTER INSERT ON video BEGIN
+            INSERT INTO video_fts(rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS video_fts_delete AFTER DELETE ON video BEGIN
+            INSERT INTO video_fts(video_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS video_fts_update AFTER UPDATE OF title, description ON video
+        BEGIN
+            INSERT INTO video_fts(video_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO video_fts(rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END
+        """
+    )
+    # Index the existing videos
+    op.execute("INSERT INTO video_fts(video_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute("DROP TRIGGER IF EXISTS video_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS video_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS video_fts_insert")
+    op.execute("DROP TABLE IF EXISTS video_fts")
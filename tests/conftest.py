@@ -17,6 +17,9 @@ from app.api import deps as api_deps
 from app.core import security
 from app.core.app import app
 from app.db.init_db import init_initial_data
+from app.services.filter_cache import clear_filter_caches, listen_for_filter_changes
+from app.services.rate_limit import rate_limiter
+from app.services.ytdlp_cache import info_dict_cache
 from app.views import deps as views_deps
 
 # Set up the database
@@ -30,6 +33,7 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=Session)
 SQLModel.metadata.drop_all(bind=engine)
 SQLModel.metadata.create_all(bind=engine)
+listen_for_filter_changes(session_factory=TestingSessionLocal)
 
 
 # These two event listeners are only needed for sqlite for proper
@@ -50,6 +54,22 @@ def do_begin(conn: Any) -> None:
     conn.exec_driver_sql("BEGIN")
 
 
+@pytest.fixture(name="disable_info_dict_cache")
+def fixture_disable_info_dict_cache(mocker: MagicMock) -> None:
+    """
+    Keep tests from reading or writing the on-disk yt-dlp info dict cache.
+    """
+    mocker.patch.object(info_dict_cache, "enabled", False)
+
+
+@pytest.fixture(name="disable_rate_limiter")
+def fixture_disable_rate_limiter(mocker: MagicMock) -> None:
+    """
+    Keep tests from waiting for the yt-dlp rate limiters.
+    """
+    mocker.patch.object(rate_limiter, "enabled", False)
+
+
 @pytest.fixture(name="init")
 def fixture_init(mocker: MagicMock, tmp_path: Path) -> None:  # pylint: disable=unused-argument
     # mocker.patch("app.paths.FEEDS_PATH", return_value=tmp_path)
@@ -82,6 +102,8 @@ async def fixture_db(init: Any) -> AsyncGenerator[Session, None]:  # pylint: dis
     session.close()
     transaction.rollback()
     connection.close()
+    # No session saw the rollback, so nothing cached from the test's data was invalidated
+    clear_filter_caches()
 
 
 @pytest.fixture(name="client")
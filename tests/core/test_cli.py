@@ -2,7 +2,7 @@ from unittest.mock import patch
 
 from typer.testing import CliRunner
 
-from app import settings
+from app import models, settings
 from app.core.cli import typer_app
 
 
@@ -25,3 +25,29 @@ def test_cli_main() -> None:
         result = runner.invoke(typer_app)
         assert result.exit_code == 0
         mock_start_server.assert_called_once()
+
+
+def test_cli_benchmark() -> None:
+    """
+    Test the CLI benchmark command.
+    """
+    with patch("app.services.benchmark.run_fetch_benchmark") as mock_run_fetch_benchmark:
+        mock_run_fetch_benchmark.return_value = models.FetchBenchmarkResults(
+            subscriptions=2, rounds=1, added_videos=10, seconds=2, statements=8
+        )
+        runner = CliRunner()
+        result = runner.invoke(typer_app, ["benchmark", "--subscriptions", "2", "--rounds", "1"])
+        assert result.exit_code == 0
+        assert mock_run_fetch_benchmark.call_args.kwargs["subscriptions"] == 2
+        assert "Videos / second" in result.output
+
+
+def test_cli_rebuild_search_index() -> None:
+    """
+    Test the CLI rebuild-search-index command.
+    """
+    with patch("app.services.video_fts.rebuild_video_fts") as mock_rebuild_video_fts:
+        runner = CliRunner()
+        result = runner.invoke(typer_app, ["rebuild-search-index"])
+        assert result.exit_code == 0
+        mock_rebuild_video_fts.assert_called_once()
@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import patch
 
 import pytest
@@ -184,3 +185,36 @@ async def test_notify_on_start(client: TestClient) -> None:
     assert mock_notify.call_args[1] == {
         "text": f"{settings.PROJECT_NAME}('{settings.ENV_NAME}') started."
     }
+
+
+@patch("app.core.notify.settings.NOTIFY_TELEGRAM_ENABLED", True)
+@patch("app.core.notify.settings.NOTIFY_EMAIL_ENABLED", True)
+async def test_dispatcher_dedups_and_batches_into_digest() -> None:
+    """
+    Test that the dispatcher returns immediately, drops duplicate notifications, and sends
+    notifications of the same window as one Telegram digest and one email.
+    """
+    dispatcher = notify.NotificationDispatcher(
+        dedup_seconds=60, digest_seconds=0.05, telegram_max_per_minute=20
+    )
+    with patch("app.core.notify.send_telegram_message") as mock_telegram:
+        with patch("app.core.notify.send_email") as mock_email:
+            dispatcher.dispatch("first", telegram=True, email=True)
+            dispatcher.dispatch("first", telegram=True, email=True)
+            dispatcher.dispatch("second", telegram=True, email=False)
+            assert not mock_telegram.called
+            await asyncio.sleep(0.2)
+            await dispatcher.stop()
+
+    assert dispatcher.suppressed == 1
+    mock_telegram.assert_called_once_with(text="2 notifications:\n\n- first\n\n- second")
+    assert mock_email.call_args[1]["html_template"] == "first"
+
+
+def test_build_digests_splits_long_digests() -> None:
+    """
+    Test that digests longer than the max message length are split.
+    """
+    digests = notify.build_digests(texts=["a" * 30, "b" * 30, "c" * 30], max_length=90)
+    assert len(digests) == 2
+    assert all(len(digest) <= 90 for digest in digests)
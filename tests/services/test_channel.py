@@ -0,0 +1,46 @@
+import asyncio
+import datetime
+from unittest.mock import MagicMock, patch
+
+from app.services.channel import ChannelLogoQueue
+from app.services.ytdlp import AccountNotFoundError
+
+
+async def test_channel_logo_queue_drain() -> None:
+    """
+    Test that logos are resolved without holding the write lock, terminated channels are
+    deleted and failed lookups are not retried before their retry-after.
+    """
+    ok_channel = MagicMock(id="ok", logo=None)
+    failing_channel = MagicMock(id="failing", logo=None)
+    terminated_channel = MagicMock(id="terminated", logo=None)
+    missing_logo_channels = [ok_channel, failing_channel, terminated_channel, ok_channel]
+    write_lock = asyncio.Lock()
+
+    async def mock_get_channel_logo(db_channel: MagicMock) -> str:
+        assert not write_lock.locked()
+        if db_channel.id == "failing":
+            raise KeyError("thumbnails")
+        if db_channel.id == "terminated":
+            raise AccountNotFoundError("This account has been terminated.")
+        return "https://example.com/logo"
+
+    db = MagicMock()
+    db.get.side_effect = lambda model, id: {
+        db_channel.id: db_channel for db_channel in missing_logo_channels
+    }[id]
+    queue = ChannelLogoQueue(workers=2, retry_after=datetime.timedelta(hours=1))
+    with patch("app.services.channel.get_channel_logo", side_effect=mock_get_channel_logo) as m:
+        with patch("app.services.channel.crud.channel.get_multi_missing_logo") as mock_missing:
+            mock_missing.return_value = missing_logo_channels
+            assert await queue.drain(db=db, write_lock=write_lock) == 1
+            assert m.call_count == 3
+
+            # The failed lookup is remembered and not retried
+            mock_missing.return_value = [failing_channel]
+            assert await queue.drain(db=db, write_lock=write_lock) == 0
+            assert m.call_count == 3
+
+    assert ok_channel.logo == "https://example.com/logo"
+    db.delete.assert_called_once_with(terminated_channel)
+    assert "failing" in queue.failed_until
@@ -0,0 +1,88 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from yt_dlp.utils import DownloadError
+
+from app.services import fetch
+from app.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+)
+from app.services.ytdlp import VideoUnavailableError
+
+
+def test_circuit_breaker_opens_and_recovers() -> None:
+    """
+    Test the closed -> open -> half-open -> closed cycle of a breaker.
+    """
+    breaker = CircuitBreaker(name="YouTube", failure_threshold=2, reset_timeout_seconds=0)
+    assert breaker.record_failure(error=DownloadError("HTTP Error 429")) is False
+    assert breaker.state == CLOSED
+    assert breaker.record_failure(error=DownloadError("HTTP Error 429")) is True
+    assert breaker.state == OPEN
+
+    # Reset timeout elapsed: a single trial call is allowed
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is False
+
+    # A failed trial re-opens without a second alert
+    assert breaker.record_failure(error=DownloadError("HTTP Error 429")) is False
+    assert breaker.state == OPEN
+
+    assert breaker.allow() is True
+    assert breaker.record_success() is True
+    assert breaker.state == CLOSED
+    assert breaker.allow() is True
+
+
+def test_open_circuit_rejects_calls() -> None:
+    """
+    Test that an open breaker rejects calls until its reset timeout elapsed.
+    """
+    breaker = CircuitBreaker(name="YouTube", failure_threshold=1, reset_timeout_seconds=3600)
+    breaker.record_failure(error=DownloadError("HTTP Error 429"))
+    assert breaker.allow() is False
+
+
+async def test_fetch_subscription_skips_open_handler_and_alerts_once() -> None:
+    """
+    Test that service failures trip the handler breaker with a single alert, that content
+    errors do not count against the handler, and that an open breaker skips extraction.
+    """
+    db_subscription = MagicMock(id="subscription", service_handler="YouTube")
+    handler_breakers = CircuitBreakerRegistry(failure_threshold=2, reset_timeout_seconds=3600)
+    subscription_breakers = CircuitBreakerRegistry(failure_threshold=10, reset_timeout_seconds=3600)
+    errors = [
+        DownloadError("HTTP Error 429"),
+        VideoUnavailableError("Video unavailable"),
+        DownloadError("HTTP Error 429"),
+        DownloadError("HTTP Error 429"),
+    ]
+    mock_fetch_subscription_videos = AsyncMock(side_effect=errors)
+
+    async def mock_get(**kwargs: object) -> MagicMock:
+        return db_subscription
+
+    with patch("app.services.fetch.crud.subscription.get", mock_get), patch(
+        "app.services.fetch.fetch_subscription_videos", mock_fetch_subscription_videos
+    ), patch("app.services.fetch.handler_breakers", handler_breakers), patch(
+        "app.services.fetch.subscription_breakers", subscription_breakers
+    ), patch(
+        "app.services.circuit_breaker.dispatcher.dispatch"
+    ) as mock_dispatch:
+        for _ in range(4):
+            with pytest.raises(fetch.FetchCanceledError):
+                await fetch.fetch_subscription(db=MagicMock(), id="subscription")
+
+        with pytest.raises(fetch.FetchCanceledError) as exc_info:
+            await fetch.fetch_subscription(db=MagicMock(), id="subscription")
+
+    assert isinstance(exc_info.value.__cause__, CircuitOpenError)
+    assert mock_fetch_subscription_videos.await_count == 4
+    assert handler_breakers.get(key="YouTube").state == OPEN
+    mock_dispatch.assert_called_once()
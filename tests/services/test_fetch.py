@@ -0,0 +1,339 @@
+import asyncio
+import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlmodel import Session
+
+from app.models import FetchResults, SubscriptionFetchStats
+from app.services import fetch
+from app.services.channel import ChannelLogoQueue
+
+
+async def test_fetch_subscriptions_is_bounded_and_aggregated() -> None:
+    """
+    Test that subscriptions are fetched concurrently, bounded by FETCH_CONCURRENCY,
+    and that cancelled fetches are skipped.
+    """
+    running = 0
+    max_running = 0
+
+    async def mock_fetch_subscription(id: str, **kwargs: object) -> FetchResults:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if id == "canceled":
+            raise fetch.FetchCanceledError()
+        return FetchResults(subscriptions=1, added_videos=2)
+
+    subscriptions = [MagicMock(id=str(i)) for i in range(5)] + [MagicMock(id="canceled")]
+    with patch("app.services.fetch.settings.FETCH_CONCURRENCY", 2):
+        with patch("app.services.fetch.fetch_subscription", mock_fetch_subscription):
+            with patch("app.services.fetch.check_and_update_null_channel_logos") as mock_logos:
+                results = await fetch.fetch_subscriptions(
+                    db=MagicMock(), subscriptions=subscriptions
+                )
+
+    mock_logos.assert_called_once()
+    assert max_running == 2
+    assert results.subscriptions == 5
+    assert results.added_videos == 10
+    assert results.errors == {"FetchCanceledError": 1}
+
+
+async def test_fetch_subscription_records_stage_stats() -> None:
+    """
+    Test that a subscription fetch records its stage times and entry counts.
+    """
+    db_subscription = MagicMock(id="subscription")
+
+    async def mock_get(**kwargs: object) -> MagicMock:
+        return db_subscription
+
+    async def mock_fetch_subscription_videos(
+        stats: SubscriptionFetchStats, **kwargs: object
+    ) -> tuple[list[str], int]:
+        with stats.measure("extract"):
+            await asyncio.sleep(0.01)
+        stats.entries_seen = 3
+        return ["new", "known"], 0
+
+    async def mock_add_new_videos_to_subscription(**kwargs: object) -> list[str]:
+        return ["new"]
+
+    with patch("app.services.fetch.crud.subscription.get", mock_get), patch(
+        "app.services.fetch.fetch_subscription_videos", mock_fetch_subscription_videos
+    ), patch(
+        "app.services.fetch.add_new_videos_to_subscription", mock_add_new_videos_to_subscription
+    ), patch(
+        "app.services.fetch.check_and_update_null_channel_logos"
+    ):
+        results = await fetch.fetch_subscription(db=MagicMock(), id="subscription")
+
+    stats = results.stats[0]
+    assert stats.extract_seconds >= 0.01
+    assert stats.total_seconds >= stats.extract_seconds
+    assert (stats.entries_seen, stats.entries_new) == (3, 1)
+    assert results.entries_seen == 3
+    assert fetch.fetch_status.latest["subscription"] == stats
+
+
+def test_fetch_results_merge_errors_and_stats() -> None:
+    """
+    Test that adding FetchResults sums error counts and concatenates stats.
+    """
+    first = FetchResults(
+        errors={"DownloadError": 1}, stats=[SubscriptionFetchStats(subscription_id="a")]
+    )
+    second = FetchResults(
+        errors={"DownloadError": 1, "NoUploadsError": 1},
+        stats=[SubscriptionFetchStats(subscription_id="b")],
+    )
+
+    results = first + second
+
+    assert results.errors == {"DownloadError": 2, "NoUploadsError": 1}
+    assert [stats.subscription_id for stats in results.stats] == ["a", "b"]
+
+
+async def test_single_flight_coalesces_concurrent_fetches() -> None:
+    """
+    Test that concurrent fetches of a key share one fetch, that a cancelled caller does not
+    cancel it for the others, and that fresh results are reused.
+    """
+    single_flight = fetch.SingleFlight(fresh_seconds=60, session_factory=MagicMock)
+    calls = 0
+
+    async def mock_fetch(db: Session) -> FetchResults:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return FetchResults(subscriptions=1, added_videos=calls)
+
+    first = asyncio.create_task(single_flight.run(key="subscription", fetch=mock_fetch))
+    second = asyncio.create_task(single_flight.run(key="subscription", fetch=mock_fetch))
+    canceled = asyncio.create_task(single_flight.run(key="subscription", fetch=mock_fetch))
+    await asyncio.sleep(0)
+    canceled.cancel()
+
+    assert (await first) is (await second)
+    assert canceled.cancelled()
+    assert calls == 1
+    assert not single_flight.in_flight
+
+    # Fresh results are reused, other keys are fetched
+    assert (await single_flight.run(key="subscription", fetch=mock_fetch)).added_videos == 1
+    assert (await single_flight.run(key="other", fetch=mock_fetch)).added_videos == 2
+
+
+async def test_single_flight_fetches_with_its_own_session() -> None:
+    """
+    Test that a fetch runs with a session of its own on the database of the caller, which
+    stays open when the caller that started the fetch is cancelled and is closed once the
+    fetch is done.
+    """
+    sessions: list[MagicMock] = []
+
+    bind = MagicMock()
+
+    def session_factory(**kwargs: object) -> MagicMock:
+        assert kwargs == {"bind": bind}
+        sessions.append(MagicMock())
+        return sessions[-1]
+
+    async def mock_fetch(db: Session) -> FetchResults:
+        await asyncio.sleep(0.02)
+        assert db is sessions[0]
+        db.close.assert_not_called()
+        return FetchResults(subscriptions=1)
+
+    single_flight = fetch.SingleFlight(session_factory=session_factory)
+    first = asyncio.create_task(single_flight.run(key="subscription", fetch=mock_fetch, bind=bind))
+    second = asyncio.create_task(single_flight.run(key="subscription", fetch=mock_fetch, bind=bind))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await second).subscriptions == 1
+    assert len(sessions) == 1
+    sessions[0].close.assert_called_once()
+
+
+async def test_single_flight_shares_errors() -> None:
+    """
+    Test that every caller of a failed fetch gets its error, and that failures are not reused.
+    """
+    single_flight = fetch.SingleFlight(fresh_seconds=60, session_factory=MagicMock)
+    calls = 0
+
+    async def mock_fetch(db: Session) -> FetchResults:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise fetch.FetchCanceledError()
+
+    results = await asyncio.gather(
+        single_flight.run(key="subscription", fetch=mock_fetch),
+        single_flight.run(key="subscription", fetch=mock_fetch),
+        return_exceptions=True,
+    )
+    assert [type(result) for result in results] == [fetch.FetchCanceledError] * 2
+    assert calls == 1
+
+    with pytest.raises(fetch.FetchCanceledError):
+        await single_flight.run(key="subscription", fetch=mock_fetch)
+    assert calls == 2
+
+
+async def test_fetch_subscription_resolves_logos_for_joined_callers(
+    mocker: MagicMock,
+) -> None:
+    """
+    Test that a caller asking for channel logos gets them when it joins a fetch started
+    without them.
+    """
+    calls = 0
+
+    async def mock_fetch_subscription(**kwargs: object) -> FetchResults:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return FetchResults(subscriptions=1)
+
+    mocker.patch.object(
+        fetch,
+        "subscription_fetches",
+        fetch.SingleFlight(fresh_seconds=60, session_factory=MagicMock),
+    )
+    mocker.patch.object(fetch, "_fetch_subscription", mock_fetch_subscription)
+    mock_logos = mocker.patch("app.services.fetch.check_and_update_null_channel_logos")
+    db = MagicMock()
+
+    run_results, joined_results = await asyncio.gather(
+        fetch.fetch_subscription(db=db, id="subscription", resolve_channel_logos=False),
+        fetch.fetch_subscription(db=db, id="subscription", resolve_channel_logos=True),
+    )
+
+    assert calls == 1
+    mock_logos.assert_called_once_with(db=db, write_lock=fetch.db_write_lock)
+    assert run_results.logo_seconds == 0
+    assert joined_results.subscriptions == 1
+
+
+async def test_fetch_subscription_resolves_logos_without_write_lock(
+    mocker: MagicMock,
+) -> None:
+    """
+    Test that the channel logos of a fetched subscription are looked up without holding the
+    database write lock, which is only taken to read the channels and apply the logos.
+    """
+    db_channel = MagicMock(id="channel", logo=None)
+
+    async def mock_fetch_subscription(**kwargs: object) -> FetchResults:
+        return FetchResults(subscriptions=1)
+
+    async def mock_get_channel_logo(db_channel: MagicMock) -> str:
+        assert not fetch.db_write_lock.locked()
+        return "https://example.com/logo"
+
+    mocker.patch.object(
+        fetch, "subscription_fetches", fetch.SingleFlight(session_factory=MagicMock)
+    )
+    mocker.patch.object(fetch, "_fetch_subscription", mock_fetch_subscription)
+    mocker.patch(
+        "app.services.channel.channel_logo_queue",
+        ChannelLogoQueue(workers=1, retry_after=datetime.timedelta(hours=1)),
+    )
+    mocker.patch(
+        "app.services.channel.crud.channel.get_multi_missing_logo", return_value=[db_channel]
+    )
+    mock_get_channel_logo = mocker.patch(
+        "app.services.channel.get_channel_logo", side_effect=mock_get_channel_logo
+    )
+    db = MagicMock()
+    db.get.return_value = db_channel
+
+    results = await fetch.fetch_subscription(db=db, id="subscription")
+
+    assert results.subscriptions == 1
+    mock_get_channel_logo.assert_called_once()
+    assert db_channel.logo == "https://example.com/logo"
+    db.commit.assert_called_once()
+
+
+@patch("app.services.fetch.settings.FETCH_RUN_TIMEOUT_SECONDS", 0.05)
+async def test_fetch_subscriptions_stops_at_run_deadline() -> None:
+    """
+    Test that fetches still running at the run deadline are abandoned and recorded as timed
+    out, while the results of finished fetches are kept.
+    """
+    progress: list[str] = []
+
+    async def mock_fetch_subscription(id: str, **kwargs: object) -> FetchResults:
+        await asyncio.sleep(10 if id == "hung" else 0)
+        return FetchResults(subscriptions=1, added_videos=2)
+
+    subscriptions = [MagicMock(id="0"), MagicMock(id="hung"), MagicMock(id="1")]
+    with patch("app.services.fetch.fetch_subscription", mock_fetch_subscription), patch(
+        "app.services.fetch.check_and_update_null_channel_logos"
+    ):
+        results = await fetch.fetch_subscriptions(
+            db=MagicMock(),
+            subscriptions=subscriptions,
+            on_progress=lambda subscription_id, _: progress.append(subscription_id),
+        )
+
+    assert results.subscriptions == 2
+    assert results.added_videos == 4
+    assert results.errors == {"FetchTimeoutError": 1}
+    assert sorted(progress) == ["0", "1", "hung"]
+
+
+async def test_fetch_subscriptions_can_be_cancelled() -> None:
+    """
+    Test that setting the cancel event stops the run and records unfetched subscriptions.
+    """
+    cancel_event = asyncio.Event()
+
+    async def mock_fetch_subscription(id: str, **kwargs: object) -> FetchResults:
+        if id == "0":
+            cancel_event.set()
+            return FetchResults(subscriptions=1)
+        await asyncio.sleep(10)
+        return FetchResults(subscriptions=1)
+
+    subscriptions = [MagicMock(id=str(i)) for i in range(3)]
+    with patch("app.services.fetch.fetch_subscription", mock_fetch_subscription), patch(
+        "app.services.fetch.check_and_update_null_channel_logos"
+    ):
+        results = await fetch.fetch_subscriptions(
+            db=MagicMock(), subscriptions=subscriptions, cancel_event=cancel_event
+        )
+
+    assert results.subscriptions == 1
+    assert results.errors == {"FetchRunCanceledError": 2}
+
+
+@patch("app.services.fetch.settings.FETCH_SUBSCRIPTION_TIMEOUT_SECONDS", 0.01)
+async def test_fetch_subscription_times_out() -> None:
+    """
+    Test that a hung extraction is abandoned and recorded as timed out.
+    """
+    db_subscription = MagicMock(id="hung_subscription")
+
+    async def mock_get(**kwargs: object) -> MagicMock:
+        return db_subscription
+
+    async def mock_fetch_subscription_videos(**kwargs: object) -> tuple[list[str], int]:
+        await asyncio.sleep(10)
+        return [], 0
+
+    with patch("app.services.fetch.crud.subscription.get", mock_get), patch(
+        "app.services.fetch.fetch_subscription_videos", mock_fetch_subscription_videos
+    ):
+        with pytest.raises(fetch.FetchCanceledError) as e:
+            await fetch.fetch_subscription(db=MagicMock(), id="hung_subscription")
+
+    assert isinstance(e.value.__cause__, fetch.FetchTimeoutError)
+    assert fetch.fetch_status.latest["hung_subscription"].error == "FetchTimeoutError"
@@ -0,0 +1,75 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from app.models import FetchResults
+from app.services.fetch_jobs import CANCELLED, COMPLETED, FetchJobManager
+
+
+async def test_fetch_job_streams_progress_and_results() -> None:
+    """
+    Test that a fetch job reports the progress of each subscription and its results, and
+    that a listener connecting late gets every event.
+    """
+    subscriptions = [MagicMock(id=str(i), title=f"Subscription {i}") for i in range(3)]
+
+    async def mock_get_all(**kwargs: object) -> list[MagicMock]:
+        return subscriptions
+
+    async def mock_fetch_subscriptions(
+        subscriptions: list[MagicMock], on_progress: MagicMock, use_cache: bool, **kwargs: object
+    ) -> FetchResults:
+        # Jobs are started by users and bypass the info dict cache
+        assert not use_cache
+        results = FetchResults()
+        for subscription in subscriptions:
+            await asyncio.sleep(0.01)
+            subscription_results = FetchResults(subscriptions=1, added_videos=2)
+            on_progress(subscription.id, subscription_results)
+            results += subscription_results
+        return results
+
+    manager = FetchJobManager(session_factory=MagicMock)
+    with patch("app.services.fetch_jobs.crud.subscription.get_all", mock_get_all), patch(
+        "app.services.fetch_jobs.fetch_subscriptions", mock_fetch_subscriptions
+    ):
+        job = manager.start_fetch_all(title="All Subscriptions")
+        # A running job is reused
+        assert manager.start_fetch_all(title="All Subscriptions") is job
+        live_events = [event async for event in job.iter_events()]
+
+    late_events = [event async for event in manager.get(job_id=job.id).iter_events()]
+
+    assert job.status == COMPLETED
+    assert live_events == late_events
+    assert [event.event for event in live_events] == ["progress"] * 3 + ["done"]
+    assert [event.done for event in live_events] == [1, 2, 3, 3]
+    assert live_events[0].subscription == "Subscription 0"
+    assert live_events[-1].results.added_videos == 6
+
+
+async def test_fetch_job_can_be_cancelled() -> None:
+    """
+    Test that a cancelled job stops its run and reports the results it has so far.
+    """
+
+    async def mock_get_all(**kwargs: object) -> list[MagicMock]:
+        return [MagicMock(id="subscription")]
+
+    async def mock_fetch_subscriptions(
+        cancel_event: asyncio.Event, **kwargs: object
+    ) -> FetchResults:
+        await cancel_event.wait()
+        return FetchResults(errors={"FetchRunCanceledError": 1})
+
+    manager = FetchJobManager(session_factory=MagicMock)
+    with patch("app.services.fetch_jobs.crud.subscription.get_all", mock_get_all), patch(
+        "app.services.fetch_jobs.fetch_subscriptions", mock_fetch_subscriptions
+    ):
+        job = manager.start_fetch_all(title="All Subscriptions")
+        await asyncio.sleep(0.01)
+        manager.cancel(job_id=job.id)
+        events = [event async for event in job.iter_events()]
+
+    assert job.status == CANCELLED
+    assert events[-1].event == "cancelled"
+    assert events[-1].results.errors == {"FetchRunCanceledError": 1}
@@ -0,0 +1,623 @@
+from typing import Any
+
+import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session
+
+from app import crud, models, settings
+from app.services.channel_tags import channel_tag_index
+from app.services.filter_cache import filter_results, get_statement_changes
+from app.services.filter_index import FilterIndexer, filter_indexer, index_filter
+from app.services.filter_videos import (
+    CriteriaPredicate,
+    compute_filter_result,
+    count_filtered_videos,
+    get_filter_counts,
+    get_filtered_videos,
+    refresh_filter_counts,
+)
+from app.services.video_snapshot import video_snapshot
+
+NOW = datetime.datetime.utcnow()
+
+
+@pytest.fixture(name="catalog")
+async def fixture_catalog(db: Session) -> dict[str, models.Subscription]:
+    """
+    Two subscriptions over videos of tagged, untagged and hidden channels.
+    """
+    user = await crud.user.get(db=db, username=settings.FIRST_SUPERUSER_USERNAME)
+    subscriptions = {
+        name: models.Subscription(
+            id=name,
+            created_by=user.id,
+            service_handler="YoutubeHandler",
+            subscription_handler="YoutubeSubscriptionHandler",
+            max_videos_per_fetch=10,
+        )
+        for name in ["main", "other"]
+    }
+    tags = {name: models.Tag(id=name, name=name, color="#000000") for name in ["music", "news"]}
+    channels = {
+        "tagged": models.Channel(tags=[tags["music"]]),
+        "untagged": models.Channel(),
+        "hidden": models.Channel(tags=[tags["music"]], is_hidden=True),
+        "news": models.Channel(tags=[tags["news"]]),
+    }
+    for name, channel in channels.items():
+        channel.id = channel.remote_channel_id = name
+        channel.service_handler = "YoutubeHandler"
+        channel.name = name
+    videos = [
+        # id, channel, title, duration, is read, subscriptions
+        ("v1", "tagged", "Live Concert", 300, False, ["main", "other"]),
+        ("v2", "untagged", "A long talk", 7200, False, ["main"]),
+        ("v3", "hidden", "Hidden concert", 300, False, ["main"]),
+        ("v4", "news", "Concerts today", None, False, ["main"]),
+        ("v5", "untagged", "Elsewhere", 60, False, ["other"]),
+        ("v6", "tagged", "Already seen", 60, True, ["main"]),
+    ]
+    descriptions = {"v2": "Recorded at the festival"}
+    for i, (video_id, channel, title, duration, is_read, video_subscriptions) in enumerate(videos):
+        db.add(
+            models.Video(
+                id=video_id,
+                service_handler="YoutubeHandler",
+                url=f"https://www.youtube.com/watch?v={video_id}",
+                remote_channel_id=channel,
+                title=title,
+                description=descriptions.get(video_id),
+                duration=duration,
+                is_read=is_read,
+                created_at=NOW - datetime.timedelta(days=len(videos) - i),
+                subscriptions=[subscriptions[name] for name in video_subscriptions],
+            )
+        )
+    db.add_all([*subscriptions.values(), *channels.values()])
+    db.commit()
+    return subscriptions
+
+
+def build_filter(
+    subscriptions: list[models.Subscription], criterias: list[tuple[str, str, str, str]], **kwargs
+) -> models.Filter:
+    return models.Filter(
+        id="filter",
+        name="filter",
+        read_status=kwargs.pop("read_status", models.FilterReadStatus.UNREAD.value),
+        subscriptions=subscriptions,
+        criterias=[
+            models.Criteria(field=field, operator=operator, value=value, unit_of_measure=unit)
+            for field, operator, value, unit in criterias
+        ],
+        **kwargs,
+    )
+
+
+def save_filters(db: Session, filters: list[models.Filter]) -> None:
+    # Criteria are not saved along with their filter
+    for filter_ in filters:
+        for i, criteria in enumerate(filter_.criterias):
+            criteria.id = f"{filter_.id}-{i}"
+        db.add_all([filter_, *filter_.criterias])
+    db.commit()
+
+
+def use_backend(mocker: MagicMock, backend: str, db: Session | None = None) -> None:
+    # "snapshot" is the "python" backend over the video snapshot
+    mocker.patch.object(settings, "FILTER_BACKEND", "python" if backend == "snapshot" else backend)
+    mocker.patch.object(settings, "FILTER_SNAPSHOT", backend == "snapshot")
+    if db is not None:
+
+        def join_test_transaction() -> Session:
+            # The indexer commits a savepoint of its own in the transaction of the test
+            connection = db.get_bind()
+            connection.begin_nested()  # type: ignore[union-attr]
+            return Session(bind=connection)
+
+        mocker.patch.object(filter_indexer, "session_factory", join_test_transaction)
+
+
+@pytest.mark.parametrize("backend", ["index", "sql", "python", "snapshot"])
+@pytest.mark.parametrize(
+    "criterias, kwargs, expected",
+    [
+        ([], {}, ["v1", "v2", "v4"]),
+        ([], {"show_hidden_channels": True}, ["v1", "v2", "v3", "v4"]),
+        ([], {"read_status": "all"}, ["v1", "v2", "v4", "v6"]),
+        ([], {"reverse_order": True}, ["v4", "v2", "v1"]),
+        ([("channel", "must_contain", "music", "tag")], {}, ["v1"]),
+        ([("channel", "must_contain", "ANY", "tag")], {}, ["v1", "v4"]),
+        ([("channel", "must_not_contain", "music", "tag")], {}, ["v2", "v4"]),
+        ([("channel", "must_not_contain", "ANY", "tag")], {}, ["v2"]),
+        ([("duration", "shorter_than", "1", "hours")], {}, ["v1", "v4"]),
+        ([("duration", "longer_than", "10", "minutes")], {}, ["v2", "v4"]),
+        ([("keyword", "must_contain", "concert", "keyword")], {}, ["v1"]),
+        ([("keyword", "must_not_contain", "concert", "keyword")], {}, ["v2", "v4"]),
+        ([("keyword", "must_contain", "festival", "keyword")], {}, ["v2"]),
+        ([("keyword", "must_not_contain", "festival", "keyword")], {}, ["v1", "v4"]),
+        (
+            [
+                ("keyword", "must_contain", "live", "keyword"),
+                ("keyword", "must_contain", "concert", "keyword"),
+            ],
+            {},
+            ["v1"],
+        ),
+        ([("channel_id", "is_not", "tagged", "channel_id")], {}, ["v2", "v4"]),
+        ([("created", "within", "2", "days")], {"read_status": "all"}, ["v6"]),
+        (
+            [
+                ("channel", "must_contain", "ANY", "tag"),
+                ("duration", "longer_than", "1", "minutes"),
+            ],
+            {},
+            ["v1", "v4"],
+        ),
+    ],
+)
+async def test_get_filtered_videos(
+    db: Session,
+    mocker: MagicMock,
+    catalog: dict[str, models.Subscription],
+    backend: str,
+    criterias: list[tuple[str, str, str, str]],
+    kwargs: dict[str, object],
+    expected: list[str],
+) -> None:
+    """
+    Test that all filter backends select the matching videos of the subscriptions once,
+    in filter order.
+    """
+    use_backend(mocker=mocker, backend=backend, db=db)
+    filter_ = build_filter(subscriptions=[catalog["main"]], criterias=criterias, **kwargs)
+    save_filters(db=db, filters=[filter_])
+    await filter_indexer.join()
+    assert filter_indexer.is_current
+    filtered_videos = await get_filtered_videos(db=db, filter_=filter_)
+
+    assert [video.id for video in filtered_videos.videos] == expected
+    assert filtered_videos.videos_not_limited_count == len(expected)
+
+
+async def test_get_filtered_videos_limit(
+    db: Session, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that limited results are counted with a separate query.
+    """
+    filter_ = build_filter(subscriptions=list(catalog.values()), criterias=[], reverse_order=True)
+    save_filters(db=db, filters=[filter_])
+
+    filtered_videos = await get_filtered_videos(db=db, filter_=filter_, max_videos=2)
+
+    assert [video.id for video in filtered_videos.videos] == ["v5", "v4"]
+    assert filtered_videos.videos_limited_count == 2
+    assert filtered_videos.videos_not_limited_count == 4
+
+
+def test_criteria_predicate_parses_criteria_once() -> None:
+    """
+    Test that criteria values are compiled into bounds, one cutoff and keyword patterns.
+    """
+    now = datetime.datetime(2023, 6, 1, 12)
+    predicate = CriteriaPredicate(
+        criterias=[
+            models.Criteria(
+                field="duration", operator="longer_than", value="1", unit_of_measure="minutes"
+            ),
+            models.Criteria(
+                field="duration", operator="longer_than", value="90", unit_of_measure="seconds"
+            ),
+            models.Criteria(
+                field="duration", operator="shorter_than", value="1", unit_of_measure="hours"
+            ),
+            models.Criteria(field="created", operator="within", value="7", unit_of_measure="days"),
+            models.Criteria(
+                field="keyword", operator="must_not_contain", value="c++", unit_of_measure="keyword"
+            ),
+            models.Criteria(
+                field="keyword",
+                operator="must_not_contain",
+                value="Shorts",
+                unit_of_measure="keyword",
+            ),
+        ],
+        now=now,
+    )
+
+    assert (predicate.min_duration, predicate.max_duration) == (90, 3600)
+    assert predicate.created_after == datetime.datetime(2023, 5, 25, 12)
+
+    def build_video(title: str, duration: int | None = 120, days: int = 1) -> models.Video:
+        return models.Video(
+            title=title, duration=duration, created_at=now - datetime.timedelta(days=days)
+        )
+
+    assert predicate(build_video("Learning Rust")) is True
+    assert predicate(build_video("Learning Rust", duration=None)) is True
+    assert predicate(build_video("Learning Rust", duration=60)) is False
+    assert predicate(build_video("Learning Rust", days=8)) is False
+    assert predicate(build_video("#shorts are shortsighted")) is False
+    assert predicate(build_video("shortsighted")) is True
+
+
+async def test_channel_tag_index(db: Session, catalog: dict[str, models.Subscription]) -> None:
+    """
+    Test that tag criteria are tested against channel masks, reloaded when tags change.
+    """
+    channel_tags = channel_tag_index.get(db=db)
+    assert channel_tag_index.get(db=db) is channel_tags
+    music, news = channel_tags.get_tags_mask(["music"]), channel_tags.get_tags_mask(["news"])
+    assert music & news == 0
+    assert channel_tags.get_channel_mask("tagged") == music
+    assert channel_tags.get_channel_mask("untagged") == 0
+
+    criterias = [
+        models.Criteria(
+            field="channel", operator="must_contain", value="ANY", unit_of_measure="tag"
+        ),
+        models.Criteria(
+            field="channel", operator="must_not_contain", value="news", unit_of_measure="tag"
+        ),
+    ]
+    predicate = CriteriaPredicate(criterias=criterias, channel_tags=channel_tags)
+    assert (predicate.must_contain_mask, predicate.must_not_contain_mask) == (-1, news)
+    assert predicate(models.Video(remote_channel_id="tagged")) is True
+    assert predicate(models.Video(remote_channel_id="untagged")) is False
+    assert predicate(models.Video(remote_channel_id="news")) is False
+    with pytest.raises(ValueError):
+        CriteriaPredicate(criterias=criterias)
+
+    # Commits of other changes keep the masks
+    await crud.video.update(db=db, obj_in=models.VideoUpdate(id="v1", is_read=True), id="v1")
+    assert channel_tag_index.get(db=db) is channel_tags
+
+    db_channel = await crud.channel.get(db=db, id="untagged")
+    db_channel.tags.append(await crud.tag.get(db=db, id="news"))
+    db.commit()
+    assert channel_tag_index.get(db=db).get_channel_mask("untagged") == news
+
+
+@pytest.mark.parametrize("backend", ["index", "sql", "python", "snapshot"])
+async def test_count_filtered_videos(
+    db: Session, mocker: MagicMock, catalog: dict[str, models.Subscription], backend: str
+) -> None:
+    """
+    Test that the counts of all filters are computed at once and match each filter's results.
+    """
+    use_backend(mocker=mocker, backend=backend)
+    filters = [
+        build_filter(subscriptions=[catalog["main"]], criterias=[]),
+        build_filter(subscriptions=list(catalog.values()), criterias=[], read_status="all"),
+        build_filter(
+            subscriptions=[catalog["other"]], criterias=[("channel", "must_contain", "ANY", "tag")]
+        ),
+        build_filter(subscriptions=[], criterias=[]),
+    ]
+    for i, filter_ in enumerate(filters):
+        filter_.id = f"filter{i}"
+    save_filters(db=db, filters=filters)
+
+    counts = await count_filtered_videos(db=db, filters=filters)
+
+    assert counts == {"filter0": 3, "filter1": 5, "filter2": 1, "filter3": 0}
+
+
+async def test_filter_result_cache(
+    db: Session, mocker: MagicMock, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that results are cached until an input they depend on is committed.
+    """
+    mocker.patch.object(filter_results, "ttl_seconds", 300)
+    compute = mocker.patch(
+        "app.services.filter_videos.compute_filter_result", wraps=compute_filter_result
+    )
+    unread_filter = build_filter(subscriptions=[catalog["main"]], criterias=[])
+    all_filter = build_filter(subscriptions=[catalog["main"]], criterias=[], read_status="all")
+    all_filter.id = "all"
+    tag_filter = build_filter(
+        subscriptions=[catalog["main"]], criterias=[("channel", "must_contain", "ANY", "tag")]
+    )
+    tag_filter.id = "tagged"
+    filters = [unread_filter, all_filter, tag_filter]
+    save_filters(db=db, filters=filters)
+
+    for _ in range(2):
+        for filter_ in filters:
+            await get_filtered_videos(db=db, filter_=filter_, max_videos=20)
+    assert compute.call_count == 3
+
+    # Only filters of unread videos depend on the read status
+    await crud.video.update(db=db, obj_in=models.VideoUpdate(id="v1", is_read=True), id="v1")
+    filtered_videos = [
+        await get_filtered_videos(db=db, filter_=filter_, max_videos=20) for filter_ in filters
+    ]
+    assert [video.id for video in filtered_videos[0].videos] == ["v2", "v4"]
+    assert [video.id for video in filtered_videos[1].videos] == ["v1", "v2", "v4", "v6"]
+    assert compute.call_count == 5
+
+    # Only filters of tags depend on the tags of channels
+    db_channel = await crud.channel.get(db=db, id="untagged")
+    db_channel.tags.append(await crud.tag.get(db=db, id="music"))
+    db.commit()
+    filtered_videos = [
+        await get_filtered_videos(db=db, filter_=filter_, max_videos=20) for filter_ in filters
+    ]
+    assert [video.id for video in filtered_videos[2].videos] == ["v2", "v4"]
+    assert compute.call_count == 6
+
+
+async def test_get_filter_counts_stale_while_revalidate(
+    db: Session, mocker: MagicMock, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that stale counts are served while they are recounted in the background.
+    """
+    mocker.patch.object(filter_results, "ttl_seconds", 300)
+    revalidate = mocker.patch.object(filter_results, "revalidate")
+    filter_ = build_filter(subscriptions=[catalog["main"]], criterias=[])
+    save_filters(db=db, filters=[filter_])
+
+    assert await get_filter_counts(db=db, filters=[filter_]) == {"filter": 3}
+    await crud.video.update(db=db, obj_in=models.VideoUpdate(id="v1", is_read=True), id="v1")
+
+    assert await get_filter_counts(db=db, filters=[filter_]) == {"filter": 3}
+    revalidate.assert_called_once()
+    assert await get_filter_counts(db=db, filters=[filter_], allow_stale=False) == {"filter": 2}
+
+    await crud.video.update(db=db, obj_in=models.VideoUpdate(id="v2", is_read=True), id="v2")
+    await refresh_filter_counts(db=db, filter_ids=["filter"])
+    assert await get_filter_counts(db=db, filters=[filter_]) == {"filter": 1}
+    assert revalidate.call_count == 1
+
+
+async def test_filter_result_cache_rollback(
+    db: Session, mocker: MagicMock, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that results read with flushed changes are invalidated when they are rolled back,
+    and that sessions of other factories leave the results alone.
+    """
+    use_backend(mocker=mocker, backend="sql")
+    mocker.patch.object(filter_results, "ttl_seconds", 300)
+    filter_ = build_filter(subscriptions=[catalog["main"]], criterias=[])
+    save_filters(db=db, filters=[filter_])
+
+    savepoint = db.begin_nested()
+    db.execute(sa.update(models.Video).where(models.Video.id == "v1").values(is_read=True))
+    filtered_videos = await get_filtered_videos(db=db, filter_=filter_)
+    assert [video.id for video in filtered_videos.videos] == ["v2", "v4"]
+    savepoint.rollback()
+    filtered_videos = await get_filtered_videos(db=db, filter_=filter_)
+    assert [video.id for video in filtered_videos.videos] == ["v1", "v2", "v4"]
+
+    with sessionmaker(bind=db.get_bind(), class_=Session)() as other_db:
+        other_db.execute(
+            sa.update(models.Video).where(models.Video.id == "v1").values(is_read=True)
+        )
+        other_db.commit()
+    result, stale = filter_results.get(filter_id=filter_.id)
+    assert result is not None and not stale
+
+
+def test_statement_changes() -> None:
+    """
+    Test that bulk statements invalidate only what they change.
+    """
+    changes = get_statement_changes(
+        sa.update(models.Video).where(models.Video.id == "v1").values(is_read=True)
+    )
+    assert changes.read_status and not changes.all
+    changes = get_statement_changes(
+        sa.update(models.Channel).values(is_subscribed=True)  # type: ignore[call-arg]
+    )
+    assert not changes
+    changes = get_statement_changes(
+        sa.insert(models.SubscriptionVideoLink).values(
+            [{"subscription_id": "main", "video_id": "v1"}]
+        )
+    )
+    assert changes.subscription_ids == {"main"} and not changes.all
+    assert get_statement_changes(sa.delete(models.Video)).all
+
+
+async def test_filter_index_is_updated_incrementally(
+    db: Session, mocker: MagicMock, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that commits are indexed after they complete, and only for the filters and videos
+    they changed.
+    """
+    use_backend(mocker=mocker, backend="index", db=db)
+    unread_filter = build_filter(subscriptions=[catalog["main"]], criterias=[])
+    tag_filter = build_filter(
+        subscriptions=[catalog["main"]], criterias=[("channel", "must_contain", "music", "tag")]
+    )
+    tag_filter.id = "tagged"
+    other_filter = build_filter(
+        subscriptions=[catalog["other"]], criterias=[], show_hidden_channels=True
+    )
+    other_filter.id = "other"
+    save_filters(db=db, filters=[unread_filter, tag_filter, other_filter])
+    await filter_indexer.join()
+
+    def get_indexed_video_ids(filter_id: str) -> set[str]:
+        return set(
+            db.execute(
+                sa.select(models.FilterVideoLink.video_id).where(
+                    models.FilterVideoLink.filter_id == filter_id
+                )
+            ).scalars()
+        )
+
+    assert get_indexed_video_ids("filter") == {"v1", "v2", "v4"}
+    assert get_indexed_video_ids("tagged") == {"v1"}
+    assert get_indexed_video_ids("other") == {"v1", "v5"}
+    indexed_filter_ids: list[str] = []
+
+    def index_and_record(**kwargs: Any) -> None:
+        indexed_filter_ids.append(kwargs["filter_"].id)
+        index_filter(**kwargs)
+
+    index = mocker.patch("app.services.filter_index.index_filter", side_effect=index_and_record)
+
+    # The commit does not wait for the index, which is not read until it is current
+    await crud.video.update(db=db, obj_in=models.VideoUpdate(id="v4", is_read=True), id="v4")
+    assert not filter_indexer.is_current
+    assert get_indexed_video_ids("filter") == {"v1", "v2", "v4"}
+    filtered_videos = await get_filtered_videos(db=db, filter_=unread_filter)
+    assert [video.id for video in filtered_videos.videos] == ["v1", "v2"]
+    await filter_indexer.join()
+    assert filter_indexer.is_current
+    assert get_indexed_video_ids("filter") == {"v1", "v2"}
+    # The other subscription does not have the video
+    assert indexed_filter_ids == ["filter", "tagged"]
+    assert [call.kwargs["video_ids"] for call in index.call_args_list] == [["v4"], ["v4"]]
+
+    index.reset_mock()
+    await crud.video.update(db=db, obj_in=models.VideoUpdate(id="v1", is_read=True), id="v1")
+    await filter_indexer.join()
+    assert get_indexed_video_ids("filter") == {"v2"}
+    assert get_indexed_video_ids("other") == {"v5"}
+    assert index.call_count == 3
+
+    # Filters that show hidden channels and have no tag criteria do not depend on channels
+    index.reset_mock()
+    indexed_filter_ids.clear()
+    db_channel = await crud.channel.get(db=db, id="untagged")
+    db_channel.tags.append(await crud.tag.get(db=db, id="music"))
+    db.commit()
+    await filter_indexer.join()
+    assert get_indexed_video_ids("tagged") == {"v2"}
+    assert indexed_filter_ids == ["filter", "tagged"]
+    assert [call.kwargs.get("channel_ids") for call in index.call_args_list] == [
+        ["untagged"],
+        ["untagged"],
+    ]
+
+    # A new criteria recomputes its filter only
+    index.reset_mock()
+    db.add(
+        models.Criteria(
+            id="longer",
+            filter_id="filter",
+            field="duration",
+            operator="longer_than",
+            value="10",
+            unit_of_measure="minutes",
+        )
+    )
+    db.commit()
+    await filter_indexer.join()
+    assert get_indexed_video_ids("filter") == {"v2"}
+    index.assert_called_once()
+    assert "video_ids" not in index.call_args.kwargs
+
+    db.execute(
+        sa.delete(models.SubscriptionVideoLink).where(
+            models.SubscriptionVideoLink.video_id.in_(["v2"])
+        )
+    )
+    db.execute(sa.delete(models.Video).where(models.Video.id.in_(["v2"])))
+    db.commit()
+    await filter_indexer.join()
+    assert get_indexed_video_ids("filter") == set()
+
+
+async def test_filter_indexer_start(
+    db: Session, mocker: MagicMock, tmp_path: Path, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that the index is only rebuilt at startup if the last app did not leave it current.
+    """
+    use_backend(mocker=mocker, backend="index", db=db)
+    indexer = FilterIndexer(current_file=tmp_path / "filter_index.current")
+    rebuild = mocker.patch("app.services.filter_index.rebuild_filter_index")
+
+    indexer.start(db=db)
+    rebuild.assert_called_once()
+    await indexer.stop()
+    assert indexer.current_file.exists()
+
+    indexer.start(db=db)
+    rebuild.assert_called_once()
+    assert not indexer.current_file.exists()
+
+    # The index is not current if the app stops with changes that were not indexed
+    indexer.pending.filter_ids.add("filter")
+    mocker.patch.object(indexer, "join")
+    await indexer.stop()
+    assert not indexer.current_file.exists()
+
+
+async def test_video_snapshot_is_refreshed_incrementally(
+    db: Session, mocker: MagicMock, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that commits only reload the videos and channels they changed into the snapshot.
+    """
+    use_backend(mocker=mocker, backend="snapshot")
+    filter_ = build_filter(subscriptions=[catalog["main"]], criterias=[], reverse_order=True)
+    save_filters(db=db, filters=[filter_])
+
+    filtered_videos = await get_filtered_videos(db=db, filter_=filter_, max_videos=2)
+    assert [video.id for video in filtered_videos.videos] == ["v4", "v2"]
+    assert filtered_videos.videos_not_limited_count == 3
+    snapshot = video_snapshot.get(db=db)
+    load_videos = mocker.patch.object(snapshot, "load_videos", wraps=snapshot.load_videos)
+
+    # A read-mark and a fetched video
+    await crud.video.update(db=db, obj_in=models.VideoUpdate(id="v4", is_read=True), id="v4")
+    db.add(
+        models.Video(
+            id="v7",
+            service_handler="YoutubeHandler",
+            url="https://www.youtube.com/watch?v=v7",
+            remote_channel_id="news",
+            title="Fetched",
+            created_at=NOW,
+            subscriptions=[catalog["main"]],
+        )
+    )
+    db.commit()
+    filtered_videos = await get_filtered_videos(db=db, filter_=filter_, max_videos=2)
+    assert [video.id for video in filtered_videos.videos] == ["v7", "v2"]
+    assert filtered_videos.videos_not_limited_count == 3
+    assert video_snapshot.get(db=db) is snapshot
+    load_videos.assert_called_once_with(db=db, video_ids=["v4", "v7"])
+
+    db_channel = await crud.channel.get(db=db, id="untagged")
+    db_channel.is_hidden = True
+    db.commit()
+    assert await count_filtered_videos(db=db, filters=[filter_]) == {"filter": 2}
+
+
+async def test_video_snapshot_matches_keywords_in_the_database(
+    db: Session, mocker: MagicMock, catalog: dict[str, models.Subscription]
+) -> None:
+    """
+    Test that the snapshot matches KEYWORD criteria on the current titles in the database, in
+    batches of the candidate videos.
+    """
+    use_backend(mocker=mocker, backend="snapshot")
+    mocker.patch("app.services.video_snapshot.SNAPSHOT_BATCH_SIZE", 1)
+    filter_ = build_filter(
+        subscriptions=[catalog["main"]],
+        criterias=[("keyword", "must_contain", "concert", "keyword")],
+    )
+    save_filters(db=db, filters=[filter_])
+
+    filtered_videos = await get_filtered_videos(db=db, filter_=filter_)
+    assert [video.id for video in filtered_videos.videos] == ["v1"]
+
+    await crud.video.update(
+        db=db, obj_in=models.VideoUpdate(id="v2", title="Concert talk"), id="v2"
+    )
+    assert await count_filtered_videos(db=db, filters=[filter_]) == {"filter": 2}
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from yt_dlp.utils import DownloadError
+
+from app.services import ytdlp
+from app.services.rate_limit import RateLimiter, TokenBucket, track_rate_limit_wait
+
+YOUTUBE_URL = "https://www.youtube.com/watch?v=abc"
+
+
+async def test_token_bucket_allows_burst_then_spaces_calls() -> None:
+    """
+    Test that a bucket lets a burst through at once and spaces out the following calls.
+    """
+    bucket = TokenBucket(rate_per_minute=600, burst=2, min_rate_ratio=0.1)
+
+    waits = [await bucket.acquire() for _ in range(3)]
+
+    assert waits[0] < 0.01 and waits[1] < 0.01
+    # 600 calls per minute is one call every 0.1s
+    assert 0.05 < waits[2] < 0.5
+
+
+def test_token_bucket_adapts_to_throttling() -> None:
+    """
+    Test that throttling halves the rate down to its lower bound and successes restore it.
+    """
+    bucket = TokenBucket(rate_per_minute=60, burst=5, min_rate_ratio=0.2)
+
+    bucket.penalize()
+    assert bucket.rate == 0.5
+    assert bucket.tokens <= 0
+    for _ in range(3):
+        bucket.penalize()
+    assert bucket.rate == bucket.min_rate == 0.2
+
+    for _ in range(20):
+        bucket.reward()
+    assert bucket.rate == bucket.base_rate == 1
+
+
+async def test_rate_limiter_tracks_wait_per_identity() -> None:
+    """
+    Test that services and cookie identities get their own buckets and waits are tracked.
+    """
+    limiter = RateLimiter(
+        rates_per_minute={"YoutubeHandler": 600},
+        default_rate_per_minute=60,
+        burst=1,
+        min_rate_ratio=0.1,
+    )
+
+    with track_rate_limit_wait() as wait:
+        youtube = await limiter.acquire(url=YOUTUBE_URL, ydl_opts={})
+        await limiter.acquire(url=YOUTUBE_URL, ydl_opts={})
+        # Another account does not wait for the first one
+        await asyncio.wait_for(
+            limiter.acquire(url=YOUTUBE_URL, ydl_opts={"cookiefile": "user.txt"}), timeout=0.05
+        )
+
+    assert youtube is not None and youtube.rate == 10
+    assert len(limiter.buckets) == 2
+    assert 0.05 < wait.seconds < 0.5
+    assert limiter.get_bucket(url="https://example.com/feed", ydl_opts={}).rate == 1
+
+
+async def test_get_info_dict_penalizes_throttled_service() -> None:
+    """
+    Test that a HTTP 429 error slows down the bucket of the extraction.
+    """
+    limiter = RateLimiter(
+        rates_per_minute={"YoutubeHandler": 60},
+        default_rate_per_minute=60,
+        burst=5,
+        min_rate_ratio=0.1,
+    )
+
+    async def mock_get_info_dict_from_ydl(**kwargs: object) -> dict[str, object]:
+        await ytdlp.raise_ydl_extract_info_error(
+            e=DownloadError("HTTP Error 429: Too Many Requests"), url=YOUTUBE_URL
+        )
+
+    start = time.monotonic()
+    with patch("app.services.ytdlp.rate_limiter", limiter), patch(
+        "app.services.ytdlp.get_info_dict_from_ydl", mock_get_info_dict_from_ydl
+    ):
+        with pytest.raises(ytdlp.Http429Error):
+            await ytdlp.get_info_dict(url=YOUTUBE_URL, ydl_opts={}, use_cache=False)
+
+    assert time.monotonic() - start < 1
+    assert limiter.get_bucket(url=YOUTUBE_URL, ydl_opts={}).rate == 0.5
@@ -0,0 +1,118 @@
+from typing import Any
+
+import datetime
+
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app import crud, handlers, models, settings
+from app.services.retention import collect_garbage
+from app.services.subscription import add_new_videos_to_subscription
+
+
+def build_entry(remote_video_id: str) -> dict[str, Any]:
+    return {
+        "id": remote_video_id,
+        "url": f"https://www.youtube.com/watch?v={remote_video_id}",
+        "title": f"title {remote_video_id}",
+        "description": None,
+        "duration": 60,
+        "thumbnails": [{"url": "https://i.ytimg.com/vi/test/hqdefault.jpg"}],
+        "channel_id": "UC_test",
+        "channel": "Test Channel",
+        "view_count": 1,
+    }
+
+
+async def test_collect_garbage(db: Session) -> None:
+    """
+    Test that orphaned videos and aged read videos are deleted in batches, and that
+    unread, recent and playlisted videos are kept.
+    """
+    user = await crud.user.get(db=db, username=settings.FIRST_SUPERUSER_USERNAME)
+    db_subscription = await crud.subscription.create(
+        db=db,
+        obj_in=models.SubscriptionCreate(
+            service_handler="YoutubeHandler",
+            subscription_handler="YoutubeSubscriptionHandler",
+            max_videos_per_fetch=10,
+            created_by=user.id,
+        ),
+    )
+    fetched_videos = [
+        models.VideoCreate(
+            **handlers.YoutubeHandler().map_subscription_info_dict_entity_to_video_dict(
+                subscription_id=db_subscription.id, entry_info_dict=build_entry(remote_video_id)
+            )
+        )
+        for remote_video_id in ["orphan1", "orphan2", "old", "playlisted", "recent", "unread"]
+    ]
+    videos = {
+        video.remote_video_id: video
+        for video in await add_new_videos_to_subscription(
+            fetched_videos=fetched_videos, db_subscription=db_subscription, db=db
+        )
+    }
+    old = datetime.datetime.utcnow() - datetime.timedelta(days=60)
+    for remote_video_ids, values in [
+        (["old", "playlisted", "recent"], {"is_read": True}),
+        (["old", "playlisted", "unread"], {"released_at": old}),
+    ]:
+        db.execute(
+            sa.update(models.Video)
+            .where(models.Video.remote_video_id.in_(remote_video_ids))  # type: ignore
+            .values(**values)
+        )
+    db.execute(
+        sa.delete(models.SubscriptionVideoLink).where(
+            models.SubscriptionVideoLink.video_id.in_(  # type: ignore[attr-defined]
+                [videos["orphan1"].id, videos["orphan2"].id]
+            )
+        )
+    )
+    db_playlist = await crud.playlist.create(db=db, obj_in=models.PlaylistCreate(name="Later"))
+    await crud.playlist_item.create(
+        db=db,
+        obj_in=models.PlaylistItemCreate(url=videos["playlisted"].url, playlist_id=db_playlist.id),
+    )
+    db.commit()
+
+    results = await collect_garbage(db=db, read_video_max_age_days=30, batch_size=1, vacuum=False)
+
+    assert results.deleted_videos == 3
+    remaining = db.execute(sa.select(models.Video.remote_video_id)).scalars().all()
+    assert sorted(remaining) == ["playlisted", "recent", "unread"]
+    links = db.execute(sa.select(models.SubscriptionVideoLink.video_id)).scalars().all()
+    assert len(links) == 3
+
+    results = await collect_garbage(db=db, read_video_max_age_days=0, batch_size=10, vacuum=False)
+    assert results.deleted_videos == 0
+
+
+async def test_collect_garbage_keeps_created_videos(db: Session) -> None:
+    """
+    Test that videos created by hand, which no subscription links, survive retention.
+    """
+    await crud.channel.create(
+        db=db,
+        obj_in=models.ChannelCreate(remote_channel_id="UC_test", service_handler="YoutubeHandler"),
+    )
+    db_video = await crud.video.create(
+        db=db,
+        obj_in=models.VideoCreate(
+            title="My video",
+            url="https://www.youtube.com/watch?v=created",
+            remote_channel_id="UC_test",
+        ),
+    )
+    db.execute(
+        sa.update(models.Video)
+        .where(models.Video.id == db_video.id)
+        .values(is_read=True, released_at=datetime.datetime.utcnow() - datetime.timedelta(days=60))
+    )
+    db.commit()
+
+    results = await collect_garbage(db=db, read_video_max_age_days=30, batch_size=10, vacuum=False)
+
+    assert results.deleted_videos == 0
+    assert db.get(models.Video, db_video.id) is not None
@@ -0,0 +1,126 @@
+import asyncio
+import datetime
+from unittest.mock import MagicMock, patch
+
+from app.models import FetchResults
+from app.services.fetch import FetchCanceledError
+from app.services.scheduler import FetchScheduler
+
+
+def test_due_queue_pops_earliest_and_skips_replaced_entries() -> None:
+    """
+    Test that the due-queue pops subscriptions in order of their due time and ignores
+    entries that were rescheduled.
+    """
+    scheduler = FetchScheduler(max_concurrent_jobs=2, jitter_ratio=0, max_backoff_minutes=60)
+    now = datetime.datetime(2023, 1, 1, 12)
+    scheduler.schedule("late", now - datetime.timedelta(minutes=1))
+    scheduler.schedule("early", now - datetime.timedelta(minutes=5))
+    scheduler.schedule("moved", now - datetime.timedelta(minutes=3))
+    scheduler.schedule("moved", now + datetime.timedelta(minutes=3))
+
+    assert scheduler.pop_due(now=now, limit=10) == ["early", "late"]
+    assert scheduler.get_seconds_until_next_due(now=now) == 180
+    assert scheduler.pop_due(now=now + datetime.timedelta(minutes=3), limit=10) == ["moved"]
+
+
+def test_next_fetch_at_backs_off_exponentially() -> None:
+    """
+    Test that failing subscriptions are delayed exponentially, bounded by the max backoff.
+    """
+    scheduler = FetchScheduler(max_concurrent_jobs=1, jitter_ratio=0, max_backoff_minutes=300)
+    now = datetime.datetime(2023, 1, 1, 12)
+    subscription = MagicMock(fetch_interval_minutes=60, fetch_failures=0)
+
+    delays = []
+    for failures in range(4):
+        subscription.fetch_failures = failures
+        next_fetch_at = scheduler.get_next_fetch_at(db_subscription=subscription, now=now)
+        delays.append((next_fetch_at - now).total_seconds() / 60)
+
+    assert delays == [60, 120, 240, 300]
+
+
+async def test_run_caps_concurrent_jobs_and_reschedules() -> None:
+    """
+    Test that the scheduler loop runs at most `max_concurrent_jobs` fetches at a time and
+    reschedules failed subscriptions with backoff.
+    """
+    now = datetime.datetime.utcnow()
+    subscriptions = {
+        str(i): MagicMock(
+            id=str(i),
+            fetch_interval_minutes=60,
+            fetch_failures=0,
+            next_fetch_at=now - datetime.timedelta(minutes=i),
+        )
+        for i in range(4)
+    }
+    running = 0
+    max_running = 0
+    fetched: list[str] = []
+
+    async def mock_fetch_subscription(id: str, **kwargs: object) -> FetchResults:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        fetched.append(id)
+        if id == "0":
+            raise FetchCanceledError()
+        return FetchResults(subscriptions=1)
+
+    async def mock_get(id: str, **kwargs: object) -> MagicMock:
+        return subscriptions[id]
+
+    async def mock_get_all(**kwargs: object) -> list[MagicMock]:
+        return list(subscriptions.values())
+
+    scheduler = FetchScheduler(max_concurrent_jobs=2, jitter_ratio=0, max_backoff_minutes=600)
+    with patch("app.services.scheduler.fetch_subscription", mock_fetch_subscription), patch(
+        "app.services.scheduler.crud.subscription.get", mock_get
+    ), patch("app.services.scheduler.crud.subscription.get_all", mock_get_all):
+        scheduler.start(db=MagicMock())
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(fetched) == 4 and not scheduler._running:
+                break
+        await scheduler.stop()
+
+    # Earliest due subscriptions are fetched first
+    assert fetched[:2] == ["3", "2"]
+    assert sorted(fetched) == ["0", "1", "2", "3"]
+    assert max_running == 2
+    assert subscriptions["0"].fetch_failures == 1
+    assert subscriptions["1"].fetch_failures == 0
+    assert subscriptions["0"].next_fetch_at - subscriptions["1"].next_fetch_at > (
+        datetime.timedelta(minutes=59)
+    )
+
+
+async def test_reschedule_counts_the_new_interval_from_the_last_fetch() -> None:
+    """
+    Test that a shorter fetch interval moves the next fetch before the one scheduled with the
+    old interval.
+    """
+    scheduler = FetchScheduler(max_concurrent_jobs=1, jitter_ratio=0, max_backoff_minutes=60)
+    last_fetched_at = datetime.datetime.utcnow() - datetime.timedelta(minutes=2)
+    old_next_fetch_at = last_fetched_at + datetime.timedelta(days=1)
+    subscription = MagicMock(
+        id="subscription",
+        fetch_interval_minutes=5,
+        fetch_failures=0,
+        last_fetched_at=last_fetched_at,
+        next_fetch_at=old_next_fetch_at,
+    )
+    scheduler.schedule(subscription_id="subscription", due_at=old_next_fetch_at)
+
+    db = MagicMock()
+    await scheduler.reschedule(db=db, db_subscription=subscription)
+
+    assert subscription.next_fetch_at == last_fetched_at + datetime.timedelta(minutes=5)
+    db.commit.assert_called_once()
+    assert scheduler.pop_due(now=last_fetched_at + datetime.timedelta(minutes=5), limit=1) == [
+        "subscription"
+    ]
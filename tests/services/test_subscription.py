@@ -0,0 +1,217 @@
+from typing import Any
+
+import asyncio
+from collections.abc import AsyncGenerator
+from unittest.mock import MagicMock, patch
+
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app import crud, handlers, models, settings
+from app.models import VideoCreate
+from app.services.subscription import (
+    add_new_videos_to_subscription,
+    get_subscription_videos_incremental,
+    iter_subscription_video_batches,
+    stream_new_videos_to_subscription,
+)
+
+
+def build_entry(remote_video_id: str) -> dict[str, Any]:
+    return {
+        "id": remote_video_id,
+        "url": f"https://www.youtube.com/watch?v={remote_video_id}",
+        "title": f"title {remote_video_id}",
+        "description": None,
+        "duration": 60,
+        "thumbnails": [{"url": "https://i.ytimg.com/vi/test/hqdefault.jpg"}],
+        "channel_id": "UC_test",
+        "channel": "Test Channel",
+        "view_count": 1,
+    }
+
+
+def build_subscription(max_videos_per_fetch: int) -> MagicMock:
+    db_subscription = MagicMock(
+        id="subscription_id", url="https://www.youtube.com/feed/subscriptions"
+    )
+    db_subscription.max_videos_per_fetch = max_videos_per_fetch
+    db_subscription.subscription_handler_obj.get_subscription_ydl_opts.return_value = {}
+    db_subscription.service_handler_obj = handlers.YoutubeHandler()
+    return db_subscription
+
+
+def mock_feed(remote_video_ids: list[str], consumed: list[str]) -> Any:
+    async def iter_playlist_entries(**kwargs: Any) -> AsyncGenerator[dict[str, Any], None]:
+        for remote_video_id in remote_video_ids:
+            consumed.append(remote_video_id)
+            yield build_entry(remote_video_id)
+
+    return iter_playlist_entries
+
+
+@patch("app.services.subscription.settings.FETCH_INCREMENTAL_KNOWN_RUN", 2)
+async def test_incremental_fetch_stops_at_known_run() -> None:
+    """
+    Test that the feed stops being read after a run of known videos.
+    """
+    consumed: list[str] = []
+    feed = ["new1", "new2", "old1", "old2", "old3", "old4"]
+    with patch(
+        "app.services.subscription.iter_playlist_entries", mock_feed(feed, consumed=consumed)
+    ):
+        videos, skipped_entries = await get_subscription_videos_incremental(
+            db_subscription=build_subscription(max_videos_per_fetch=10),
+            known_remote_video_ids={"old1", "old2", "old3", "old4"},
+            reverse_import_order=True,
+        )
+
+    assert consumed == ["new1", "new2", "old1", "old2"]
+    assert [video.remote_video_id for video in videos] == ["new2", "new1"]
+    assert skipped_entries == 6
+
+
+@patch("app.services.subscription.settings.FETCH_INCREMENTAL_KNOWN_RUN", 2)
+async def test_incremental_fetch_falls_back_to_full_window() -> None:
+    """
+    Test that the whole fetch window is read if no run of known videos is found.
+    """
+    consumed: list[str] = []
+    feed = ["new1", "old1", "new2", "new3", "new4"]
+    with patch(
+        "app.services.subscription.iter_playlist_entries", mock_feed(feed, consumed=consumed)
+    ):
+        videos, skipped_entries = await get_subscription_videos_incremental(
+            db_subscription=build_subscription(max_videos_per_fetch=4),
+            known_remote_video_ids={"old1"},
+        )
+
+    assert consumed == ["new1", "old1", "new2", "new3"]
+    assert [video.remote_video_id for video in videos] == ["new1", "new2", "new3"]
+    assert skipped_entries == 0
+
+
+async def test_iter_subscription_video_batches() -> None:
+    """
+    Test that feed entries are yielded in batches, newest first with decreasing created_at.
+    """
+    consumed: list[str] = []
+    feed = ["v1", "v2", "v3", "v4", "v5"]
+    stats = models.SubscriptionFetchStats(subscription_id="subscription_id")
+    with patch(
+        "app.services.subscription.iter_playlist_entries", mock_feed(feed, consumed=consumed)
+    ):
+        batches = [
+            batch
+            async for batch in iter_subscription_video_batches(
+                db_subscription=build_subscription(max_videos_per_fetch=10),
+                stats=stats,
+                batch_size=2,
+            )
+        ]
+
+    assert [[video.remote_video_id for video in batch] for batch in batches] == [
+        ["v1", "v2"],
+        ["v3", "v4"],
+        ["v5"],
+    ]
+    created_at = [video.created_at for batch in batches for video in batch]
+    assert created_at == sorted(created_at, reverse=True)
+    assert stats.entries_seen == 5
+
+
+@patch("app.services.subscription.settings.FETCH_INCREMENTAL", False)
+@patch("app.services.subscription.settings.FETCH_BATCH_SIZE", 1)
+@patch("app.services.subscription.settings.FETCH_STREAM_QUEUE_BATCHES", 1)
+async def test_stream_new_videos_to_subscription() -> None:
+    """
+    Test that batches are ingested under the write lock while the feed is read, and that
+    extraction waits for the ingest when the queue is full.
+    """
+    consumed: list[str] = []
+    feed = ["v1", "v2", "v3", "v4"]
+    write_lock = asyncio.Lock()
+    ingested: list[list[str]] = []
+    consumed_at_ingest: list[int] = []
+
+    async def mock_add_new_videos_to_subscription(
+        fetched_videos: list[VideoCreate], **kwargs: Any
+    ) -> list[VideoCreate]:
+        assert write_lock.locked()
+        await asyncio.sleep(0.01)
+        consumed_at_ingest.append(len(consumed))
+        ingested.append([video.remote_video_id for video in fetched_videos])
+        return fetched_videos[: len(ingested) % 2]
+
+    stats = models.SubscriptionFetchStats(subscription_id="subscription_id")
+    with patch(
+        "app.services.subscription.iter_playlist_entries", mock_feed(feed, consumed=consumed)
+    ), patch(
+        "app.services.subscription.add_new_videos_to_subscription",
+        mock_add_new_videos_to_subscription,
+    ):
+        added_videos, skipped_entries = await stream_new_videos_to_subscription(
+            db=MagicMock(),
+            db_subscription=build_subscription(max_videos_per_fetch=10),
+            write_lock=write_lock,
+            stats=stats,
+        )
+
+    assert ingested == [["v1"], ["v2"], ["v3"], ["v4"]]
+    # One batch is ingested, one is queued and one is being extracted
+    assert max(consumed_at_ingest) - len(ingested) <= 2
+    assert consumed_at_ingest[0] < len(feed)
+    assert added_videos == stats.entries_new == 2
+    assert skipped_entries == 0
+
+
+async def test_add_new_videos_to_subscription_bulk_ingest(db: Session) -> None:
+    """
+    Test that new videos, their channels and links are ingested with a constant
+    number of statements, and that already linked videos are skipped.
+    """
+    user = await crud.user.get(db=db, username=settings.FIRST_SUPERUSER_USERNAME)
+    db_subscription = await crud.subscription.create(
+        db=db,
+        obj_in=models.SubscriptionCreate(
+            service_handler="YoutubeHandler",
+            subscription_handler="YoutubeSubscriptionHandler",
+            max_videos_per_fetch=10,
+            created_by=user.id,
+        ),
+    )
+    fetched_videos = [
+        VideoCreate(
+            **handlers.YoutubeHandler().map_subscription_info_dict_entity_to_video_dict(
+                subscription_id=db_subscription.id, entry_info_dict=build_entry(f"video{i}")
+            )
+        )
+        for i in range(20)
+    ]
+
+    statements: list[str] = []
+    engine = db.get_bind().engine
+
+    def count_statement(*args: Any) -> None:
+        if "SAVEPOINT" not in args[2]:
+            statements.append(args[2])
+
+    sa.event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        new_videos = await add_new_videos_to_subscription(
+            fetched_videos=fetched_videos[:15], db_subscription=db_subscription, db=db
+        )
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", count_statement)
+
+    assert len(new_videos) == 15
+    assert len(statements) == 5
+    assert len(db_subscription.videos) == 15
+    db_channel = await crud.channel.get(db=db, remote_channel_id="UC_test")
+    assert db_channel.is_subscribed is True
+
+    new_videos = await add_new_videos_to_subscription(
+        fetched_videos=fetched_videos, db_subscription=db_subscription, db=db
+    )
+    assert [video.remote_video_id for video in new_videos] == [f"video{i}" for i in range(15, 20)]
+    assert len(db_subscription.videos) == 20
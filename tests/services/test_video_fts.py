@@ -0,0 +1,120 @@
+import itertools
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session
+
+from app import models
+from app.services.video_fts import get_fts_phrase, match_keyword, rebuild_video_fts
+
+
+def select_matching_video_ids(db: Session, keyword: str, use_fts: bool = True) -> list[str]:
+    query = (
+        sa.select(models.Video.id)
+        .where(match_keyword(keyword=keyword, dialect=db.get_bind().dialect.name, use_fts=use_fts))
+        .order_by(models.Video.id)
+    )
+    return db.execute(query).scalars().all()
+
+
+@pytest.fixture(name="videos")
+def fixture_videos(db: Session) -> None:
+    videos = [
+        ("v1", "Live Concert", None),
+        ("v2", "A long talk", "Recorded after the concert"),
+        ("v3", "Concerts today", "Learning C++ and snake_case"),
+        ("v4", "Café crème", "KIR DEĞİL"),
+    ]
+    for video_id, title, description in videos:
+        db.add(
+            models.Video(
+                id=video_id,
+                service_handler="YoutubeHandler",
+                url=f"https://www.youtube.com/watch?v={video_id}",
+                remote_channel_id="channel",
+                title=title,
+                description=description,
+            )
+        )
+    db.commit()
+
+
+@pytest.mark.parametrize("use_fts", [True, False])
+@pytest.mark.parametrize(
+    "keyword, expected",
+    [
+        ("concert", ["v1", "v2"]),
+        ("CONCERT", ["v1", "v2"]),
+        ("live concert", ["v1"]),
+        ("snake", []),
+        ("snake_case", ["v3"]),
+        ("c++ and", ["v3"]),
+        ("café", ["v4"]),
+        ("caf", []),
+        ("kır", ["v4"]),
+    ],
+)
+def test_match_keyword(
+    db: Session, videos: None, keyword: str, expected: list[str], use_fts: bool
+) -> None:
+    """
+    Test that the full-text index and the regex match the same whole words of titles and
+    descriptions.
+    """
+    assert select_matching_video_ids(db=db, keyword=keyword, use_fts=use_fts) == expected
+
+
+def test_get_fts_phrase() -> None:
+    """
+    Test that only keywords of whole words are looked up in the full-text index.
+    """
+    assert get_fts_phrase("live concert") == '"live concert"'
+    assert get_fts_phrase("c++") is None
+    assert get_fts_phrase('say "hi"') is None
+    assert get_fts_phrase("two  spaces") is None
+    assert get_fts_phrase("café") is None
+    assert get_fts_phrase("kır") is None
+
+
+def test_match_keyword_without_sqlite() -> None:
+    """
+    Test that keywords are matched with a regex on databases without the full-text index.
+    """
+    query = sa.select(models.Video.id).where(match_keyword(keyword="concert", dialect="postgresql"))
+    sql = str(query.compile(dialect=postgresql.dialect()))
+
+    assert "MATCH" not in sql
+    assert "video_fts" not in sql
+    assert "~" in sql
+
+
+def test_fts_and_regex_match_the_same_videos(db: Session, videos: None) -> None:
+    """
+    Test that the full-text index and the regex match the same videos for every word and
+    phrase of the titles and descriptions, in any case.
+    """
+    texts = db.execute(sa.select(models.Video.title, models.Video.description)).all()
+    words = {word for text in itertools.chain(*texts) if text for word in text.split()}
+    keywords = words | {word.upper() for word in words} | {"live concert", "a long talk"}
+    for keyword in sorted(keywords):
+        assert select_matching_video_ids(db=db, keyword=keyword) == select_matching_video_ids(
+            db=db, keyword=keyword, use_fts=False
+        ), keyword
+
+
+def test_video_fts_is_kept_in_sync(db: Session, videos: None) -> None:
+    """
+    Test that triggers update the full-text index when videos change, and that it can be
+    rebuilt.
+    """
+    db.execute(
+        sa.update(models.Video).where(models.Video.id == "v1").values(title="Studio session")
+    )
+    db.execute(sa.delete(models.Video).where(models.Video.id == "v2"))
+    db.commit()
+    assert select_matching_video_ids(db=db, keyword="concert") == []
+    assert select_matching_video_ids(db=db, keyword="session") == ["v1"]
+
+    rebuild_video_fts(db=db)
+    assert select_matching_video_ids(db=db, keyword="session") == ["v1"]
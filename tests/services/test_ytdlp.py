@@ -0,0 +1,47 @@
+from yt_dlp.utils import DownloadError, ExtractorError, YoutubeDLError
+
+from app.services.ytdlp import (
+    AccountNotFoundError,
+    Http410Error,
+    Http429Error,
+    IsPrivateVideoError,
+    VideoUnavailableError,
+    classify_ydl_error,
+)
+
+
+def test_classify_ydl_error() -> None:
+    """
+    Test that yt-dlp errors are mapped to the matching exception classes.
+    """
+    assert isinstance(
+        classify_ydl_error(DownloadError("ERROR: [youtube] abc: Video unavailable")),
+        VideoUnavailableError,
+    )
+    assert isinstance(
+        classify_ydl_error(DownloadError("ERROR: [Private video] is not available")),
+        IsPrivateVideoError,
+    )
+    assert isinstance(classify_ydl_error(DownloadError("HTTP Error 410: Gone")), Http410Error)
+    assert classify_ydl_error(YoutubeDLError("HTTP Error 410: Gone")) is None
+    assert isinstance(
+        classify_ydl_error(DownloadError("HTTP Error 429: Too Many Requests")), Http429Error
+    )
+
+
+def test_classify_ydl_error_uses_classifier_priority() -> None:
+    """
+    Test that the first listed classifier wins when several match, regardless of where
+    they match in the message.
+    """
+    error = classify_ydl_error(
+        DownloadError("Video unavailable. This account has been terminated.")
+    )
+    assert isinstance(error, AccountNotFoundError)
+    assert str(error) == "This account has been terminated."
+
+    extractor_error = ExtractorError("This account has been terminated for spam.", expected=True)
+    error = classify_ydl_error(
+        DownloadError("This account has been terminated", exc_info=(None, extractor_error, None))
+    )
+    assert str(error) == "This account has been terminated for spam."
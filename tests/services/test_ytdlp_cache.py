@@ -0,0 +1,76 @@
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from yt_dlp.utils import match_filter_func
+
+from app.services import ytdlp
+from app.services.ytdlp_cache import InfoDictCache, get_cache_key
+
+pytestmark = pytest.mark.usefixtures("disable_rate_limiter")
+
+
+def test_cache_key_is_stable_for_equal_options() -> None:
+    """
+    Test that equal options built by separate calls map to the same key.
+    """
+    key = get_cache_key(
+        url="https://example.com",
+        ydl_opts={"playlistend": 5, "match_filter": match_filter_func("duration < 3600")},
+    )
+    assert key == get_cache_key(
+        url="https://example.com",
+        ydl_opts={"match_filter": match_filter_func("duration < 3600"), "playlistend": 5},
+    )
+    assert key != get_cache_key(
+        url="https://example.com",
+        ydl_opts={"playlistend": 5, "match_filter": match_filter_func("duration < 60")},
+    )
+
+
+async def test_cache_expires_and_evicts_least_recently_used(tmp_path: Path) -> None:
+    """
+    Test that entries expire after the TTL and the least recently used entry is evicted.
+    """
+    cache = InfoDictCache(path=tmp_path, ttl_seconds=60, max_mb=1)
+    payload = {"id": "a", "data": os.urandom(400_000).hex()}
+
+    await cache.set(key="aa", info_dict=payload)
+    await cache.set(key="bb", info_dict={**payload, "id": "b"})
+    assert (await cache.get(key="aa")) == payload
+
+    # "bb" is now the least recently used entry
+    await cache.set(key="cc", info_dict={**payload, "id": "c"})
+    assert await cache.get(key="bb") is None
+    assert (await cache.get(key="aa"))["id"] == "a"
+
+    expired = time.time() - 120
+    os.utime(cache._get_file("cc"), (expired, expired))
+    assert await cache.get(key="cc") is None
+    assert not cache._get_file("cc").exists()
+
+
+async def test_get_info_dict_uses_cache(tmp_path: Path) -> None:
+    """
+    Test that repeated extractions are served from the cache unless it is bypassed.
+    """
+    cache = InfoDictCache(path=tmp_path, ttl_seconds=60, max_mb=1)
+    calls = 0
+
+    async def mock_get_info_dict_from_ydl(**kwargs: object) -> dict[str, object]:
+        nonlocal calls
+        calls += 1
+        return {"id": "video", "metadata": {"ydl_opts": kwargs["ydl_opts"]}}
+
+    with patch("app.services.ytdlp.info_dict_cache", cache), patch(
+        "app.services.ytdlp.get_info_dict_from_ydl", mock_get_info_dict_from_ydl
+    ):
+        first = await ytdlp.get_info_dict(url="https://example.com", ydl_opts={})
+        second = await ytdlp.get_info_dict(url="https://example.com", ydl_opts={})
+        await ytdlp.get_info_dict(url="https://example.com", ydl_opts={}, use_cache=False)
+
+    assert calls == 2
+    assert first["id"] == second["id"] == "video"
+    assert second["metadata"]["url"] == "https://example.com"
@@ -0,0 +1,153 @@
+import asyncio
+import sys
+import threading
+import time
+from multiprocessing import Pipe
+from unittest.mock import MagicMock, patch
+
+import pytest
+from yt_dlp.utils import DownloadError, ExtractorError, match_filter_func
+
+from app.services import ytdlp_pool
+from app.services.ytdlp import AccountNotFoundError, classify_ydl_error
+
+
+def test_worker_reuses_ydl_per_profile_and_recycles() -> None:
+    """
+    Test that a worker keeps one YoutubeDL per opts profile and retires after max_tasks.
+    """
+    parent_conn, child_conn = Pipe()
+    with patch("app.services.ytdlp_pool.YoutubeDL") as mock_ydl_class:
+        mock_ydl = mock_ydl_class.return_value
+        mock_ydl.extract_info.return_value = {"id": "test"}
+        mock_ydl.sanitize_info.side_effect = lambda info_dict: info_dict
+
+        worker = threading.Thread(
+            target=ytdlp_pool.worker_main, args=(child_conn, 2, 0), daemon=True
+        )
+        worker.start()
+
+        parent_conn.send(("https://example.com/1", {"simulate": True}, None, None))
+        assert parent_conn.recv() == ("ok", {"id": "test"}, False)
+        parent_conn.send(("https://example.com/2", {"simulate": True}, None, None))
+        assert parent_conn.recv() == ("ok", {"id": "test"}, True)
+        worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert mock_ydl_class.call_count == 1
+    assert mock_ydl.extract_info.call_count == 2
+
+
+def test_worker_returns_errors() -> None:
+    """
+    Test that errors are sent back with their class, message and traceback.
+    """
+    parent_conn, child_conn = Pipe()
+    with patch("app.services.ytdlp_pool.YoutubeDL") as mock_ydl_class:
+        mock_ydl_class.return_value.extract_info.side_effect = ValueError("boom")
+        worker = threading.Thread(
+            target=ytdlp_pool.worker_main, args=(child_conn, 5, 0), daemon=True
+        )
+        worker.start()
+        parent_conn.send(("https://example.com", {}, None, None))
+        status, payload, recycle = parent_conn.recv()
+        assert (status, recycle) == ("error", False)
+        assert payload[:2] == ("builtins.ValueError", "boom")
+        assert "Traceback" in payload[2]
+        parent_conn.send(None)
+        worker.join(timeout=5)
+
+
+def test_rebuild_error_keeps_the_type() -> None:
+    """
+    Test that errors of the worker are raised again with their type and wrapped error.
+    """
+    try:
+        try:
+            raise ExtractorError("This account has been terminated.", expected=True)
+        except ExtractorError:
+            # Like `YoutubeDL.report_error`
+            raise DownloadError(  # pylint: disable=raise-missing-from
+                "ERROR: This account has been terminated.", sys.exc_info()
+            )
+    except DownloadError as e:
+        error = ytdlp_pool.rebuild_error(payload=ytdlp_pool.get_error_payload(e))
+
+    assert type(error) is DownloadError
+    assert str(error) == "ERROR: This account has been terminated."
+    assert isinstance(error.exc_info[1], ExtractorError)  # type: ignore[attr-defined]
+    assert isinstance(error.__cause__, ytdlp_pool.ExtractorWorkerTraceback)
+    classified = classify_ydl_error(error)
+    assert isinstance(classified, AccountNotFoundError)
+    assert str(classified) == "This account has been terminated."
+
+    unknown = ("some_module.SomeError", "boom", "", {}, None)
+    assert type(ytdlp_pool.rebuild_error(payload=unknown)) is ytdlp_pool.YoutubeDLError
+
+
+async def test_cancelled_worker_start_kills_the_worker() -> None:
+    """
+    Test that a worker started for a cancelled extraction is killed once it has started.
+    """
+    pool = ytdlp_pool.ExtractorPool(workers=1, max_tasks_per_worker=1, max_rss_mb=0)
+    worker = MagicMock()
+
+    def start_worker() -> MagicMock:
+        time.sleep(0.2)
+        return worker
+
+    with patch.object(pool, "_start_worker", start_worker):
+        task = asyncio.create_task(pool.extract_info(url="https://example.com", ydl_opts={}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.3)
+
+    worker.abandon.assert_called_once()
+    worker.stop.assert_called_once()
+    worker.run.assert_not_called()
+    # The slot is free for the next extraction
+    assert pool._get_idle_workers().qsize() == 1  # pylint: disable=protected-access
+
+
+def test_abandoned_worker_is_reaped_by_its_run_call() -> None:
+    """
+    Test that abandoning a busy worker kills it without waiting, and that the blocked run
+    call waits for the process to exit in its own thread.
+    """
+    worker = ytdlp_pool.ExtractorWorker.__new__(ytdlp_pool.ExtractorWorker)
+    worker.conn, child_conn = Pipe()
+    worker.process = MagicMock()
+    worker.is_retired = False
+    errors: list[Exception] = []
+
+    def run() -> None:
+        try:
+            worker.run(("https://example.com", {}, None, None))
+        except ytdlp_pool.ExtractorWorkerError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    worker.abandon()
+    worker.process.kill.assert_called_once()
+    worker.process.join.assert_not_called()
+
+    # The killed process closes its end of the pipe
+    child_conn.close()
+    thread.join(timeout=5)
+    assert len(errors) == 1
+    worker.process.join.assert_called_once()
+
+
+def test_is_picklable() -> None:
+    """
+    Test that options holding closures are not sent to the pool.
+    """
+    assert ytdlp_pool.is_picklable({"playlistend": 10}, None)
+    assert not ytdlp_pool.is_picklable({"match_filter": match_filter_func("duration < 10")})
+
+
+def test_get_rss_bytes() -> None:
+    assert ytdlp_pool.get_rss_bytes() >= 0
@@ -0,0 +1,74 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.services import ytdlp
+from app.services.benchmark import run_fetch_benchmark
+from app.services.ytdlp_replay import ReplayBackend
+
+pytestmark = pytest.mark.usefixtures("disable_info_dict_cache")
+
+FEED_URL = "https://www.youtube.com/feed/subscriptions"
+
+
+async def test_recorded_info_dict_is_replayed(tmp_path: Path) -> None:
+    """
+    Test that a recorded extraction is replayed in feed order with the playlist options applied.
+    """
+    recorder = ReplayBackend(path=tmp_path, synthetic_entries=0, record=True)
+    info_dict = {
+        "_type": "playlist",
+        "entries": [{"id": "old"}, {"id": "middle"}, {"id": "new"}],
+    }
+
+    async def mock_get_info_dict_from_ydl(**kwargs: object) -> dict[str, object]:
+        return {**info_dict, "metadata": {}}
+
+    with patch("app.services.ytdlp.replay_backend", recorder), patch(
+        "app.services.ytdlp.get_info_dict_from_ydl", mock_get_info_dict_from_ydl
+    ):
+        await ytdlp.get_info_dict(url=FEED_URL, ydl_opts={"playlistreverse": True})
+
+    replayer = ReplayBackend(path=tmp_path, synthetic_entries=0, enabled=True)
+    with patch("app.services.ytdlp.replay_backend", replayer):
+        replayed = await ytdlp.get_info_dict(
+            url=FEED_URL, ydl_opts={"playlistend": 2, "playlistreverse": True}
+        )
+        entries = [entry async for entry in ytdlp.iter_playlist_entries(url=FEED_URL, ydl_opts={})]
+
+    assert [entry["id"] for entry in replayed["entries"]] == ["middle", "new"]
+    assert replayed["metadata"]["url"] == FEED_URL
+    assert [entry["id"] for entry in entries] == ["new", "middle", "old"]
+
+
+async def test_synthetic_feeds_return_new_entries(tmp_path: Path) -> None:
+    """
+    Test that every extraction of a synthetic feed returns entries that were not seen before.
+    """
+    backend = ReplayBackend(path=tmp_path, synthetic_entries=3, enabled=True)
+
+    first = await backend.get_info_dict(url=FEED_URL, ydl_opts={})
+    second = await backend.get_info_dict(url=FEED_URL, ydl_opts={"playlistreverse": True})
+
+    first_ids = [entry["id"] for entry in first["entries"]]
+    second_ids = [entry["id"] for entry in second["entries"]]
+    assert len(first_ids) == len(second_ids) == 3
+    assert not set(first_ids) & set(second_ids)
+    # Newest first, unless reversed
+    assert first_ids == sorted(first_ids, reverse=True)
+    assert second_ids == sorted(second_ids)
+
+
+async def test_fetch_benchmark(tmp_path: Path) -> None:
+    """
+    Test that the benchmark ingests synthetic feeds into a scratch database.
+    """
+    results = await run_fetch_benchmark(
+        subscriptions=2, entries=5, rounds=2, fixtures_path=tmp_path
+    )
+
+    assert results.added_videos == 20
+    assert results.statements > 0
+    assert results.videos_per_second > 0
+    assert results.peak_rss_bytes > 0
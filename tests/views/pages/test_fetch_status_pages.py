@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from httpx import Cookies
+from sqlmodel import Session
+
+from app.models import FetchJobEvent, FetchResults
+from app.services.fetch_jobs import FetchJob, fetch_jobs
+
+
+def test_view_fetch_status(
+    db_with_user: Session,  # pylint: disable=unused-argument
+    client: TestClient,
+    normal_user_cookies: Cookies,
+) -> None:
+    """
+    Test fetch status page
+    """
+    client.cookies = normal_user_cookies
+    response = client.get("/fetch-status")
+    assert response.status_code == 200
+    assert response.template.name == "fetch/status.html"  # type: ignore
+
+
+def test_fetch_all_filters_starts_job(
+    db_with_user: Session,  # pylint: disable=unused-argument
+    client: TestClient,
+    normal_user_cookies: Cookies,
+) -> None:
+    """
+    Test that fetching all filters starts a background job and shows its progress page.
+    """
+    job = FetchJob(id="job_id", title="All Subscriptions")
+    fetch_jobs.jobs[job.id] = job
+    client.cookies = normal_user_cookies
+    with patch(
+        "app.views.pages.filters.fetch_jobs.start_fetch_all", return_value=job
+    ) as mock_start_fetch_all:
+        response = client.get("/filters/fetch")
+
+    mock_start_fetch_all.assert_called_once()
+    assert response.history[0].status_code == status.HTTP_303_SEE_OTHER
+    assert response.url.path == "/fetch-job/job_id"
+    assert response.template.name == "fetch/job.html"  # type: ignore
+    del fetch_jobs.jobs[job.id]
+
+
+def test_stream_fetch_job_events(
+    db_with_user: Session,  # pylint: disable=unused-argument
+    client: TestClient,
+    normal_user_cookies: Cookies,
+) -> None:
+    """
+    Test that the events of a fetch job are streamed as Server-Sent Events.
+    """
+    job = FetchJob(id="finished_job_id", title="All Subscriptions")
+    job.add_event(FetchJobEvent(job_id=job.id, event="progress", done=1, total=1))
+    job.status = "completed"
+    job.add_event(
+        FetchJobEvent(job_id=job.id, event="done", done=1, total=1, results=FetchResults())
+    )
+    fetch_jobs.jobs[job.id] = job
+    client.cookies = normal_user_cookies
+
+    response = client.get("/fetch-job/finished_job_id/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [line for line in response.text.splitlines() if line.startswith("event:")] == [
+        "event: progress",
+        "event: done",
+    ]
+    assert client.get("/fetch-job/unknown/events").status_code == 404
+
+
+def test_cancel_fetch_job(
+    db_with_user: Session,  # pylint: disable=unused-argument
+    client: TestClient,
+    superuser_cookies: Cookies,
+) -> None:
+    """
+    Test that a superuser can cancel a running fetch job.
+    """
+    job = FetchJob(id="running_job_id", title="All Subscriptions")
+    fetch_jobs.jobs[job.id] = job
+    client.cookies = superuser_cookies
+
+    response = client.get("/fetch-job/running_job_id/cancel")
+
+    assert job.cancel_event.is_set()
+    assert response.history[0].status_code == status.HTTP_303_SEE_OTHER
+    assert response.url.path == "/fetch-job/running_job_id"
+    del fetch_jobs.jobs[job.id]